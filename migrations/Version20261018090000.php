@@ -0,0 +1,40 @@
+<?php
+
+declare(strict_types=1);
+
+namespace DoctrineMigrations;
+
+use Doctrine\DBAL\Schema\Schema;
+use Doctrine\Migrations\AbstractMigration;
+
+final class Version20261018090000 extends AbstractMigration
+{
+    public function getDescription(): string
+    {
+        return 'Chaves de origem do legado para reimportação incremental (lancamentos_financeiros, prestacoes_contas, lancamentos)';
+    }
+
+    public function up(Schema $schema): void
+    {
+        $this->addSql('ALTER TABLE lancamentos_financeiros ADD codigo_origem INT DEFAULT NULL');
+        $this->addSql('CREATE UNIQUE INDEX uk_lanc_origem_codigo ON lancamentos_financeiros (origem, codigo_origem)');
+
+        $this->addSql('ALTER TABLE prestacoes_contas ADD codigo_origem INT DEFAULT NULL');
+        $this->addSql('CREATE UNIQUE INDEX uk_prestacao_codigo_origem ON prestacoes_contas (codigo_origem)');
+
+        $this->addSql('ALTER TABLE lancamentos ADD id_lancamento_financeiro INT DEFAULT NULL');
+        $this->addSql('CREATE UNIQUE INDEX uk_lancamentos_lanc_financeiro ON lancamentos (id_lancamento_financeiro)');
+    }
+
+    public function down(Schema $schema): void
+    {
+        $this->addSql('DROP INDEX uk_lancamentos_lanc_financeiro');
+        $this->addSql('ALTER TABLE lancamentos DROP id_lancamento_financeiro');
+
+        $this->addSql('DROP INDEX uk_prestacao_codigo_origem');
+        $this->addSql('ALTER TABLE prestacoes_contas DROP codigo_origem');
+
+        $this->addSql('DROP INDEX uk_lanc_origem_codigo');
+        $this->addSql('ALTER TABLE lancamentos_financeiros DROP codigo_origem');
+    }
+}
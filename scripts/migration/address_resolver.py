@@ -0,0 +1,298 @@
+"""
+address_resolver.py — Resolução em lote de estado/cidade/bairro/logradouro
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Substitui os get_or_create_* linha a linha (até 4 round trips por endereço)
+por uma resolução por nível: os endereços de um lote são normalizados,
+deduplicados e, em cada nível da hierarquia, os que faltam no cache entram
+num único INSERT ... RETURNING. Um lote inteiro custa no máximo 4 INSERTs,
+qualquer que seja o número de endereços.
+
+As tabelas estados/cidades/bairros/logradouros não têm chave única (e a
+base já traz nomes repetidos com grafias diferentes), então não há árbitro
+para ON CONFLICT; o que falta é decidido pelo cache carregado no início,
+e o script roda sozinho sobre essas tabelas.
+
+Os caches são indexados por tuplas de tokens normalizados (normalize_name):
+caixa e acentos ignorados e abreviações expandidas, de modo que "São Paulo",
+"SAO PAULO" e "S. Paulo" caem na mesma cidade. Abreviações que também são
+nomes ("S", "N", "Pe", "Ver") só se expandem com ponto: "Rua S" e "Rua São
+Jorge" continuam logradouros distintos. Linhas já duplicadas no banco
+apontam para o menor id; merge_report() conta quantas seriam fundidas.
+
+Uso:
+    resolver = AddressResolver(cur, now)
+    keys = [resolver.key(uf, cidade, bairro, logradouro, cep) for ...]
+    logr_ids = resolver.resolve_many(keys)     # chave -> logradouros.id
+    conn.commit(); resolver.commit()           # ou conn.rollback(); resolver.rollback()
+
+    python3 address_resolver.py                # relatório de duplicatas no banco
+"""
+
+import argparse
+import os
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+import psycopg2
+import psycopg2.extras
+
+sys.path.insert(0, os.path.dirname(__file__))
+import config as cfg
+
+DEFAULT_UF = 'SP'
+DEFAULT_CIDADE = 'SEM CIDADE'
+DEFAULT_BAIRRO = 'SEM BAIRRO'
+DEFAULT_LOGRADOURO = 'SEM ENDERECO'
+DEFAULT_CEP = '00000000'
+
+_NON_DIGIT = re.compile(r'\D')
+# Token e, se houver, o ponto logo depois dele ('S.' -> ('s', '.'))
+_TOKEN_RE = re.compile(r'([a-z0-9]+)(\.?)')
+
+# Abreviações comuns nos cadastros do legado (token já sem acento),
+# expandidas em qualquer posição: nenhuma é um nome por si só
+ABBREVIATIONS = {
+    'av': 'avenida', 'avn': 'avenida', 'al': 'alameda', 'tv': 'travessa',
+    'trav': 'travessa', 'pc': 'praca', 'pca': 'praca', 'pq': 'parque', 'rod': 'rodovia',
+    'estr': 'estrada', 'jd': 'jardim', 'jard': 'jardim', 'vl': 'vila',
+    'res': 'residencial', 'cj': 'conjunto', 'conj': 'conjunto',
+    'sta': 'santa', 'sto': 'santo', 'sra': 'senhora',
+    'dr': 'doutor', 'prof': 'professor', 'cel': 'coronel', 'cap': 'capitao',
+    'gal': 'general', 'gen': 'general', 'eng': 'engenheiro', 'pres': 'presidente',
+    'dep': 'deputado', 'sen': 'senador', 'gov': 'governador',
+    'frei': 'frei', 'mal': 'marechal', 'ten': 'tenente',
+}
+
+# Ambíguas sem o ponto ("Rua S", "Rua N", "Ver" são nomes de rua): só com
+# ponto e antes de outro token ("S. Jorge", "N. Sra.", "Pe. Anchieta")
+DOTTED_ABBREVIATIONS = {
+    'r': 'rua', 's': 'sao', 'n': 'nossa', 'pe': 'padre', 'ver': 'vereador', 'est': 'estrada',
+}
+
+# Tipos de logradouro abreviados sem ponto, só como primeiro token ("R Augusta")
+LEADING_ABBREVIATIONS = {'r': 'rua', 'est': 'estrada'}
+
+
+@lru_cache(maxsize=None)
+def normalize_name(text: str) -> tuple:
+    """Tokens de um nome para comparação: casefold, sem acentos, abreviações
+    expandidas. normalize_name('S. Paulo') == normalize_name('SÃO PAULO'),
+    mas 'Rua S' != 'Rua São'."""
+    folded = unicodedata.normalize('NFKD', text.casefold())
+    folded = ''.join(ch for ch in folded if not unicodedata.combining(ch))
+    found = _TOKEN_RE.findall(folded)
+    last = len(found) - 1
+    tokens = []
+    for i, (tok, dot) in enumerate(found):
+        expanded = ABBREVIATIONS.get(tok)
+        if expanded is None and dot and i < last:
+            expanded = DOTTED_ABBREVIATIONS.get(tok)
+        if expanded is None and not tokens:
+            expanded = LEADING_ABBREVIATIONS.get(tok)
+        tokens.append(expanded or tok)
+    return tuple(tokens)
+
+
+def _index(rows, key_of) -> tuple:
+    """(chave -> menor id, {chave: [ids]} das chaves com mais de uma linha)."""
+    index = {}
+    groups = {}
+    for row in sorted(rows, key=lambda r: r[0]):
+        k = key_of(row)
+        if k in index:
+            groups.setdefault(k, [index[k]]).append(row[0])
+        else:
+            index[k] = row[0]
+    return index, groups
+
+
+class AddressResolver:
+    """Caches de estados/cidades/bairros/logradouros + criação em lote."""
+
+    def __init__(self, cur, now):
+        self.cur = cur
+        self.now = now
+        self.created = {'estados': 0, 'cidades': 0, 'bairros': 0, 'logradouros': 0}
+        self.rows = {}
+        self.duplicates = {}
+        self._new = []  # (nível, cache, chave) criados desde o último commit()
+
+        cur.execute("SELECT id, uf FROM estados")
+        self.estados = self._load('estados', cur.fetchall(), lambda r: (r[1] or '').strip().upper())
+
+        cur.execute("SELECT id, nome, id_estado FROM cidades")
+        self.cidades = self._load('cidades', cur.fetchall(),
+                                  lambda r: (normalize_name(r[1] or ''), r[2]))
+
+        cur.execute("SELECT id, nome, id_cidade FROM bairros")
+        self.bairros = self._load('bairros', cur.fetchall(),
+                                  lambda r: (normalize_name(r[1] or ''), r[2]))
+
+        cur.execute("SELECT id, logradouro, cep, id_bairro FROM logradouros")
+        self.logradouros = self._load('logradouros', cur.fetchall(),
+                                      lambda r: (normalize_name(r[1] or ''), r[2], r[3]))
+
+    def _load(self, level: str, rows: list, key_of) -> dict:
+        index, self.duplicates[level] = _index(rows, key_of)
+        self.rows[level] = len(rows)
+        return index
+
+    def summary(self) -> str:
+        return (f"{len(self.estados)} estados, {len(self.cidades)} cidades, "
+                f"{len(self.bairros)} bairros, {len(self.logradouros)} logradouros")
+
+    def merge_report(self) -> dict:
+        """nível -> (linhas no banco, chaves distintas, linhas que seriam fundidas).
+
+        Só conta grafias equivalentes sob o mesmo pai (cidade no mesmo
+        estado, bairro na mesma cidade): pais duplicados não são fundidos.
+        """
+        return {level: (self.rows[level], self.rows[level] - merged, merged)
+                for level, merged in ((lv, sum(len(ids) - 1 for ids in g.values()))
+                                      for lv, g in self.duplicates.items())}
+
+    # ------------------------------------------------------------
+    # Normalização (mesmas regras dos get_or_create_* anteriores)
+    # ------------------------------------------------------------
+
+    @staticmethod
+    def key(uf, cidade, bairro, logradouro, cep) -> tuple:
+        """(uf, cidade, bairro, logradouro, cep) com defaults e cortes aplicados."""
+        uf = (uf or '').strip().upper()[:2] or DEFAULT_UF
+        cidade = (cidade or '').strip()[:100] or DEFAULT_CIDADE
+        bairro = (bairro or '').strip()[:100] or DEFAULT_BAIRRO
+        logradouro = (logradouro or '').strip()[:255] or DEFAULT_LOGRADOURO
+        cep = _NON_DIGIT.sub('', cep or '')[:8]
+        cep = cep.ljust(8, '0') if cep else DEFAULT_CEP
+        return uf, cidade, bairro, logradouro, cep
+
+    # ------------------------------------------------------------
+    # Resolução em lote
+    # ------------------------------------------------------------
+
+    def _insert_missing(self, table: str, sql: str, rows: list, cache: dict, cache_key):
+        """Um INSERT ... RETURNING com todas as linhas que faltam no nível."""
+        if not rows:
+            return
+        returned = psycopg2.extras.execute_values(self.cur, sql, rows, page_size=len(rows), fetch=True)
+        for r in returned:
+            k = cache_key(r)
+            cache[k] = r[0]
+            self._new.append((table, cache, k))
+        self.created[table] += len(returned)
+
+    # Transação: ids criados num lote desfeito não podem ficar no cache
+    def checkpoint(self) -> int:
+        return len(self._new)
+
+    def rollback(self, checkpoint: int = 0):
+        """Esquece o que foi criado depois do checkpoint (ROLLBACK [TO SAVEPOINT])."""
+        for table, cache, k in self._new[checkpoint:]:
+            del cache[k]
+            self.created[table] -= 1
+        del self._new[checkpoint:]
+
+    def commit(self):
+        self._new.clear()
+
+    def resolve_many(self, keys) -> dict:
+        """chave de key() -> logradouros.id, criando o que faltar nível a nível."""
+        keys = set(keys)
+
+        missing = {uf for uf, *_ in keys if uf not in self.estados}
+        self._insert_missing(
+            'estados', "INSERT INTO estados (uf, nome) VALUES %s RETURNING id, uf",
+            [(uf, uf) for uf in sorted(missing)], self.estados, lambda r: r[1].upper())
+
+        # Primeira grafia encontrada vira o nome gravado
+        cidade_key = {}
+        missing = {}
+        for key in keys:
+            k = cidade_key[key] = (normalize_name(key[1]), self.estados[key[0]])
+            if k not in self.cidades:
+                missing.setdefault(k, key[1])
+        self._insert_missing(
+            'cidades', "INSERT INTO cidades (nome, id_estado) VALUES %s RETURNING id, nome, id_estado",
+            [(nome, k[1]) for k, nome in missing.items()], self.cidades,
+            lambda r: (normalize_name(r[1] or ''), r[2]))
+
+        bairro_key = {}
+        missing = {}
+        for key in keys:
+            k = bairro_key[key] = (normalize_name(key[2]), self.cidades[cidade_key[key]])
+            if k not in self.bairros:
+                missing.setdefault(k, key[2])
+        self._insert_missing(
+            'bairros', "INSERT INTO bairros (nome, id_cidade) VALUES %s RETURNING id, nome, id_cidade",
+            [(nome, k[1]) for k, nome in missing.items()], self.bairros,
+            lambda r: (normalize_name(r[1] or ''), r[2]))
+
+        logr_key = {}
+        missing = {}
+        for key in keys:
+            k = logr_key[key] = (normalize_name(key[3]), key[4], self.bairros[bairro_key[key]])
+            if k not in self.logradouros:
+                missing.setdefault(k, key[3])
+        self._insert_missing(
+            'logradouros',
+            "INSERT INTO logradouros (logradouro, cep, id_bairro, created_at, updated_at) "
+            "VALUES %s RETURNING id, logradouro, cep, id_bairro",
+            [(logr, k[1], k[2], self.now, self.now) for k, logr in missing.items()],
+            self.logradouros, lambda r: (normalize_name(r[1] or ''), r[2], r[3]))
+
+        return {key: self.logradouros[logr_key[key]] for key in keys}
+
+
+class Placeholders:
+    """ids das linhas-sentinela de endereço ('SEM ENDERECO', 'SEM BAIRRO',
+    'SEM CIDADE', CEP 00000000), resolvidos numa consulta só.
+
+    Resolva uma vez por execução e repasse o objeto (ou só os ids) aos
+    passos; um id fica None se a sentinela não existir no banco.
+    """
+
+    def __init__(self, cur):
+        cur.execute("""
+            SELECT
+                (SELECT id FROM logradouros WHERE logradouro = %(logradouro)s
+                 ORDER BY cep = %(cep)s DESC, id LIMIT 1),
+                (SELECT id FROM bairros WHERE nome = %(bairro)s ORDER BY id LIMIT 1),
+                (SELECT id FROM cidades WHERE nome = %(cidade)s ORDER BY id LIMIT 1)
+        """, {'logradouro': DEFAULT_LOGRADOURO, 'cep': DEFAULT_CEP,
+              'bairro': DEFAULT_BAIRRO, 'cidade': DEFAULT_CIDADE})
+        self.logradouro_id, self.bairro_id, self.cidade_id = cur.fetchone()
+
+    def summary(self) -> str:
+        return (f"logradouro {self.logradouro_id}, bairro {self.bairro_id}, "
+                f"cidade {self.cidade_id}")
+
+
+def print_merge_report(resolver: AddressResolver, examples: int = 5):
+    print("Duplicatas por grafia (mesmo pai), fundidas pelo cache normalizado:")
+    for level, (rows, distinct, merged) in resolver.merge_report().items():
+        print(f"  {level:12s} {rows:7d} linhas, {distinct:7d} distintas, {merged:6d} fundidas")
+        groups = sorted(resolver.duplicates[level].items(), key=lambda kv: -len(kv[1]))
+        for k, ids in groups[:examples]:
+            name = ' '.join(k[0]) if isinstance(k, tuple) else k
+            print(f"      {name!r}: ids {ids[:8]}{' ...' if len(ids) > 8 else ''}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Relatório de endereços duplicados (sem gravar nada)")
+    ap.add_argument('--dsn', default=cfg.POSTGRES_DSN)
+    ap.add_argument('--exemplos', type=int, default=5, help="grupos listados por nível")
+    args = ap.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    try:
+        with conn.cursor() as cur:
+            print_merge_report(AddressResolver(cur, None), args.exemplos)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
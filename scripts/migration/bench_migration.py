@@ -0,0 +1,1086 @@
+#!/usr/bin/env python3
+"""
+bench_migration.py — Benchmarks dos componentes da migração (sem banco)
+
+Gera dados sintéticos no formato do mysqldump e mede os componentes
+isoladamente, comparando com a implementação anterior.
+
+Uso:
+  python3 bench_migration.py parser [--rows 500000]
+  python3 bench_migration.py index  [--rows 500000]
+  python3 bench_migration.py reader [--rows 500000]
+  python3 bench_migration.py stream [--rows 500000]
+  python3 bench_migration.py parallel [--rows 500000] [--workers 1,2,4,8]
+  python3 bench_migration.py idmap  [--entries 1000000]
+  python3 bench_migration.py rowspec [--rows 200000] [--repeat 3]
+  python3 bench_migration.py dates  [--rows 200000] [--dump DUMP]
+  python3 bench_migration.py money  [--rows 200000] [--repeat 3]
+  python3 bench_migration.py columnar [--rows 200000] [--repeat 3]
+  python3 bench_migration.py records [--rows 50000] [--dump DUMP]
+  python3 bench_migration.py cache  [--rows 391000] [--dump DUMP] [--table loclanctocc]
+  python3 bench_migration.py loader [--rows 391000] [--dsn POSTGRES_DSN]
+  python3 bench_migration.py pipeline [--rows 200000] [--depth 2] [--server-us 4] [--dsn POSTGRES_DSN]
+
+Os benchmarks que usam as transformações do hotfix importam
+hotfix_complete_migration (requer psycopg2 instalado, não requer banco).
+"""
+import argparse
+import os
+import pickle
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import closing
+
+sys.path.insert(0, os.path.dirname(__file__))
+import dump_parser
+import money
+from dump_index import DumpIndex
+from dump_parallel import iter_batches
+from dump_reader import DumpReader
+from id_map_store import IdMapStore
+from table_cache import TableCache
+
+ROWS_PER_INSERT = 1000
+
+
+# ============================================================
+# IMPLEMENTAÇÃO ANTERIOR (referência para comparação)
+# ============================================================
+
+def legacy_parse_mysql_values(line: str) -> list:
+    """Parser char a char usado até a v4.0 (hotfix_complete_migration.py)."""
+    idx = line.find('VALUES')
+    if idx == -1:
+        return []
+    data = line[idx + 6:].rstrip().rstrip(';')
+
+    rows = []
+    current_row = []
+    current_val = ''
+    in_string = False
+    escape_next = False
+    paren_depth = 0
+
+    for ch in data:
+        if escape_next:
+            current_val += ch
+            escape_next = False
+            continue
+        if ch == '\\':
+            escape_next = True
+            current_val += ch
+            continue
+        if ch == "'" and not in_string:
+            in_string = True
+            continue
+        if ch == "'" and in_string:
+            in_string = False
+            continue
+        if in_string:
+            current_val += ch
+            continue
+        if ch == '(':
+            paren_depth += 1
+            if paren_depth == 1:
+                current_row = []
+                current_val = ''
+            continue
+        if ch == ')':
+            paren_depth -= 1
+            if paren_depth == 0:
+                current_row.append(current_val.strip())
+                rows.append(tuple(current_row))
+                current_row = []
+                current_val = ''
+            continue
+        if ch == ',' and paren_depth == 1:
+            current_row.append(current_val.strip())
+            current_val = ''
+            continue
+        if paren_depth >= 1:
+            current_val += ch
+
+    return rows
+
+
+def legacy_safe_date(v):
+    """safe_date com strptime a cada chamada (antes da memorização)."""
+    from datetime import datetime
+    if not v or v in ('NULL', 'None', '0000-00-00', '1901-01-01'):
+        return None
+    v = v.strip()
+    try:
+        return datetime.strptime(v, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def legacy_parse_competencia(comp_str):
+    """parse_competencia sem memorização."""
+    from datetime import date
+    if not comp_str or comp_str == 'NULL':
+        return None
+    comp_str = comp_str.strip()
+    try:
+        if '/' in comp_str:
+            parts = comp_str.split('/')
+            return date(int(parts[1]), int(parts[0]), 1)
+        elif '-' in comp_str:
+            parts = comp_str.split('-')
+            return date(int(parts[0]), int(parts[1]), 1)
+    except (ValueError, IndexError):
+        pass
+    return date(2020, 1, 1)
+
+
+def legacy_transform_recibos(hf, rows, existing_recibos, verba_accum, now, stats):
+    """transform_recibos com posições fixas, antes do row_spec.py (sem as verbas)."""
+    for r in rows:
+        if len(r) < 20:
+            continue
+        recibo_id = r[0].strip()
+        if recibo_id in existing_recibos:
+            stats['skipped'] += 1
+            continue
+        inq_old = hf.safe_int(r[2])
+        competencia = hf.parse_competencia(r[3]) or hf.date(2020, 1, 1)
+        vencto = hf.safe_date(r[4]) or competencia
+        limite = hf.safe_date(r[5])
+        valor = money.to_cents(r[6])
+        situacao = hf.SITUACAO_MAP.get(hf.safe_int(r[7]), 'aberto')
+        datasit = hf.safe_date(r[8])
+        valorpago = money.to_cents(r[9])
+        multa = money.to_cents(r[13])
+        nrobancario = r[1].strip() if r[1].strip() else None
+        valor_total = valor + multa
+        text = money.cents_text
+        yield (
+            inq_old, inq_old, inq_old, inq_old, None, None, None, None,
+            recibo_id, nrobancario, competencia, datasit or vencto, vencto, limite,
+            text(valor), '0.00', '0.00', '0.00', '0.00', '0.00', '0.00', text(multa), 0, 0, 0, 0,
+            text(valor_total), text(valorpago), text(max(valor_total - valorpago, 0)),
+            situacao, 'aluguel', 'migracao_mysql', None, None, None, now, now
+        )
+
+
+def legacy_transform_lanctocc(hf, rows, now, stats):
+    """transform_lanctocc com posições fixas, antes do row_spec.py."""
+    for r in rows:
+        if len(r) < 15:
+            continue
+        data = hf.safe_date(r[1])
+        if not data:
+            stats['skipped'] += 1
+            continue
+        valor_cents = money.to_cents(r[7])
+        if valor_cents <= 0:
+            stats['skipped'] += 1
+            continue
+        valor = money.cents_text(valor_cents)
+        conta_cod = hf.safe_int(r[5])
+        sinal = r[8].strip().upper()
+        imovel_old = hf.safe_int(r[10])
+        inq_old = hf.safe_int(r[12])
+        historico = r[6].strip()[:255] if r[6] else None
+        yield (
+            None, imovel_old, inq_old, imovel_old, conta_cod, None, None, None, None, None,
+            data.replace(day=1), data, data, None,
+            valor, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, valor, valor, 0,
+            'pago', hf.TIPO_POR_SINAL.get(sinal, 'despesa'), 'extrato_cc_migracao',
+            None, historico, None, now, now, hf.safe_int(r[0]),
+        )
+
+
+def legacy_load_enderecos(reader):
+    """Carga do fix_enderecos_final.py antes do record_class: um dict por linha."""
+    inquilinos = {}
+    imoveis = {}
+    for r in reader.iter_values('locinquilino'):
+        if len(r) < 20:
+            continue
+        try:
+            codigo_int = int(r[0].strip())
+        except (ValueError, TypeError):
+            continue
+        inquilinos[codigo_int] = {
+            'imovel': int(r[2]) if r[2].strip().lstrip('-').isdigit() else 0,
+            'endac': r[14].strip(), 'complac': r[15].strip(), 'bairroac': r[16].strip(),
+            'cidadeac': r[17].strip(), 'estac': r[18].strip(), 'cepac': r[19].strip(),
+        }
+    for r in reader.iter_values('locimoveis'):
+        if len(r) < 16:
+            continue
+        try:
+            codigo_int = int(r[0].strip())
+        except (ValueError, TypeError):
+            continue
+        imoveis[codigo_int] = {
+            'endereco': r[7].strip(), 'numero': r[8].strip(), 'complemento': r[9].strip(),
+            'bairro': r[10].strip(), 'cidade': r[12].strip(), 'estado': r[13].strip(),
+            'cep': r[14].strip(),
+        }
+    return inquilinos, imoveis
+
+
+# ============================================================
+# DADOS SINTÉTICOS
+# ============================================================
+
+HISTORICOS = [
+    "ALUGUEL REF. 01/2019", "REPASSE PROPRIETARIO", "IPTU 3\\'A PARCELA",
+    "CONDOMINIO D''AVILA", "TAXA ADM. 10%", "AGUA/LUZ (SABESP, ENEL)",
+    "ESTORNO \\\\ AJUSTE", "",
+]
+
+
+def _rand_date(rnd):
+    if rnd.random() < 0.03:
+        return "'0000-00-00'"
+    return f"'{rnd.randint(2005, 2025)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}'"
+
+
+def synth_locrecibo_row(rnd, i):
+    return "(" + ",".join([
+        f"'{100000 + i}'", f"'{rnd.randint(0, 999999)}'", str(rnd.randint(1, 2200)),
+        f"'{rnd.randint(1, 12):02d}/{rnd.randint(2005, 2025)}'", _rand_date(rnd), _rand_date(rnd),
+        f"{rnd.randint(100, 900000) / 100:.2f}", str(rnd.randint(0, 5)), _rand_date(rnd),
+        f"{rnd.randint(0, 900000) / 100:.2f}", "0", "0.00", "0.00",
+        f"{rnd.randint(0, 9000) / 100:.2f}", "0", "1", "NULL", "341", "0", "0",
+        "'0000-00-00'", "0.00", "0.00", "0", "0", "'2020-01-01 10:00:00'",
+    ]) + ")"
+
+
+def synth_loclanctocc_row(rnd, i):
+    return "(" + ",".join([
+        str(i + 1), _rand_date(rnd), str(rnd.randint(1, 2000)), "0",
+        f"'{rnd.randint(1, 99999)}'", str(rnd.randint(1000, 1100)),
+        f"'{rnd.choice(HISTORICOS)}'", f"{rnd.randint(1, 900000) / 100:.2f}",
+        f"'{rnd.choice('CD')}'", f"'{rnd.randint(0, 99999)}'", str(rnd.randint(0, 3200)),
+        "0", str(rnd.randint(0, 2200)), "0", "'2020-01-01 10:00:00'", "NULL", "0",
+    ]) + ")"
+
+
+def synth_insert_lines(table, row_fn, n_rows, seed=42):
+    """Linhas INSERT estendidas com ROWS_PER_INSERT tuplas cada (como o mysqldump)."""
+    rnd = random.Random(seed)
+    lines = []
+    for start in range(0, n_rows, ROWS_PER_INSERT):
+        rows = [row_fn(rnd, i) for i in range(start, min(start + ROWS_PER_INSERT, n_rows))]
+        lines.append(f"INSERT INTO `{table}` VALUES " + ",".join(rows) + ";\n")
+    return lines
+
+
+def synth_dump_lines(n_rows):
+    """Metade locrecibo, metade loclanctocc."""
+    half = n_rows // 2
+    return (synth_insert_lines('locrecibo', synth_locrecibo_row, half)
+            + synth_insert_lines('loclanctocc', synth_loclanctocc_row, n_rows - half))
+
+
+def _rand_endereco(rnd):
+    """(logradouro, número, complemento, bairro, cidade, uf, cep) como texto SQL."""
+    return [f"'RUA {rnd.choice(('DAS FLORES', 'XV DE NOVEMBRO', 'S. BENTO'))} {rnd.randint(1, 500)}'",
+            f"'{rnd.randint(1, 3000)}'", rnd.choice(("''", "'APTO 12'", "'FUNDOS'")),
+            f"'BAIRRO {rnd.randint(1, 200)}'", rnd.choice(("'SAO PAULO'", "'SANTOS'", "'OSASCO'")),
+            "'SP'", f"'{rnd.randint(10**7, 10**8 - 1)}'"]
+
+
+def synth_locinquilino_row(rnd, i):
+    # 30% sem endereço próprio (cai no do imóvel)
+    endac = _rand_endereco(rnd) if rnd.random() > 0.3 else ["''"] * 7
+    return "(" + ",".join(
+        [str(i + 1), f"'INQUILINO {i + 1}'", str(rnd.randint(1, 20000))]
+        + [f"'campo {k}'" for k in range(3, 14)]
+        + [endac[0], endac[2], endac[3], endac[4], endac[5], endac[6]]
+        + ["'obs'"] * 10) + ")"
+
+
+def synth_locimoveis_row(rnd, i):
+    e = _rand_endereco(rnd)
+    return "(" + ",".join(
+        [str(i + 1)] + [f"'campo {k}'" for k in range(1, 7)]
+        + e[:4] + ["1"] + e[4:] + ["'obs'"] * 10) + ")"
+
+
+def synth_locfiadores_row(rnd, i):
+    return f"({i + 1},'FIADOR {i + 1}','CONJUGE {i + 1}','{rnd.randint(10**10, 10**11)}')"
+
+
+def write_synth_dump(path, n_rows):
+    """Dump sintético: CREATE TABLE + INSERTs de locrecibo/loclanctocc e um locfiadores pequeno."""
+    with open(path, 'w', encoding='latin-1') as f:
+        f.write("-- MySQL dump (sintético)\n")
+        f.write("CREATE TABLE `locfiadores` (\n  `codigo` int(11) NOT NULL,\n"
+                "  `nome` varchar(60) DEFAULT NULL,\n  `nomeconj` varchar(60) DEFAULT NULL,\n"
+                "  `cpfconj` varchar(14) DEFAULT NULL,\n  PRIMARY KEY (`codigo`)\n) ENGINE=MyISAM;\n")
+        f.writelines(synth_insert_lines('locfiadores', synth_locfiadores_row, 300))
+        f.writelines(synth_dump_lines(n_rows))
+
+
+def _timed(fn, lines):
+    t = time.perf_counter()
+    n = 0
+    for line in lines:
+        n += len(fn(line))
+    return n, time.perf_counter() - t
+
+
+# ============================================================
+# BENCHMARKS
+# ============================================================
+
+def bench_parser(args):
+    lines = synth_dump_lines(args.rows)
+    size_mb = sum(len(l) for l in lines) / 1e6
+    print(f"Parser VALUES: {args.rows} linhas sintéticas (locrecibo + loclanctocc), {size_mb:.1f} MB")
+
+    # Conferência: mesmas tuplas onde não há escapes (o parser antigo mantinha a barra)
+    for line in lines[:5] + lines[-5:]:
+        old = legacy_parse_mysql_values(line)
+        new = dump_parser.parse_mysql_values(line)
+        assert len(old) == len(new), "contagem de linhas divergente"
+        for a, b in zip(old, new):
+            assert len(a) == len(b), "contagem de campos divergente"
+
+    n_old, t_old = _timed(legacy_parse_mysql_values, lines)
+    n_new, t_new = _timed(dump_parser.parse_mysql_values, lines)
+    n_typ, t_typ = _timed(lambda l: dump_parser.parse_mysql_values(l, typed=True), lines)
+    assert n_old == n_new == n_typ == args.rows
+
+    print(f"  anterior (char a char): {t_old:7.2f}s  {n_old / t_old:>12,.0f} linhas/s")
+    print(f"  novo (csv + regex):     {t_new:7.2f}s  {n_new / t_new:>12,.0f} linhas/s  ({t_old / t_new:.1f}x)")
+    print(f"  novo tipado:            {t_typ:7.2f}s  {n_typ / t_typ:>12,.0f} linhas/s  ({t_old / t_typ:.1f}x)")
+
+
+def bench_index(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dump.sql')
+        write_synth_dump(path, args.rows)
+        print(f"Índice do dump: {os.path.getsize(path) / 1e6:.1f} MB sintéticos")
+
+        t = time.perf_counter()
+        n_scan = 0
+        with open(path, 'r', errors='replace') as f:
+            for line in f:
+                if 'INSERT INTO `locfiadores`' in line:
+                    n_scan += len(dump_parser.parse_mysql_values(line))
+        t_scan = time.perf_counter() - t
+
+        t = time.perf_counter()
+        DumpIndex.load_or_build(path)
+        t_build = time.perf_counter() - t
+
+        t = time.perf_counter()
+        index = DumpIndex.load_or_build(path)
+        n_idx = sum(1 for _ in index.iter_rows('locfiadores'))
+        t_idx = time.perf_counter() - t
+        assert n_scan == n_idx
+
+        print(f"  varredura completa (locfiadores): {t_scan * 1000:9.1f} ms")
+        print(f"  construção do índice (1x):        {t_build * 1000:9.1f} ms")
+        print(f"  índice salvo + seek (locfiadores): {t_idx * 1000:8.1f} ms")
+
+
+def _peak(fn):
+    """(resultado, segundos, pico MB) de fn().
+
+    Tempo medido numa execução sem tracemalloc (que distorce o tempo);
+    o pico vem de uma segunda execução sob tracemalloc.
+    """
+    t = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_reader(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dump.sql')
+        write_synth_dump(path, args.rows)
+        index = DumpIndex.load_or_build(path)
+        tables = ('locrecibo', 'loclanctocc')
+        print(f"STEP 1 (listas de {', '.join(tables)}): {args.rows} tuplas")
+
+        def eager_text():
+            out = {}
+            with open(path, 'r', errors='replace') as f:
+                for line in f:
+                    for t in tables:
+                        if f'INSERT INTO `{t}`' in line:
+                            out.setdefault(t, []).extend(dump_parser.parse_mysql_values(line))
+            return out
+
+        def lazy_mmap():
+            reader = DumpReader(path, index, cache=False)
+            return reader, {t: list(reader.iter_rows(t)) for t in tables}
+
+        eager, t_eager, m_eager = _peak(eager_text)
+        (reader, lazy), t_lazy, m_lazy = _peak(lazy_mmap)
+        assert [x.values() for x in lazy['loclanctocc'][:1000]] == eager['loclanctocc'][:1000]
+        print(f"  texto + tuplas de str: {t_eager:6.2f}s  pico {m_eager:8.1f} MB")
+        print(f"  mmap + LazyRow:        {t_lazy:6.2f}s  pico {m_lazy:8.1f} MB")
+        del eager, lazy
+        reader.close()
+
+
+def bench_stream(args):
+    from datetime import datetime
+    from itertools import islice
+    import hotfix_complete_migration as hf
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dump.sql')
+        write_synth_dump(path, args.rows)
+        index = DumpIndex.load_or_build(path)
+        now = datetime.now()
+        print(f"STEP 2 + STEP 4 (locrecibo + loclanctocc): {args.rows} tuplas, carga simulada")
+
+        def transforms(source):
+            stats = {'skipped': 0, 'with_verbas': 0}
+            yield from hf.transform_recibos(source('locrecibo'), set(), {}, now, stats)
+            yield from hf.transform_lanctocc(source('loclanctocc'), now, stats)
+
+        def sink(rows, started, batch_size=2000):
+            first = None
+            n = 0
+            it = iter(rows)
+            while True:
+                batch = list(islice(it, batch_size))
+                if not batch:
+                    return n, first
+                if first is None:
+                    first = time.perf_counter() - started
+                n += len(batch)
+
+        def materialized():
+            # Como antes: STEP 1 carrega todas as tabelas em listas
+            started = time.perf_counter()
+            with DumpReader(path, index, cache=False) as reader:
+                tables = {t: list(reader.iter_values(t)) for t in ('locrecibo', 'loclanctocc')}
+                return sink(list(transforms(tables.__getitem__)), started)
+
+        def streaming():
+            started = time.perf_counter()
+            with DumpReader(path, index, cache=False) as reader:
+                return sink(transforms(reader.iter_values), started)
+
+        (n_old, ttfi_old), t_old, m_old = _peak(materialized)
+        (n_new, ttfi_new), t_new, m_new = _peak(streaming)
+        assert n_old == n_new
+        print(f"  listas (antes):   {t_old:6.2f}s  1º lote após {ttfi_old:6.3f}s  pico {m_old:8.1f} MB")
+        print(f"  streaming:        {t_new:6.2f}s  1º lote após {ttfi_new:6.3f}s  pico {m_new:8.1f} MB")
+
+
+def bench_parallel(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dump.sql')
+        write_synth_dump(path, args.rows)
+        index = DumpIndex.load_or_build(path)
+        table = 'loclanctocc'
+        n = index.row_count(table)
+        print(f"Parse paralelo de {table}: {n} tuplas, {os.cpu_count()} CPUs")
+
+        reader = DumpReader(path, index, cache=False)
+        t = time.perf_counter()
+        expected = sum(1 for _ in reader.iter_values(table))
+        t_seq = time.perf_counter() - t
+        reader.close()
+        print(f"  sequencial (iter_values): {t_seq:6.2f}s  {expected / t_seq:>10,.0f} linhas/s")
+
+        # Custo que fica no processo pai (unpickle + desempacotar): limita o ganho
+        blobs = [pickle.dumps(b) for b in iter_batches(index, table, 2)]
+        t = time.perf_counter()
+        for blob in blobs:
+            pickle.loads(blob).rows()
+        t_parent = time.perf_counter() - t
+        print(f"  custo no pai por lote:    {t_parent:6.2f}s  (teto ~{t_seq / t_parent:.1f}x com CPUs livres)")
+
+        for workers in (int(w) for w in args.workers.split(',')):
+            for ordered in (True, False):
+                t = time.perf_counter()
+                got = sum(len(b.rows()) for b in iter_batches(index, table, workers, ordered))
+                elapsed = time.perf_counter() - t
+                assert got == expected
+                label = f"{workers} processo(s), {'ordenado' if ordered else 'sem ordem'}"
+                print(f"  {label:27s} {elapsed:6.2f}s  {got / elapsed:>10,.0f} linhas/s  "
+                      f"({t_seq / elapsed:.2f}x)")
+
+
+def bench_idmap(args):
+    import json
+    rnd = random.Random(7)
+    entities = ('locfiador', 'locinquilino', 'loclocador', 'locimovel', 'locrecibo')
+    per = args.entries // len(entities)
+    data = {e: {str(i): 100000 + i for i in range(1, per + 1)} for e in entities}
+    lookups = [(rnd.choice(entities), rnd.randint(1, per)) for _ in range(10000)]
+    new_batch = [(per + i, 900000 + i) for i in range(1, 1001)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'id_map.json')
+        with open(json_path, 'w') as f:
+            json.dump(data, f)
+        del data
+        print(f"Mapa de IDs: {per * len(entities)} entradas, id_map.json "
+              f"{os.path.getsize(json_path) / 1e6:.1f} MB")
+
+        def json_open():
+            with open(json_path) as f:
+                return json.load(f)
+        loaded, t_open, m_json = _peak(json_open)
+        t = time.perf_counter()
+        for e, k in lookups:
+            loaded[e].get(str(k))
+        t_get = time.perf_counter() - t
+        t = time.perf_counter()
+        loaded['locfiador'].update((str(k), v) for k, v in new_batch)
+        with open(json_path + '.new', 'w') as f:
+            json.dump(loaded, f)
+        t_save = time.perf_counter() - t
+        del loaded
+        print(f"  JSON   abrir {t_open * 1000:8.1f} ms  pico {m_json:7.1f} MB  "
+              f"10k consultas {t_get * 1000:6.1f} ms  +1000 e salvar {t_save * 1000:8.1f} ms")
+
+        db_path = os.path.join(tmp, 'id_map.sqlite3')
+        t = time.perf_counter()
+        with IdMapStore(db_path) as store:
+            store.import_json(json_path)
+        t_import = time.perf_counter() - t
+
+        store, t_open, m_db = _peak(lambda: IdMapStore(db_path))
+        t = time.perf_counter()
+        for e, k in lookups:
+            store.get_new_id(e, k)
+        t_get = time.perf_counter() - t
+        t = time.perf_counter()
+        store.put_many('locfiador', new_batch)
+        t_save = time.perf_counter() - t
+        assert store.get_new_id('locfiador', per + 1) == 900001
+        store.close()
+        print(f"  SQLite abrir {t_open * 1000:8.1f} ms  pico {m_db:7.1f} MB  "
+              f"10k consultas {t_get * 1000:6.1f} ms  +1000 (put_many) {t_save * 1000:6.1f} ms")
+        print(f"  (importação única do JSON: {t_import:.1f}s, arquivo "
+              f"{os.path.getsize(db_path) / 1e6:.1f} MB)")
+
+
+def bench_rowspec(args):
+    """STEP 2/STEP 4: laços com posições fixas vs extração gerada pelo RowSpec."""
+    from datetime import datetime
+    import hotfix_complete_migration as hf
+
+    now = datetime.now()
+    tables = {
+        'locrecibo': [r for line in synth_insert_lines('locrecibo', synth_locrecibo_row, args.rows)
+                      for r in dump_parser.parse_mysql_values(line)],
+        'loclanctocc': [r for line in synth_insert_lines('loclanctocc', synth_loclanctocc_row, args.rows)
+                        for r in dump_parser.parse_mysql_values(line)],
+    }
+    cases = (
+        ('STEP 2 locrecibo', tables['locrecibo'],
+         lambda rows, st: legacy_transform_recibos(hf, rows, set(), {}, now, st),
+         lambda rows, st: hf.transform_recibos(rows, set(), {}, now, st)),
+        ('STEP 4 loclanctocc', tables['loclanctocc'],
+         lambda rows, st: legacy_transform_lanctocc(hf, rows, now, st),
+         lambda rows, st: hf.transform_lanctocc(rows, now, st)),
+    )
+    print(f"Transformações: {args.rows} tuplas por tabela (já parseadas)")
+    print("  extração gerada para locrecibo:")
+    for line in hf.RECIBO_SPEC.source().splitlines():
+        print(f"      {line}")
+
+    for label, rows, old, new in cases:
+        stats = {'skipped': 0, 'with_verbas': 0}
+        assert list(old(rows, dict(stats))) == list(new(rows, dict(stats))), f"{label}: saída divergente"
+        timings = []
+        for fn in (old, new):
+            best = float('inf')
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                for _ in fn(rows, dict(stats)):
+                    pass
+                best = min(best, time.perf_counter() - t)
+            timings.append(best)
+        t_old, t_new = timings
+        print(f"  {label}:")
+        print(f"    posições fixas: {t_old:6.2f}s  {len(rows) / t_old:>10,.0f} linhas/s  "
+              f"{t_old / len(rows) * 1e6:5.2f} µs/linha")
+        print(f"    RowSpec:        {t_new:6.2f}s  {len(rows) / t_new:>10,.0f} linhas/s  "
+              f"{t_new / len(rows) * 1e6:5.2f} µs/linha  ({t_old / t_new:.2f}x)")
+
+
+def bench_dates(args):
+    """safe_date/parse_competencia: strptime por campo vs fatiamento + LRU."""
+    import hotfix_complete_migration as hf
+
+    # Campos de data como o hotfix os lê: sintéticos ou de um dump real
+    date_fields = {'locrecibo': ('vencto', 'limite', 'datasit'), 'loclanctocc': ('data',),
+                   'locrepasse': ('periodo1', 'periodo2', 'databaixa')}
+    if args.dump:
+        reader = DumpReader(args.dump, cache=False)
+        tables = {t: reader.iter_values(t) for t in date_fields}
+        columns = {t: reader.index.column_names(t) or hf.DUMP_COLUMNS[t] for t in date_fields}
+    else:
+        reader = None
+        tables = {t: (r for line in synth_insert_lines(t, fn, args.rows) for r in dump_parser.parse_mysql_values(line))
+                  for t, fn in (('locrecibo', synth_locrecibo_row), ('loclanctocc', synth_loclanctocc_row))}
+        columns = dict(hf.DUMP_COLUMNS)
+    dates = []
+    competencias = []
+    for table, rows in tables.items():
+        names = [c.lower() for c in columns[table]]
+        pos = [names.index(c) for c in date_fields[table]]
+        comp = names.index('competencia') if 'competencia' in names else None
+        for r in rows:
+            dates.extend(r[p] for p in pos if p < len(r))
+            if comp is not None and comp < len(r):
+                competencias.append(r[comp])
+    if reader:
+        reader.close()
+    print(f"Datas: {len(dates)} campos ({len(set(dates))} distintos), "
+          f"{len(competencias)} competências ({len(set(competencias))} distintas)"
+          + (f" de {args.dump}" if args.dump else " sintéticos"))
+
+    for label, values, old, new in (('safe_date', dates, legacy_safe_date, hf.safe_date),
+                                    ('parse_competencia', competencias, legacy_parse_competencia,
+                                     hf.parse_competencia)):
+        if not values:
+            continue
+        new.cache_clear()
+        assert [old(v) for v in values] == [new(v) for v in values], f"{label}: resultado divergente"
+        new.cache_clear()
+        t = time.perf_counter()
+        for v in values:
+            old(v)
+        t_old = time.perf_counter() - t
+        t = time.perf_counter()
+        for v in values:
+            new(v)
+        t_new = time.perf_counter() - t
+        info = new.cache_info()
+        print(f"  {label}:")
+        print(f"    antes (sem cache): {t_old:6.2f}s  {t_old / len(values) * 1e9:7.0f} ns/campo")
+        print(f"    LRU:               {t_new:6.2f}s  {t_new / len(values) * 1e9:7.0f} ns/campo  "
+              f"({t_old / t_new:.1f}x, {info.hits / len(values):.1%} acertos, {info.currsize} em cache)")
+
+
+def bench_money(args):
+    """Valores monetários: float vs centavos inteiros (vazão e conciliação)."""
+    from decimal import ROUND_HALF_UP, Decimal
+    import pipeline
+
+    rows = [r for line in synth_insert_lines('locrecibo', synth_locrecibo_row, args.rows)
+            for r in dump_parser.parse_mysql_values(line)]
+    values = [v for r in rows for v in (r[6], r[9], r[13])]
+    print(f"Valores monetários: {len(values)} campos de {len(rows)} recibos sintéticos")
+
+    def best(fn):
+        t_best = float('inf')
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            fn()
+            t_best = min(t_best, time.perf_counter() - t)
+        return t_best
+
+    floats = [float(v) for v in values]
+    cents = money.cents_column(values)
+    timings = (
+        ('parse float()', lambda: [float(v) for v in values]),
+        ('parse to_cents()', lambda: [money.to_cents(v) for v in values]),
+        ('parse cents_column()', lambda: money.cents_column(values)),
+        ('texto COPY (float)', lambda: [pipeline.copy_text(f) for f in floats]),
+        ('texto COPY (centavos)', lambda: [money.cents_text(c) for c in cents]),
+    )
+    for label, fn in timings:
+        t = best(fn)
+        print(f"  {label:22s} {t:6.3f}s  {t / len(values) * 1e9:6.0f} ns/valor")
+
+    # Conciliação: o que o PostgreSQL gravaria em numeric(15,2) a partir do
+    # float (float8 -> numeric com 15 dígitos) vs o valor exato em centavos
+    def pg_numeric(f):
+        return Decimal(format(f, '.15g')).quantize(Decimal('0.01'), ROUND_HALF_UP)
+
+    diffs = {'valor_total': 0, 'valor_saldo': 0, 'soma de verbas': 0}
+    for r in rows:
+        valor, pago, multa = (float(x) for x in (r[6], r[9], r[13]))
+        c_valor, c_pago, c_multa = (money.to_cents(x) for x in (r[6], r[9], r[13]))
+        total, c_total = valor + multa, c_valor + c_multa
+        if pg_numeric(total) != Decimal(money.cents_text(c_total)):
+            diffs['valor_total'] += 1
+        if pg_numeric(max(total - pago, 0)) != Decimal(money.cents_text(max(c_total - c_pago, 0))):
+            diffs['valor_saldo'] += 1
+    # Verbas: várias parcelas somadas com += e round(total, 2) no fim
+    for i in range(0, len(values) - 6, 7):
+        part = values[i:i + 7]
+        acc = 0.0
+        for v in part:
+            acc += float(v)
+        if pg_numeric(round(acc, 2)) != Decimal(money.cents_text(sum(map(money.to_cents, part)))):
+            diffs['soma de verbas'] += 1
+    print("  Conciliação float -> numeric(15,2) vs centavos (linhas divergentes):")
+    for label, n in diffs.items():
+        print(f"    {label:15s} {n}")
+
+
+def bench_columnar(args):
+    """STEP 4: tuplas vs lotes colunares (memória por 100k linhas e vazão)."""
+    from datetime import datetime
+    import hotfix_complete_migration as hf
+    import pipeline
+
+    rows = [r for line in synth_insert_lines('loclanctocc', synth_loclanctocc_row, args.rows)
+            for r in dump_parser.parse_mysql_values(line)]
+    now = datetime.now()
+
+    def tuples():
+        return list(hf.transform_lanctocc(rows, now, {'skipped': 0}))
+
+    def batches():
+        return list(hf.transform_lanctocc_batches(rows, now, {'skipped': 0}))
+
+    def best(fn):
+        t_best = float('inf')
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            result = fn()
+            t_best = min(t_best, time.perf_counter() - t)
+        return result, t_best
+
+    def retained(fn):
+        """Bytes alocados por fn() que continuam vivos no resultado."""
+        tracemalloc.start()
+        result = fn()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del result
+        return current
+
+    tuple_rows, t_tuple = best(tuples)
+    column_batches, t_columnar = best(batches)
+    n = len(tuple_rows)
+    print(f"STEP 4 (loclanctocc): {len(rows)} linhas do dump -> {n} lançamentos, "
+          f"lotes de {hf.COLUMNAR_BATCH_ROWS}")
+
+    text_tuple, s_tuple = best(lambda: pipeline.CopyStream(tuple_rows).read())
+    text_columnar, s_columnar = best(
+        lambda: pipeline.ChunkStream(b.copy_text() for b in column_batches).read())
+    # Mesmo texto e mesmas tuplas nos dois caminhos: test_columnar.py
+
+    mem_tuple, mem_columnar = retained(tuples), retained(batches)
+    arrays = sum(b.nbytes() for b in column_batches)
+    per_100k = 100000 / n / 1e6
+    print(f"  {'':22s} {'transform':>10s} {'COPY texto':>11s} {'total':>8s} {'MB/100k':>8s}")
+    for label, t, s_, mem in (('tuplas', t_tuple, s_tuple, mem_tuple),
+                              ('lotes colunares', t_columnar, s_columnar, mem_columnar)):
+        print(f"  {label:22s} {t:9.3f}s {s_:10.3f}s {t + s_:7.3f}s {mem * per_100k:8.1f}")
+    print(f"  transform: {n / t_tuple / 1e3:.0f}k vs {n / t_columnar / 1e3:.0f}k linhas/s "
+          f"({t_tuple / t_columnar:.2f}x); transform + COPY: "
+          f"{(t_tuple + s_tuple) / (t_columnar + s_columnar):.2f}x")
+    print(f"  memória: {mem_tuple / mem_columnar:.1f}x menor "
+          f"(arrays dos lotes: {arrays * per_100k:.1f} MB/100k)")
+
+
+def bench_records(args):
+    """fix_enderecos_final: dict por linha vs registros com __slots__ (memória e acesso)."""
+    import fix_enderecos_final as fe
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.dump
+        if not path:
+            path = os.path.join(tmp, 'dump.sql')
+            with open(path, 'w', encoding='latin-1') as f:
+                f.writelines(synth_insert_lines('locinquilino', synth_locinquilino_row, args.rows))
+                f.writelines(synth_insert_lines('locimoveis', synth_locimoveis_row, args.rows // 2))
+        reader = DumpReader(path, cache=False)
+
+        def load_dicts():
+            return legacy_load_enderecos(reader)
+
+        def load_records():
+            return (fe.load_records(reader, fe.INQUILINO_SPEC, fe.INQUILINO_SHARED),
+                    fe.load_records(reader, fe.IMOVEL_SPEC, fe.IMOVEL_SHARED))
+
+        results = {}
+        for label, fn in (('dict por linha', load_dicts), ('__slots__', load_records)):
+            t = time.perf_counter()
+            inquilinos, imoveis = fn()
+            elapsed = time.perf_counter() - t
+            del inquilinos, imoveis
+            tracemalloc.start()
+            inquilinos, imoveis = fn()
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[label] = (inquilinos, imoveis, elapsed, retained, peak)
+        reader.close()
+
+    d_inq, d_im = results['dict por linha'][:2]
+    r_inq, r_im = results['__slots__'][:2]
+    n = len(d_inq) + len(d_im)
+    print(f"Endereços: {len(d_inq)} locinquilino + {len(d_im)} locimoveis"
+          + (f" de {args.dump}" if args.dump else " sintéticos"))
+
+    # Mesmos valores campo a campo (numero: o script convertia depois)
+    for codigo, d in d_inq.items():
+        rec = r_inq[codigo]
+        assert all(getattr(rec, k) == v for k, v in d.items()), codigo
+    for codigo, d in d_im.items():
+        rec = r_im[codigo]
+        assert all(getattr(rec, k) == v for k, v in d.items() if k != 'numero'), codigo
+
+    for label, (_, _, elapsed, retained, peak) in results.items():
+        print(f"  {label:15s} carga {elapsed:6.2f}s  retido {retained / 1e6:7.1f} MB "
+              f"({retained / n:5.0f} B/linha)  pico {peak / 1e6:7.1f} MB")
+    ratio = results['dict por linha'][3] / results['__slots__'][3]
+    print(f"  memória retida: {ratio:.1f}x menor")
+
+    # Acesso: os 6 campos de endereço do inquilino, como no passo 4 do script
+    fields = ('endac', 'complac', 'bairroac', 'cidadeac', 'estac', 'cepac')
+    t = time.perf_counter()
+    for d in d_inq.values():
+        for k in fields:
+            d[k]
+    t_dict = time.perf_counter() - t
+    t = time.perf_counter()
+    for rec in r_inq.values():
+        rec.endac, rec.complac, rec.bairroac, rec.cidadeac, rec.estac, rec.cepac
+    t_rec = time.perf_counter() - t
+    per = len(d_inq) * len(fields) / 1e9
+    print(f"  acesso por campo: dict {t_dict / per:.0f} ns, __slots__ + conversão {t_rec / per:.0f} ns")
+
+
+def bench_cache(args):
+    """Cache de tabelas parseadas: parse do dump vs 1ª execução (grava) vs seguintes (lê)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.dump
+        if not path:
+            path = os.path.join(tmp, 'dump.sql')
+            with open(path, 'w', encoding='latin-1') as f:
+                f.writelines(synth_insert_lines(args.table, synth_loclanctocc_row, args.rows))
+        index = DumpIndex.load_or_build(path)
+        cache = TableCache(os.path.join(tmp, 'cache'), max_bytes=1 << 40)
+
+        def run(reader_cache):
+            """Consome a tabela em streaming, como os passos do hotfix."""
+            with DumpReader(path, index, cache=reader_cache) as reader:
+                t = time.perf_counter()
+                n = sum(1 for _ in reader.iter_values(args.table))
+                return n, time.perf_counter() - t
+
+        n, t_parse = run(False)
+        _, t_cold = run(cache)
+        _, t_warm = run(cache)
+        # Ida e volta, LRU e invalidação: test_table_cache.py
+        with DumpReader(path, index, cache=False) as reader:
+            parsed = list(reader.iter_values(args.table))
+        size = sum(s for _, s, _ in cache.entries())
+        dump_mb = sum(s[1] for s in index.statements.get(args.table, ())) / 1e6
+        print(f"{args.table}: {n} tuplas, {dump_mb:.1f} MB de INSERTs, "
+              f"cache {size / 1e6:.1f} MB")
+        print(f"  parse (sem cache):      {t_parse:6.2f}s")
+        print(f"  1ª execução (grava):    {t_cold:6.2f}s")
+        print(f"  seguintes (lê cache):   {t_warm:6.2f}s  ({t_parse / t_warm:.1f}x)")
+
+        # Limite de tamanho: outra "versão do dump" no mesmo diretório tira a mais antiga
+        small = TableCache(cache.directory, max_bytes=int(size * 1.5))
+        list(small.store({'outro': 'dump'}, args.table, 'latin-1', parsed))
+        print(f"  LRU com limite {small.max_bytes / 1e6:.1f} MB: {small.summary()}")
+
+
+def bench_loader(args):
+    """COPY vs execute_values para o STEP 4 (loclanctocc). Sem --dsn, mede só a serialização."""
+    from datetime import datetime
+    import hotfix_complete_migration as hf
+    import pipeline
+
+    lines = synth_insert_lines('loclanctocc', synth_loclanctocc_row, args.rows)
+    now = datetime.now()
+    rows = list(hf.transform_lanctocc(
+        (r for line in lines for r in dump_parser.parse_mysql_values(line)),
+        now, {'skipped': 0}))
+    print(f"Carga STEP 4: {len(rows)} linhas de lancamentos_financeiros")
+
+    t = time.perf_counter()
+    size = len(pipeline.CopyStream(rows).read())
+    t_ser = time.perf_counter() - t
+    print(f"  serialização COPY: {t_ser:6.2f}s  ({size / 1e6:.0f} MB de texto)")
+
+    if not args.dsn:
+        print("  (sem --dsn: carga no banco não medida)")
+        return
+
+    import psycopg2
+    conn = psycopg2.connect(args.dsn)
+    for backend in ('execute_values', 'copy'):
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS bench_lancamentos")
+            cur.execute("CREATE UNLOGGED TABLE bench_lancamentos (LIKE lancamentos_financeiros INCLUDING DEFAULTS)")
+        conn.commit()
+        t = time.perf_counter()
+        report = pipeline.load_rows(conn, backend, 'bench_lancamentos', hf.LF_COLUMNS, rows,
+                                    2000, 50000, backend)
+        elapsed = time.perf_counter() - t
+        print(f"  {backend:15s} {elapsed:7.2f}s  {report.rows / elapsed:>10,.0f} linhas/s")
+    with conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS bench_lancamentos")
+    conn.commit()
+    conn.close()
+
+
+def bench_pipeline(args):
+    """STEP 2 (locrecibo): transformação e gravação em sequência vs produtor/consumidor."""
+    from datetime import datetime
+    import hotfix_complete_migration as hf
+    import pipeline
+
+    lines = synth_insert_lines('locrecibo', synth_locrecibo_row, args.rows)
+    now = datetime.now()
+
+    def rows():
+        stats = {'skipped': 0, 'with_verbas': 0}
+        return hf.transform_recibos((r for line in lines for r in dump_parser.parse_mysql_values(line)),
+                                    set(), {}, now, stats)
+
+    if args.dsn:
+        import psycopg2
+        conn = psycopg2.connect(args.dsn)
+        print(f"Pipeline STEP 2: {args.rows} recibos -> COPY em {args.dsn}")
+        for depth in (0, args.depth):
+            with conn.cursor() as cur:
+                cur.execute("DROP TABLE IF EXISTS bench_lancamentos")
+                cur.execute("CREATE UNLOGGED TABLE bench_lancamentos "
+                            "(LIKE lancamentos_financeiros INCLUDING DEFAULTS)")
+            conn.commit()
+            report = pipeline.load_copy(conn, 'bench_lancamentos', hf.LF_COLUMNS, rows(),
+                                        5000, f"depth={depth}", depth=depth)
+            print(report.summary())
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS bench_lancamentos")
+        conn.commit()
+        conn.close()
+        return
+
+    # Sem banco: um "servidor" que lê o COPY e espera --server-us µs por
+    # linha, como a espera de rede/disco (sem GIL) do psycopg2
+    class SimulatedServer:
+        def cursor(self):
+            return self
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        def copy_expert(self, sql, stream, size=8192):
+            self.rowcount = stream.read().count('\n')
+            time.sleep(self.rowcount * args.server_us / 1e6)
+
+        def commit(self):
+            pass
+
+    print(f"Pipeline STEP 2: {args.rows} recibos sintéticos, servidor simulado "
+          f"({args.server_us} µs/linha)")
+    elapsed = {}
+    for depth in (0, args.depth):
+        report = pipeline.load_copy(SimulatedServer(), 'bench_lancamentos', hf.LF_COLUMNS, rows(),
+                                    5000, f"depth={depth}", depth=depth)
+        elapsed[depth] = time.perf_counter() - report.started
+        print(report.summary())
+    print(f"  produtor/consumidor: {elapsed[0] / elapsed[args.depth]:.2f}x")
+
+    # Erro no gravador: a thread do produtor para e o erro chega a quem chamou
+    report = pipeline.LoadReport('erro')
+    try:
+        with closing(report.iter_batches(rows(), 1000, args.depth)) as batches:
+            for i, batch in enumerate(batches):
+                if i == 2:
+                    raise RuntimeError("falha simulada na gravação")
+    except RuntimeError as e:
+        alive = [t.name for t in threading.enumerate() if t.name.startswith('prefetch')]
+        print(f"  erro propagado: {e!r}; threads do produtor vivas: {len(alive)}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest='cmd', required=True)
+
+    p = sub.add_parser('parser', help='parse_mysql_values: char a char vs novo parser')
+    p.add_argument('--rows', type=int, default=500000)
+    p.set_defaults(func=bench_parser)
+
+    p = sub.add_parser('index', help='varredura completa vs índice de offsets')
+    p.add_argument('--rows', type=int, default=500000)
+    p.set_defaults(func=bench_index)
+
+    p = sub.add_parser('reader', help='leitura texto/tuplas vs mmap/LazyRow (tempo e memória)')
+    p.add_argument('--rows', type=int, default=500000)
+    p.set_defaults(func=bench_reader)
+
+    p = sub.add_parser('stream', help='STEP 1 em listas vs pipeline de geradores')
+    p.add_argument('--rows', type=int, default=500000)
+    p.set_defaults(func=bench_stream)
+
+    p = sub.add_parser('parallel', help='parse de uma tabela em 1/2/4/8 processos')
+    p.add_argument('--rows', type=int, default=500000)
+    p.add_argument('--workers', default='1,2,4,8')
+    p.set_defaults(func=bench_parallel)
+
+    p = sub.add_parser('idmap', help='id_map.json vs IdMapStore (SQLite)')
+    p.add_argument('--entries', type=int, default=1000000)
+    p.set_defaults(func=bench_idmap)
+
+    p = sub.add_parser('rowspec', help='transformações com posições fixas vs RowSpec (STEP 2/4)')
+    p.add_argument('--rows', type=int, default=200000)
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_rowspec)
+
+    p = sub.add_parser('dates', help='safe_date/parse_competencia: strptime vs fatiamento + LRU')
+    p.add_argument('--rows', type=int, default=200000)
+    p.add_argument('--dump', help='mede sobre as datas de um dump real em vez das sintéticas')
+    p.set_defaults(func=bench_dates)
+
+    p = sub.add_parser('money', help='valores em float vs centavos inteiros (vazão e conciliação)')
+    p.add_argument('--rows', type=int, default=200000)
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_money)
+
+    p = sub.add_parser('columnar', help='tuplas vs lotes colunares no STEP 4 (memória e vazão)')
+    p.add_argument('--rows', type=int, default=200000)
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_columnar)
+
+    p = sub.add_parser('records', help='fix_enderecos: dict por linha vs registros __slots__ (memória)')
+    p.add_argument('--rows', type=int, default=50000, help='linhas de locinquilino (metade de locimoveis)')
+    p.add_argument('--dump', help='usar locinquilino/locimoveis de um dump real')
+    p.set_defaults(func=bench_records)
+
+    p = sub.add_parser('cache', help='parse do dump vs cache de tabelas parseadas (table_cache.py)')
+    p.add_argument('--rows', type=int, default=391000)
+    p.add_argument('--dump', help='medir uma tabela de um dump real')
+    p.add_argument('--table', default='loclanctocc')
+    p.set_defaults(func=bench_cache)
+
+    p = sub.add_parser('loader', help='COPY vs execute_values (STEP 4)')
+    p.add_argument('--rows', type=int, default=391000)
+    p.add_argument('--dsn', help='PostgreSQL com o schema do AlmasaStudio (tabela temporária)')
+    p.set_defaults(func=bench_loader)
+
+    p = sub.add_parser('pipeline', help='STEP 2 em sequência vs produtor/consumidor (ocupação)')
+    p.add_argument('--rows', type=int, default=200000)
+    p.add_argument('--depth', type=int, default=2, help='lotes na fila entre os estágios')
+    p.add_argument('--server-us', type=float, default=4.0, help='µs/linha simulados no servidor')
+    p.add_argument('--dsn', help='PostgreSQL com o schema do AlmasaStudio (tabela temporária)')
+    p.set_defaults(func=bench_pipeline)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+columnar.py — Lotes colunares para as linhas financeiras (array + máscara de nulos)
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Uma linha de lancamentos_financeiros como tupla são ~38 slots de objeto
+Python, com float/date/str próprios em cada um. ColumnBatch guarda um lote
+por coluna:
+
+  - ConstColumn:  o mesmo valor em todas as linhas (0, NULL, 'pago', now);
+  - IntColumn:    array('q') + máscara de nulos (bytearray, 1 = NULL);
+  - CentsColumn:  IntColumn de centavos, serializada como numeric (money.py);
+  - DateColumn:   array('l') de ordinais de data + máscara de nulos;
+  - DictColumn:   códigos array('l') num dicionário de valores (historico,
+                  tipo_lancamento...); código -1 = NULL.
+
+As transformações montam cada coluna com uma compreensão sobre o lote (em
+vez de uma tupla por linha) e copy_text() serializa o lote direto no
+formato texto do COPY: cada coluna vira sua lista de campos (constantes e
+valores do dicionário são convertidos uma vez só) e as linhas saem de um
+zip. rows() devolve as tuplas, para quem ainda precisa delas.
+
+Uso:
+    batch = ColumnBatch(LF_CC_COLUMNS, n, {'valor_total': CentsColumn(valores), ...})
+    copy_chunks(cur, 'tmp', LF_CC_COLUMNS, (b.copy_text() for b in batches))
+"""
+
+from array import array
+from datetime import date
+
+from money import cents_text
+from pipeline import copy_text
+
+NULL = '\\N'
+
+
+def null_mask(values) -> bytearray:
+    """Máscara de nulos (1 = NULL) de uma sequência com None."""
+    return bytearray(v is None for v in values)
+
+
+class ConstColumn:
+    def __init__(self, value):
+        self.value = value
+
+    def texts(self, n: int) -> list:
+        return [copy_text(self.value)] * n
+
+    def values(self, n: int) -> list:
+        return [self.value] * n
+
+    def nbytes(self) -> int:
+        return 0
+
+
+class IntColumn:
+    """Inteiros num array('q'); None vira 0 no array e 1 na máscara."""
+
+    def __init__(self, values):
+        values = list(values)
+        self.data = array('q', (0 if v is None else v for v in values))
+        self.nulls = null_mask(values) if None in values else None
+
+    def _text(self, v) -> str:
+        return str(v)
+
+    def texts(self, n: int) -> list:
+        text = self._text
+        out = [text(v) for v in self.data]
+        if self.nulls is not None:
+            for i, is_null in enumerate(self.nulls):
+                if is_null:
+                    out[i] = NULL
+        return out
+
+    def values(self, n: int) -> list:
+        out = self.data.tolist()
+        if self.nulls is not None:
+            for i, is_null in enumerate(self.nulls):
+                if is_null:
+                    out[i] = None
+        return out
+
+    def nbytes(self) -> int:
+        return self.data.itemsize * len(self.data) + (len(self.nulls) if self.nulls else 0)
+
+
+class CentsColumn(IntColumn):
+    """Valores monetários em centavos; saem como texto numeric ('12.34')."""
+
+    def _text(self, v) -> str:
+        return cents_text(v)
+
+    def values(self, n: int) -> list:
+        return [None if v is None else cents_text(v) for v in super().values(n)]
+
+
+class DateColumn:
+    """Datas como ordinais (date.toordinal) num array('l')."""
+
+    def __init__(self, values):
+        values = list(values)
+        self.data = array('l', (0 if d is None else d.toordinal() for d in values))
+        self.nulls = null_mask(values) if None in values else None
+
+    def _decode(self, convert) -> list:
+        cache = {}
+        out = []
+        for o in self.data:
+            v = cache.get(o)
+            if v is None:
+                v = cache[o] = convert(date.fromordinal(o)) if o else None
+            out.append(v)
+        if self.nulls is not None:
+            for i, is_null in enumerate(self.nulls):
+                if is_null:
+                    out[i] = None
+        return out
+
+    def texts(self, n: int) -> list:
+        return [NULL if t is None else t for t in self._decode(date.isoformat)]
+
+    def values(self, n: int) -> list:
+        return self._decode(lambda d: d)
+
+    def nbytes(self) -> int:
+        return self.data.itemsize * len(self.data) + (len(self.nulls) if self.nulls else 0)
+
+
+class DictColumn:
+    """Strings repetidas codificadas num dicionário; código -1 = NULL."""
+
+    def __init__(self, values):
+        codes = {}
+        self.dictionary = []
+        data = array('l')
+        for v in values:
+            if v is None:
+                data.append(-1)
+                continue
+            code = codes.get(v)
+            if code is None:
+                code = codes[v] = len(self.dictionary)
+                self.dictionary.append(v)
+            data.append(code)
+        self.data = data
+
+    def texts(self, n: int) -> list:
+        lookup = [copy_text(v) for v in self.dictionary] + [NULL]  # -1 -> NULL
+        return [lookup[c] for c in self.data]
+
+    def values(self, n: int) -> list:
+        lookup = self.dictionary + [None]
+        return [lookup[c] for c in self.data]
+
+    def nbytes(self) -> int:
+        return self.data.itemsize * len(self.data)
+
+
+class ColumnBatch:
+    """Lote de `n` linhas com as `columns` na ordem do destino."""
+
+    def __init__(self, columns, n: int, data: dict):
+        missing = [c for c in columns if c not in data]
+        if missing:
+            raise KeyError(f"colunas sem dados no lote: {', '.join(missing)}")
+        self.columns = tuple(columns)
+        self.n = n
+        self.data = data
+
+    def __len__(self):
+        return self.n
+
+    def copy_text(self) -> str:
+        """Lote no formato texto do COPY (uma linha por registro)."""
+        if not self.n:
+            return ''
+        fields = [self.data[c].texts(self.n) for c in self.columns]
+        return '\n'.join(map('\t'.join, zip(*fields))) + '\n'
+
+    def rows(self):
+        """Tuplas na ordem de `columns` (mesmos valores do caminho por tupla)."""
+        return zip(*(self.data[c].values(self.n) for c in self.columns))
+
+    def nbytes(self) -> int:
+        """Bytes dos arrays do lote (sem os dicionários e constantes)."""
+        unique = {id(col): col for col in self.data.values()}  # colunas compartilhadas
+        return sum(col.nbytes() for col in unique.values())
@@ -45,6 +45,7 @@ LOG_DIR = os.getenv(
 )
 
 ID_MAP_FILE = os.path.join(LOG_DIR, "id_map.json")
+ID_MAP_DB = os.path.join(LOG_DIR, "id_map.sqlite3")  # id_map_store.IdMapStore
 PHASES_DONE_FILE = os.path.join(LOG_DIR, "phases_done.json")
 
 # ============================================================
@@ -55,6 +56,35 @@ BATCH_SIZE = 500
 DRY_RUN = False
 STOP_ON_ERROR = False
 
+# Carga em massa: "copy" (COPY FROM STDIN) ou "execute_values" (INSERT em lotes)
+LOADER_BACKEND = os.getenv("MIGRATION_LOADER", "copy")
+COPY_BATCH_SIZE = 50000
+
+# Lotes montados à frente da gravação (parse + transformação numa thread
+# enquanto o banco grava o lote anterior); 0 = tudo em sequência
+PIPELINE_DEPTH = int(os.getenv("MIGRATION_PIPELINE_DEPTH", "2"))
+
+# Reimportação do hotfix: "incremental" (só a diferença pela chave de origem)
+# ou "full" (apaga as linhas migradas e recarrega tudo)
+IMPORT_MODE = os.getenv("MIGRATION_IMPORT_MODE", "incremental")
+
+# Processos simultâneos nos passos independentes do hotfix (1 = sequencial)
+HOTFIX_WORKERS = int(os.getenv("MIGRATION_WORKERS", "4"))
+
+# Processos de parse por tabela grande (loclanctocc, locrechist); 1 = sem pool
+PARSE_WORKERS = int(os.getenv("MIGRATION_PARSE_WORKERS", "1"))
+
+# Tabelas já parseadas do dump (table_cache.py), reaproveitadas entre scripts
+# e execuções; chave = impressão digital do dump + versão do parser. Acima do
+# limite saem as menos usadas; 0 desliga o cache.
+TABLE_CACHE_DIR = os.path.join(LOG_DIR, "dump_cache")
+TABLE_CACHE_MAX_MB = int(os.getenv("MIGRATION_TABLE_CACHE_MB", "2048"))
+
+# Transformações do hotfix: "python" (linha a linha, carga do resultado) ou
+# "sql" (ELT: dump copiado para STAGING_SCHEMA e transformado em SQL)
+TRANSFORM_MODE = os.getenv("MIGRATION_TRANSFORM", "python")
+STAGING_SCHEMA = "mysql_staging"
+
 # ============================================================
 # MAPEAMENTOS DE DOMÍNIO
 # ============================================================
@@ -158,6 +188,31 @@ PHASES = [
     ("18",   "locrepasse",        "prestacoes_contas",        "Repasses -> Prestações de Contas"),
 ]
 
+# Dependências entre fases (fase -> fases que precisam terminar antes).
+# Usado por scheduler.py para rodar fases independentes em paralelo; fase
+# sem entrada aqui depende da anterior em PHASES.
+PHASE_DEPENDS = {
+    "00": (),
+    "01": ("00",),
+    "02": ("01",),
+    "03": ("02",),
+    "04": ("00",),
+    "05": ("00",),
+    "06": ("05",),
+    "07": ("06",),
+    "08": ("03", "07"),           # locadores: endereço + conta bancária
+    "09": ("07",),
+    "10": ("07",),
+    "11": ("07",),
+    "12": ("08", "11"),
+    "13": ("09", "10", "12"),     # inquilinos: fiadores, contratantes, imóveis
+    "14": ("04", "13"),
+    "15": ("14",),
+    "16": ("04", "13"),
+    "17": ("14",),
+    "18": ("13",),
+}
+
 # ============================================================
 # IDs DE PARAMETRIZAÇÃO — CONFIRMADOS em 2026-02-21
 # ============================================================
@@ -0,0 +1,170 @@
+"""
+dump_index.py — Índice de offsets do dump MySQL (varredura única)
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Varre o dump UMA vez e registra, para cada INSERT, (tabela, offset em bytes,
+tamanho, nº de tuplas) e, para cada CREATE TABLE, a lista de colunas. O
+índice é salvo ao lado do dump (<dump>.index.json) com a impressão digital
+do arquivo (tamanho + mtime + hash amostrado); execuções seguintes fazem
+seek direto nos INSERTs da tabela pedida em vez de reler os 285MB.
+
+Uso:
+    index = DumpIndex.load_or_build(DUMP)
+    for row in index.iter_rows('locrepasse'):
+        ...
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+from dump_parser import parse_mysql_values
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.index.json'
+
+# Hash de cabeça + cauda: detecta dump trocado sem reler o arquivo inteiro
+_HASH_SAMPLE = 4 * 1024 * 1024
+
+_INSERT_PREFIX = b'INSERT INTO `'
+_CREATE_PREFIX = b'CREATE TABLE `'
+_COLUMN_RE = re.compile(rb'^\s*`([^`]+)`\s+(.+?),?\s*$')
+
+
+def dump_fingerprint(path: str) -> dict:
+    """Tamanho + mtime + blake2b das pontas do arquivo."""
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        h.update(f.read(_HASH_SAMPLE))
+        if st.st_size > 2 * _HASH_SAMPLE:
+            f.seek(-_HASH_SAMPLE, os.SEEK_END)
+            h.update(f.read(_HASH_SAMPLE))
+    return {'size': st.st_size, 'mtime': int(st.st_mtime), 'hash': h.hexdigest()}
+
+
+class DumpIndex:
+    """Offsets dos INSERTs e colunas dos CREATE TABLE de um dump."""
+
+    def __init__(self, dump_path: str, fingerprint: dict, statements: dict, columns: dict):
+        self.dump_path = dump_path
+        self.fingerprint = fingerprint
+        self.statements = statements  # tabela -> [[offset, length, row_count], ...]
+        self.columns = columns        # tabela -> [[coluna, tipo_sql], ...]
+
+    # ------------------------------------------------------------
+    # Construção / persistência
+    # ------------------------------------------------------------
+
+    @classmethod
+    def build(cls, dump_path: str) -> 'DumpIndex':
+        statements = {}
+        columns = {}
+        offset = 0
+        create_table = None
+        with open(dump_path, 'rb') as f:
+            for line in f:
+                length = len(line)
+                if line.startswith(_INSERT_PREFIX):
+                    end = line.index(b'`', 13)
+                    table = line[13:end].decode('ascii')
+                    # Tuplas separadas por '),(' no mysqldump (estimativa exata
+                    # exceto se algum texto contiver '),(')
+                    statements.setdefault(table, []).append(
+                        [offset, length, line.count(b'),(') + 1]
+                    )
+                elif create_table is not None:
+                    m = _COLUMN_RE.match(line)
+                    if m:
+                        columns[create_table].append(
+                            [m.group(1).decode('ascii'), m.group(2).decode('latin-1')]
+                        )
+                    elif line.startswith(b')'):
+                        create_table = None
+                elif line.startswith(_CREATE_PREFIX):
+                    end = line.index(b'`', 14)
+                    create_table = line[14:end].decode('ascii')
+                    columns[create_table] = []
+                offset += length
+        return cls(dump_path, dump_fingerprint(dump_path), statements, columns)
+
+    @staticmethod
+    def index_path_for(dump_path: str) -> str:
+        return dump_path + INDEX_SUFFIX
+
+    def save(self, index_path: str = None):
+        index_path = index_path or self.index_path_for(self.dump_path)
+        tmp = index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'fingerprint': self.fingerprint,
+                'created_at': datetime.now().isoformat(),
+                'statements': self.statements,
+                'columns': self.columns,
+            }, f)
+        os.replace(tmp, index_path)
+
+    @classmethod
+    def load(cls, dump_path: str, index_path: str = None):
+        """Carrega o índice salvo; None se ausente ou de outro dump/versão."""
+        index_path = index_path or cls.index_path_for(dump_path)
+        try:
+            with open(index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION:
+            return None
+        st = os.stat(dump_path)
+        fp = data.get('fingerprint') or {}
+        if fp.get('size') != st.st_size or fp.get('mtime') != int(st.st_mtime):
+            return None
+        if fp != dump_fingerprint(dump_path):
+            return None
+        return cls(dump_path, fp, data['statements'], data['columns'])
+
+    @classmethod
+    def load_or_build(cls, dump_path: str, index_path: str = None) -> 'DumpIndex':
+        index = cls.load(dump_path, index_path)
+        if index is not None:
+            return index
+        print(f"  Indexando dump (varredura única): {dump_path}")
+        index = cls.build(dump_path)
+        try:
+            index.save(index_path)
+        except OSError as e:
+            print(f"  WARN: não foi possível salvar o índice do dump: {e}")
+        return index
+
+    # ------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------
+
+    def tables(self) -> list:
+        return sorted(self.statements)
+
+    def row_count(self, table: str) -> int:
+        return sum(s[2] for s in self.statements.get(table, ()))
+
+    def column_names(self, table: str) -> list:
+        return [c[0] for c in self.columns.get(table, ())]
+
+    def iter_lines(self, table: str, encoding: str = 'utf-8'):
+        """INSERTs da tabela, decodificados, lidos por seek direto."""
+        with open(self.dump_path, 'rb') as f:
+            for offset, length, _ in self.statements.get(table, ()):
+                f.seek(offset)
+                yield f.read(length).decode(encoding, errors='replace')
+
+    def iter_rows(self, table: str, typed: bool = False, encoding: str = 'utf-8'):
+        for line in self.iter_lines(table, encoding):
+            yield from parse_mysql_values(line, typed)
+
+    def iter_dicts(self, table: str, encoding: str = 'utf-8'):
+        """Tuplas como dict coluna -> valor (str; NULL -> None)."""
+        names = self.column_names(table)
+        for row in self.iter_rows(table, encoding=encoding):
+            yield {k: (None if v == 'NULL' else v) for k, v in zip(names, row)}
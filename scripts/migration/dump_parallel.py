@@ -0,0 +1,129 @@
+"""
+dump_parallel.py — Parse de uma tabela do dump em vários processos
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Os INSERTs da tabela (offsets do DumpIndex) são agrupados em faixas de bytes
+de ~CHUNK_BYTES e distribuídos a N processos. Cada processo abre o dump por
+conta própria (mmap), parseia suas faixas e devolve um RowBatch compacto:
+uma única string com separadores de controle em vez de uma lista de tuplas,
+o que deixa o pickle de volta ~7x mais barato. Nenhum texto do dump
+atravessa o pipe no sentido pai -> filho, só (offset, tamanho).
+
+Uso:
+    index = DumpIndex.load_or_build(DUMP)
+    for row in iter_values_parallel(index, 'loclanctocc', workers=4):
+        ...
+    for batch in iter_batches(index, 'locrechist', workers=4, ordered=False):
+        for row in batch: ...
+"""
+
+import mmap
+import multiprocessing
+
+import config as cfg
+from dump_parser import parse_mysql_values
+
+CHUNK_BYTES = 4 * 1024 * 1024
+
+# Separadores (US / RS do ASCII): não aparecem em texto latin-1 do dump;
+# statements que os contenham viajam como tuplas
+_FIELD_SEP = '\x1f'
+_ROW_SEP = '\x1e'
+
+
+class RowBatch:
+    """Tuplas de um grupo de statements, empacotadas numa string só."""
+
+    __slots__ = ('seq', 'n_rows', '_blob', '_rows')
+
+    def __init__(self, seq: int, rows: list, pack: bool = True):
+        self.seq = seq
+        self.n_rows = len(rows)
+        self._blob = None
+        self._rows = None
+        if pack and rows:
+            blob = _ROW_SEP.join([_FIELD_SEP.join(r) for r in rows])
+            # Separador dentro de algum campo: a contagem denuncia
+            if blob.count(_ROW_SEP) == len(rows) - 1 and \
+                    blob.count(_FIELD_SEP) == sum(map(len, rows)) - len(rows):
+                self._blob = blob
+                return
+        self._rows = rows
+
+    def rows(self) -> list:
+        if self._rows is not None:
+            return self._rows
+        if not self.n_rows:
+            return []
+        return [tuple(r.split(_FIELD_SEP)) for r in self._blob.split(_ROW_SEP)]
+
+    def __len__(self):
+        return self.n_rows
+
+    def __iter__(self):
+        return iter(self.rows())
+
+
+def statement_chunks(index, table: str, chunk_bytes: int = CHUNK_BYTES) -> list:
+    """Grupos consecutivos de (offset, tamanho) com até ~chunk_bytes cada."""
+    chunks = []
+    current = []
+    size = 0
+    for offset, length, _ in index.statements.get(table, ()):
+        if current and size + length > chunk_bytes:
+            chunks.append(current)
+            current, size = [], 0
+        current.append((offset, length))
+        size += length
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# Estado de cada processo filho (aberto uma vez no initializer)
+_worker_mm = None
+_worker_encoding = None
+
+
+def _init_worker(dump_path: str, encoding: str):
+    global _worker_mm, _worker_encoding
+    with open(dump_path, 'rb') as f:
+        _worker_mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_encoding = encoding
+
+
+def _parse_ranges(mm, encoding: str, ranges) -> list:
+    rows = []
+    for offset, length in ranges:
+        rows.extend(parse_mysql_values(str(mm[offset:offset + length], encoding)))
+    return rows
+
+
+def _parse_chunk(task) -> RowBatch:
+    seq, ranges = task
+    return RowBatch(seq, _parse_ranges(_worker_mm, _worker_encoding, ranges))
+
+
+def iter_batches(index, table: str, workers: int = 4, ordered: bool = True,
+                 encoding: str = cfg.MYSQL_DUMP_ENCODING, chunk_bytes: int = CHUNK_BYTES):
+    """RowBatch por grupo de statements. ordered=False entrega na ordem em que
+    os processos terminam (RowBatch.seq guarda a posição original)."""
+    tasks = list(enumerate(statement_chunks(index, table, chunk_bytes)))
+    if workers <= 1 or len(tasks) <= 1:
+        with open(index.dump_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for seq, ranges in tasks:
+                yield RowBatch(seq, _parse_ranges(mm, encoding, ranges), pack=False)
+        return
+
+    with multiprocessing.Pool(min(workers, len(tasks)), _init_worker,
+                              (index.dump_path, encoding)) as pool:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        yield from mapper(_parse_chunk, tasks)
+
+
+def iter_values_parallel(index, table: str, workers: int = 4, ordered: bool = True,
+                         encoding: str = cfg.MYSQL_DUMP_ENCODING, chunk_bytes: int = CHUNK_BYTES):
+    """Tuplas de str da tabela (mesmo resultado de DumpIndex.iter_rows)."""
+    for batch in iter_batches(index, table, workers, ordered, encoding, chunk_bytes):
+        yield from batch.rows()
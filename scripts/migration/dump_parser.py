@@ -0,0 +1,236 @@
+"""
+dump_parser.py — Parser compilado da cláusula VALUES de INSERTs do mysqldump
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Substitui o antigo parse_mysql_values (loop char a char com concatenação de
+string) por dois caminhos que fatiam os valores direto da linha:
+
+  - rápido: separa as tuplas em '),(' e entrega os campos ao leitor csv (C);
+    se alguma string continha '),(' a contagem de campos diverge e a linha
+    cai no caminho exato;
+  - exato: tokenizador em regex, um passo de loop Python por CAMPO (e não
+    por caractere).
+
+No modo tipado o csv não diz se um campo veio entre aspas; um segundo
+findall (em C) sobre o mesmo corpo devolve, campo a campo, o literal sem
+aspas ou '' para strings. Só os literais sem aspas são convertidos, então
+'NULL' e '2' entre aspas continuam texto, como no caminho exato.
+
+Trata corretamente:
+  - strings com escapes do MySQL (\\' \\\\ \\n \\0 ...) e aspas dobradas ('')
+  - NULL sem aspas
+  - literais _binary '...'
+  - números sem aspas (mantidos como texto exato no modo não tipado)
+"""
+
+import csv
+import re
+
+# Mude quando as tuplas produzidas mudarem: invalida o table_cache.py
+PARSER_VERSION = 2
+
+# Corpo de string MySQL: qualquer coisa exceto ' e \, ou um escape \x, ou ''
+_STR_BODY = r"[^'\\]*(?:(?:\\.|'')[^'\\]*)*"
+
+# Um campo seguido do separador (',' ou ')'). Grupos:
+#   1 = corpo de string entre aspas
+#   2 = corpo de _binary '...'
+#   3 = literal sem aspas (NULL, número)
+#   4 = separador
+_FIELD_RE = re.compile(
+    r"\s*(?:'(" + _STR_BODY + r")'"
+    r"|_binary\s*'(" + _STR_BODY + r")'"
+    r"|([^,()'\s]*))\s*([,)])",
+    re.S,
+)
+
+_ROW_START_RE = re.compile(r"\s*,?\s*\(")
+
+# Campo do corpo preparado (\' já virou ''): string entre aspas, ou literal
+# sem aspas no grupo 1. findall dá um item por campo, na ordem do csv.
+_BARE_RE = re.compile(r"'[^']*(?:''[^']*)*'|([^,'()]+)")
+
+_UNESCAPE_RE = re.compile(r"\\(.)|''", re.S)
+# Depois do csv as aspas dobradas já viraram uma só: sobram só os escapes \x
+_BACKSLASH_ESCAPE_RE = re.compile(r"\\(.)", re.S)
+
+_ESCAPES = {
+    '0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a',
+}
+
+
+def _unescape_match(m):
+    ch = m.group(1)
+    if ch is None:
+        return "'"
+    return _ESCAPES.get(ch, ch)
+
+
+def unescape(s: str) -> str:
+    """Remove escapes do MySQL de um corpo de string já sem as aspas externas."""
+    if '\\' not in s and "''" not in s:
+        return s
+    return _UNESCAPE_RE.sub(_unescape_match, s)
+
+
+class _MySQLDialect(csv.Dialect):
+    delimiter = ','
+    quotechar = "'"
+    doublequote = True
+    escapechar = None
+    skipinitialspace = False
+    lineterminator = '\n'
+    quoting = csv.QUOTE_MINIMAL
+    strict = False
+
+
+# Marca temporária para '\\' enquanto '\'' vira '' (entendido pelo csv)
+_BACKSLASH = '\ue000'
+
+
+def _fix_escapes(field: str) -> str:
+    if '\\' in field:
+        field = _BACKSLASH_ESCAPE_RE.sub(_unescape_match, field)
+    return field.replace(_BACKSLASH, '\\')
+
+
+def _prepare_body(body: str):
+    """Ajusta escapes para o csv. Retorna (body, precisa_correcao) ou None."""
+    if '_binary' in body:
+        return None
+    if '\\' not in body:
+        return body, False
+    if _BACKSLASH in body:
+        return None
+    body = body.replace('\\\\', _BACKSLASH).replace("\\'", "''")
+    # \' já foi resolvido pelo csv; só sobra correção para \\ e \n, \0...
+    return body, ('\\' in body or _BACKSLASH in body)
+
+
+def _fix_row(fields: list) -> list:
+    return [_fix_escapes(f) if ('\\' in f or _BACKSLASH in f) else f for f in fields]
+
+
+def _fast_rows(data: str, typed: bool = False):
+    """Caminho rápido via csv. Retorna None quando a linha precisa do caminho exato."""
+    if data[:1] != '(' or data[-1:] != ')':
+        return None
+    prepared = _prepare_body(data[1:-1])
+    if prepared is None:
+        return None
+    body, needs_fix = prepared
+    pieces = body.split('),(')
+    try:
+        rows = list(csv.reader(pieces, _MySQLDialect))
+    except csv.Error:
+        return None
+    # '),(' dentro de string funde/parte registros: contagem denuncia
+    if len(rows) != len(pieces) or len(set(map(len, rows))) != 1:
+        return None
+    if needs_fix:
+        for i, piece in enumerate(pieces):
+            if '\\' in piece or _BACKSLASH in piece:
+                rows[i] = _fix_row(rows[i])
+    if typed and rows[0]:
+        return _typed_rows(body, rows)
+    return list(map(tuple, rows))
+
+
+def _convert_bare(tok: str):
+    """Converte literal sem aspas no modo tipado: NULL->None, inteiro->int.
+
+    Decimais (valor, multa...) ficam como texto exato para não perder precisão.
+    """
+    if tok == 'NULL':
+        return None
+    if tok.isdigit() or (tok[:1] == '-' and tok[1:].isdigit()):
+        return int(tok)
+    return tok
+
+
+def iter_values(line: str, typed: bool = False):
+    """Itera as tuplas de um INSERT INTO ... VALUES (...),(...); (caminho exato).
+
+    typed=False: cada campo é str (NULL vira 'NULL'), compatível com o parser antigo.
+    typed=True:  NULL -> None, inteiros -> int, _binary -> bytes, strings -> str.
+    """
+    idx = line.find('VALUES')
+    if idx == -1:
+        return
+    pos = idx + 6
+    end = len(line)
+    field_match = _FIELD_RE.match
+    row_match = _ROW_START_RE.match
+
+    while pos < end:
+        m = row_match(line, pos)
+        if not m:
+            return
+        pos = m.end()
+        row = []
+        append = row.append
+        while True:
+            m = field_match(line, pos)
+            if not m:
+                # Linha truncada/malformada: descarta a linha parcial
+                return
+            s, b, bare, sep = m.groups()
+            if s is not None:
+                append(unescape(s) if ('\\' in s or "''" in s) else s)
+            elif b is not None:
+                b = unescape(b)
+                append(b.encode('latin-1', 'replace') if typed else b)
+            elif typed:
+                append(_convert_bare(bare))
+            else:
+                append(bare)
+            pos = m.end()
+            if sep == ')':
+                break
+        yield tuple(row)
+
+
+def _typed_rows(body: str, rows: list):
+    """Converte, campo a campo, os literais sem aspas das tuplas do csv.
+
+    Retorna None se o findall não achar um item por campo.
+    """
+    width = len(rows[0])
+    bare = _BARE_RE.findall(body)
+    if len(bare) != width * len(rows):
+        return None
+    cols = list(zip(*rows))
+    for i in range(width):
+        kinds = bare[i::width]
+        if '' not in kinds:
+            cols[i] = tuple(map(_convert_bare, cols[i]))
+        elif any(kinds):
+            # Coluna mista: NULL sem aspas numa coluna de texto, ou o inverso
+            cols[i] = tuple([_convert_bare(v) if k else v for v, k in zip(cols[i], kinds)])
+    return list(zip(*cols))
+
+
+def parse_row(body: str, typed: bool = False) -> tuple:
+    """Parse de uma tupla isolada (conteúdo entre os parênteses)."""
+    if not typed:
+        prepared = _prepare_body(body)
+        if prepared is not None:
+            try:
+                fields = next(csv.reader((prepared[0],), _MySQLDialect), [])
+            except csv.Error:
+                fields = None
+            if fields is not None:
+                return tuple(_fix_row(fields) if prepared[1] else fields)
+    rows = list(iter_values('VALUES (' + body + ')', typed))
+    return rows[0] if rows else ()
+
+
+def parse_mysql_values(line: str, typed: bool = False) -> list:
+    """Parse MySQL INSERT INTO ... VALUES (...),(...); into list of tuples."""
+    idx = line.find('VALUES')
+    if idx == -1:
+        return []
+    rows = _fast_rows(line[idx + 6:].strip().rstrip(';').rstrip(), typed)
+    if rows is None:
+        return list(iter_values(line, typed))
+    return rows
@@ -0,0 +1,188 @@
+"""
+dump_reader.py — Leitor do dump via mmap, sem cópia, com decodificação sob demanda
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+O dump é mapeado em memória (mmap) e nunca lido em modo texto. Os INSERTs da
+tabela pedida são localizados pelo DumpIndex (varredura em bytes) e cada
+tupla vira um LazyRow: uma fatia memoryview do mmap que só é decodificada
+(latin-1, config.MYSQL_DUMP_ENCODING) e parseada quando um campo é acessado.
+Tabelas que a fase não pede nunca saem dos bytes.
+
+iter_values/iter_values_parallel passam pelo cache de tabelas parseadas
+(table_cache.py): a primeira leitura de uma tabela grava, as seguintes (em
+qualquer script) leem do cache. DumpReader(..., cache=False) desliga.
+
+Uso:
+    with DumpReader(DUMP) as reader:
+        for lazy in reader.iter_rows('locrecibo'):
+            r = lazy.values()   # tupla de str, sem guardar cache no LazyRow
+"""
+
+import mmap
+import re
+
+import config as cfg
+from dump_index import DumpIndex
+from dump_parallel import iter_values_parallel
+from dump_parser import parse_mysql_values, parse_row
+from table_cache import TableCache
+
+# Uma tupla (...) do VALUES; strings podem conter parênteses e aspas escapadas
+_ROW_RE = re.compile(rb"\(([^'()]*+(?:'[^'\\]*+(?:\\.[^'\\]*+)*+'[^'()]*+)*+)\)", re.S)
+# Escape \x do MySQL (só aparece dentro de strings no mysqldump)
+_ESCAPE_RE = re.compile(rb"\\.", re.S)
+
+
+def _quotes_balanced(piece: bytes) -> bool:
+    """Aspas não escapadas em número par: o pedaço não corta uma string.
+
+    '' conta como duas (fecha e reabre), então a paridade só é ímpar quando
+    o corte em '),(' caiu dentro de uma string.
+    """
+    return _ESCAPE_RE.sub(b'', piece).count(b"'") % 2 == 0
+
+
+def _row_spans(stmt: bytes, base: int):
+    """Spans (início, fim) absolutos de cada tupla, separando em '),('.
+
+    Retorna None se algum pedaço tiver aspas desbalanceadas (texto com '),(');
+    aí o chamador usa o regex, mais lento porém exato.
+    """
+    body_start = stmt.find(b'(')
+    body_end = stmt.rfind(b')')
+    if body_start == -1 or body_end <= body_start:
+        return []
+    body = stmt[body_start + 1:body_end]
+    pieces = body.split(b'),(')
+    if b'\\' in body:
+        if not all(map(_quotes_balanced, pieces)):
+            return None
+    elif any(p.count(b"'") & 1 for p in pieces):
+        return None
+    spans = []
+    pos = base + body_start + 1
+    for piece in pieces:
+        end = pos + len(piece)
+        spans.append((pos, end))
+        pos = end + 3
+    return spans
+
+
+class LazyRow:
+    """Tupla do dump mantida como bytes até o primeiro acesso a um campo."""
+
+    __slots__ = ('_view', '_encoding', '_fields')
+
+    def __init__(self, view: memoryview, encoding: str):
+        self._view = view
+        self._encoding = encoding
+        self._fields = None
+
+    def values(self) -> tuple:
+        """Campos parseados (str). Não guarda cache: use ao consumir uma vez."""
+        if self._fields is not None:
+            return self._fields
+        return parse_row(str(self._view, self._encoding))
+
+    def _materialize(self) -> tuple:
+        if self._fields is None:
+            self._fields = parse_row(str(self._view, self._encoding))
+        return self._fields
+
+    def raw(self) -> bytes:
+        return bytes(self._view)
+
+    def __getitem__(self, i):
+        return self._materialize()[i]
+
+    def __len__(self):
+        return len(self._materialize())
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __repr__(self):
+        return f"LazyRow({self.raw()[:60]!r}...)"
+
+
+class DumpReader:
+    """mmap do dump + índice de statements por tabela."""
+
+    def __init__(self, dump_path: str, index: DumpIndex = None,
+                 encoding: str = cfg.MYSQL_DUMP_ENCODING, cache=None):
+        self.dump_path = dump_path
+        self.index = index or DumpIndex.load_or_build(dump_path)
+        self.encoding = encoding
+        # None: cache de config.py (se ligado); False: sem cache
+        self.cache = TableCache.from_config() if cache is None else (cache or None)
+        self._file = open(dump_path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+    def close(self):
+        self._view.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            # Ainda há LazyRow vivos apontando para o mmap; o GC fecha depois
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_statements(self, table: str):
+        """(início, fim) em bytes de cada INSERT da tabela."""
+        for offset, length, _ in self.index.statements.get(table, ()):
+            yield offset, offset + length
+
+    def iter_rows(self, table: str):
+        """LazyRow por tupla, sem decodificar nada."""
+        view = self._view
+        encoding = self.encoding
+        for start, end in self.iter_statements(table):
+            values_at = self._mm.find(b'VALUES', start, end)
+            if values_at == -1:
+                continue
+            # Cópia transitória do statement só para achar as fronteiras;
+            # os LazyRow apontam para o mmap
+            spans = _row_spans(self._mm[values_at + 6:end], values_at + 6)
+            if spans is None:
+                spans = [m.span(1) for m in _ROW_RE.finditer(self._mm, values_at + 6, end)]
+            for a, b in spans:
+                yield LazyRow(view[a:b], encoding)
+
+    def _parse_values(self, table: str):
+        for start, end in self.iter_statements(table):
+            line = str(self._view[start:end], self.encoding)
+            yield from parse_mysql_values(line)
+
+    def _cached(self, table: str, parse):
+        """Tuplas do cache, ou `parse()` gravando no cache ao passar."""
+        if self.cache is None:
+            return parse()
+        rows = self.cache.load(self.index.fingerprint, table, self.encoding)
+        if rows is None:
+            rows = self.cache.store(self.index.fingerprint, table, self.encoding, parse())
+        return rows
+
+    def iter_values(self, table: str):
+        """Tuplas já parseadas, statement a statement (caminho rápido em lote)."""
+        return self._cached(table, lambda: self._parse_values(table))
+
+    def iter_values_parallel(self, table: str, workers: int, ordered: bool = True):
+        """Como iter_values, com o parse dividido entre `workers` processos."""
+        if workers <= 1:
+            return self.iter_values(table)
+        parse = lambda: iter_values_parallel(self.index, table, workers, ordered, self.encoding)
+        # Fora de ordem, o cache guardaria uma ordem diferente a cada execução
+        return self._cached(table, parse) if ordered else parse()
+
+    def iter_dicts(self, table: str):
+        """Tuplas como dict coluna -> valor (str; NULL -> None)."""
+        names = self.index.column_names(table)
+        for row in self.iter_values(table):
+            yield {k: (None if v == 'NULL' else v) for k, v in zip(names, row)}
@@ -0,0 +1,198 @@
+"""
+elt_staging.py — Cópia literal das tabelas do dump para o schema mysql_staging
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Modo ELT (MIGRATION_TRANSFORM=sql): o Python só extrai. Cada tabela do dump
+vai por COPY, sem transformação, para mysql_staging.<tabela> com os tipos do
+CREATE TABLE do dump; as conversões (datas, competência, SITUACAO_MAP,
+VERBA_MAP, sinal -> tipo_lancamento) são feitas em SQL sobre o conjunto
+inteiro, e o PostgreSQL pode usar hash joins/agregações paralelas.
+
+A extração troca só o que o COPY não aceitaria: NULL -> \\N, datas zeradas
+ou inexistentes ('0000-00-00...', '2021-02-30') -> NULL e '' em coluna
+numérica/temporal -> NULL. As tabelas são UNLOGGED (não geram WAL) e ficam
+no schema após a execução para conferência.
+
+As colunas têm os nomes do CREATE TABLE do dump, como no modo Python
+(row_spec.py resolve os campos pelo nome); sem CREATE TABLE, valem os
+nomes documentados em DUMP_COLUMNS, por posição.
+
+Funções SQL equivalentes às do hotfix (mesma tolerância a lixo):
+    mysql_staging.safe_int(text)          -> bigint (0 se inválido)
+    mysql_staging.safe_num(text)          -> numeric (0 se inválido)
+    mysql_staging.safe_date(text)         -> date (NULL se inválida/zerada)
+    mysql_staging.parse_competencia(text) -> date (1º dia do mês; 2020-01-01;
+                                             NULL se vazia)
+
+Uso:
+    ensure_staging_schema(cur)
+    n = stage_dump_table(cur, reader, 'locrecibo', names=(...))
+    materialize_lookup(cur, 'map_situacao', 'integer', 'text', SITUACAO_MAP)
+"""
+
+import re
+from datetime import date
+from functools import lru_cache
+
+import config as cfg
+from pipeline import copy_rows
+
+SCHEMA = cfg.STAGING_SCHEMA
+
+_FUNCTIONS = (
+    f"""CREATE OR REPLACE FUNCTION {SCHEMA}.safe_int(v text) RETURNS bigint
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE WHEN btrim(v) ~ '^[-+]?[0-9]{{1,18}}$' THEN btrim(v)::bigint ELSE 0 END
+    $$""",
+    f"""CREATE OR REPLACE FUNCTION {SCHEMA}.safe_num(v text) RETURNS numeric
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE WHEN btrim(v) ~ '^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?$'
+                    THEN btrim(v)::numeric ELSE 0 END
+    $$""",
+    # Data do calendário (y, m, d) ou NULL, sem erro: make_date só recebe datas
+    # válidas. Sem bloco EXCEPTION, que abriria uma subtransação por linha e
+    # não é permitido em PARALLEL SAFE
+    f"""CREATE OR REPLACE FUNCTION {SCHEMA}.valid_date(y bigint, m bigint, d bigint) RETURNS date
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE WHEN y BETWEEN 1 AND 9999 AND m BETWEEN 1 AND 12 AND d >= 1
+                     AND d <= CASE WHEN m = 2 THEN
+                                       CASE WHEN y % 4 = 0 AND (y % 100 <> 0 OR y % 400 = 0)
+                                            THEN 29 ELSE 28 END
+                                   WHEN m IN (4, 6, 9, 11) THEN 30
+                                   ELSE 31 END
+                    THEN make_date(y::int, m::int, d::int) END
+    $$""",
+    # O mesmo que strptime('%Y-%m-%d') do hotfix: ano com 4 dígitos, mês e dia
+    # com 1 ou 2 ('2020-1-5'); inexistente (2021-02-30), zerada ou 1901-01-01 -> NULL
+    f"""CREATE OR REPLACE FUNCTION {SCHEMA}.safe_date(v text) RETURNS date
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE WHEN btrim(v) ~ '^[0-9]{{4}}-(1[0-2]|0[1-9]|[1-9])-(3[01]|[12][0-9]|0[1-9]|[1-9]| [1-9])$'
+                     AND btrim(v) <> '1901-01-01'
+                    THEN {SCHEMA}.valid_date(split_part(btrim(v), '-', 1)::bigint,
+                                             split_part(btrim(v), '-', 2)::bigint,
+                                             split_part(btrim(v), '-', 3)::bigint) END
+    $$""",
+    # Como parse_competencia do hotfix: MM/AAAA ou AAAA-MM -> 1º dia do mês;
+    # NULL/vazio -> NULL; qualquer outra coisa -> 2020-01-01 ('1/20' -> 0020-01-01)
+    f"""CREATE OR REPLACE FUNCTION {SCHEMA}.parse_competencia(v text) RETURNS date
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE
+            WHEN v IS NULL OR v = '' OR v = 'NULL' THEN NULL
+            WHEN strpos(btrim(v), '/') > 0
+                THEN COALESCE({SCHEMA}.valid_date(
+                         {SCHEMA}.safe_int(split_part(btrim(v), '/', 2)),
+                         {SCHEMA}.safe_int(split_part(btrim(v), '/', 1)), 1),
+                     DATE '2020-01-01')
+            WHEN strpos(btrim(v), '-') > 0
+                THEN COALESCE({SCHEMA}.valid_date(
+                         {SCHEMA}.safe_int(split_part(btrim(v), '-', 1)),
+                         {SCHEMA}.safe_int(split_part(btrim(v), '-', 2)), 1),
+                     DATE '2020-01-01')
+            ELSE DATE '2020-01-01'
+        END
+    $$""",
+)
+
+# Tipo MySQL -> tipo PostgreSQL; o resto (char, varchar, text, enum...) vira
+# text. Inteiros sobem um degrau: o dump não diz se a coluna é unsigned.
+_TYPE_MAP = {
+    'tinyint': 'smallint', 'smallint': 'integer', 'mediumint': 'integer',
+    'int': 'bigint', 'integer': 'bigint', 'bigint': 'bigint',
+    'decimal': 'numeric', 'numeric': 'numeric',
+    'double': 'double precision', 'float': 'double precision', 'real': 'double precision',
+    'date': 'date', 'datetime': 'timestamp', 'timestamp': 'timestamp',
+    'time': 'time', 'year': 'integer',
+}
+_TYPE_RE = re.compile(r'^\s*([a-z]+)\s*(\(\s*\d+\s*(?:,\s*\d+\s*)?\))?', re.I)
+
+_NUMERIC = ('smallint', 'integer', 'bigint', 'numeric', 'double precision')
+_TEMPORAL = ('date', 'timestamp', 'time')
+_DATED = ('date', 'timestamp')
+
+
+@lru_cache(maxsize=16384)
+def _valid_date_prefix(x: str) -> bool:
+    """'AAAA-MM-DD...' é uma data que existe? (o COPY recusa 2021-02-30, 2021-02-00)"""
+    try:
+        date(int(x[:4]), int(x[5:7]), int(x[8:10]))
+    except ValueError:
+        return False
+    return True
+
+
+def pg_type(mysql_type: str) -> str:
+    """Tipo de coluna do CREATE TABLE do MySQL -> tipo PostgreSQL."""
+    m = _TYPE_RE.match(mysql_type or '')
+    if not m:
+        return 'text'
+    pg = _TYPE_MAP.get(m.group(1).lower(), 'text')
+    if pg == 'numeric' and m.group(2):
+        return 'numeric' + m.group(2).replace(' ', '')
+    return pg
+
+
+def staging_columns(index, table: str, names=()) -> list:
+    """[(nome, tipo_pg)] da tabela, pelos nomes e tipos do CREATE TABLE do dump
+    (como RowSpec no modo Python). Sem CREATE TABLE no dump, `names` (os
+    nomes documentados usados nas consultas do hotfix) vale por posição e
+    tudo fica text."""
+    dump_cols = index.columns.get(table)
+    if not dump_cols:
+        return [(name.lower(), 'text') for name in names]
+    present = {name.lower() for name, _ in dump_cols}
+    missing = [name for name in names if name.lower() not in present]
+    if missing:
+        print(f"  WARN: {table}: colunas documentadas ausentes do CREATE TABLE do dump: "
+              f"{', '.join(missing)}")
+    return [(name.lower(), pg_type(col_type)) for name, col_type in dump_cols]
+
+
+def _clean_rows(rows, cols):
+    """Tuplas do parser -> tuplas aceitas pelo COPY, com largura fixa."""
+    width = len(cols)
+    numeric = [i for i, (_, t) in enumerate(cols) if t in _NUMERIC]
+    temporal = [i for i, (_, t) in enumerate(cols) if t in _TEMPORAL]
+    dated = [i for i, (_, t) in enumerate(cols) if t in _DATED]
+    for r in rows:
+        v = [None if x == 'NULL' else x for x in r[:width]]
+        if len(v) < width:
+            v.extend([None] * (width - len(v)))
+        for i in numeric:
+            if v[i] == '':
+                v[i] = None
+        for i in temporal:
+            if v[i] == '':
+                v[i] = None
+        for i in dated:
+            x = v[i]
+            if x is not None and not _valid_date_prefix(x):
+                v[i] = None
+        yield v
+
+
+def ensure_staging_schema(cur):
+    cur.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}")
+    for ddl in _FUNCTIONS:
+        cur.execute(ddl)
+
+
+def stage_dump_table(cur, reader, table: str, names=(), workers: int = 1) -> int:
+    """Recria mysql_staging.<tabela> e carrega as tuplas do dump (sem commit)."""
+    cols = staging_columns(reader.index, table, names)
+    target = f"{SCHEMA}.{table.lower()}"
+    cur.execute(f"DROP TABLE IF EXISTS {target}")
+    cur.execute(f"CREATE UNLOGGED TABLE {target} ("
+                + ', '.join(f'"{name}" {col_type}' for name, col_type in cols) + ")")
+    n = copy_rows(cur, target, [f'"{name}"' for name, _ in cols],
+                  _clean_rows(reader.iter_values_parallel(table, workers), cols),
+                  cfg.PIPELINE_DEPTH)
+    cur.execute(f"ANALYZE {target}")
+    return n
+
+
+def materialize_lookup(cur, name: str, key_type: str, value_type: str, mapping: dict) -> int:
+    """Dicionário de config -> mysql_staging.<name>(chave PK, valor) (sem commit)."""
+    target = f"{SCHEMA}.{name}"
+    cur.execute(f"DROP TABLE IF EXISTS {target}")
+    cur.execute(f"CREATE TABLE {target} (chave {key_type} PRIMARY KEY, valor {value_type})")
+    return copy_rows(cur, target, ('chave', 'valor'), mapping.items())
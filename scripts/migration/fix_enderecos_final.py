@@ -2,72 +2,118 @@
 """
 Hotfix: Importar endereços dos 2132 inquilinos sem endereço.
 Fonte: MySQL dump locinquilino (endac) + locimoveis (fallback).
+
+Estados/cidades/bairros/logradouros que faltam são criados em lote, um
+INSERT por nível (address_resolver.py), e os enderecos entram em massa.
+
+As linhas do dump ficam em memória como registros com __slots__
+(RowSpec.record_class): só os campos de endereço, convertidos no acesso.
 """
+import os
 import re
+import sys
 import psycopg2
+import psycopg2.extras
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(__file__))
+from dump_reader import DumpReader
+from address_resolver import AddressResolver
+from row_spec import RowSpec
+
 DUMP = '/home/marciorsm/AlmasaStudio/bkpBancoFormatoAntigo/bkpjpw_20260220_121003.sql'
 PG_DSN = "host=127.0.0.1 port=5432 dbname=almasa_prod user=almasa_local password=password"
 
-def parse_mysql_values(line: str) -> list:
-    """Parse MySQL INSERT INTO ... VALUES (...),(...); into list of tuples."""
-    # Find VALUES
-    idx = line.find('VALUES')
-    if idx == -1:
-        return []
-    data = line[idx + 6:].rstrip().rstrip(';')
-
-    rows = []
-    current_row = []
-    current_val = ''
-    in_string = False
-    escape_next = False
-    paren_depth = 0
-
-    for ch in data:
-        if escape_next:
-            current_val += ch
-            escape_next = False
-            continue
-        if ch == '\\':
-            escape_next = True
-            current_val += ch
-            continue
-        if ch == "'" and not in_string:
-            in_string = True
-            continue
-        if ch == "'" and in_string:
-            current_val += ch  # we'll strip the trailing quote below
-            # Peek: could be '' escape
-            in_string = False
-            continue
-        if in_string:
-            current_val += ch
+# Pessoas por lote: cada lote = até 4 INSERTs de hierarquia + 1 de enderecos
+BATCH_SIZE = 1000
+
+_NON_DIGIT = re.compile(r'\D')
+
+
+def columns_at(names: dict, width: int) -> tuple:
+    """Colunas por posição; as que o script não lê ficam como colN.
+    O CREATE TABLE do dump, quando existe, tem precedência (dump_columns)."""
+    return tuple(names.get(i, f'col{i}') for i in range(width))
+
+
+# Posições do script original, que pulava locinquilino com menos de 20 campos
+# e locimoveis com menos de 16 (min_width). Com o CREATE TABLE do dump um
+# campo pode cair depois desse mínimo: numa linha curta vale '' (numero: 0)
+INQUILINO_SPEC = RowSpec('locinquilino', (
+    ('imovel', "int({0}) if {0}.strip().lstrip('-').isdigit() else 0"),
+    ('endac', '{0}.strip()', ''),
+    ('complac', '{0}.strip()', ''),
+    ('bairroac', '{0}.strip()', ''),
+    ('cidadeac', '{0}.strip()', ''),
+    ('estac', '{0}.strip()', ''),
+    ('cepac', '{0}.strip()', ''),
+), columns_at({0: 'codigo', 2: 'imovel', 14: 'endac', 15: 'complac', 16: 'bairroac',
+               17: 'cidadeac', 18: 'estac', 19: 'cepac'}, 20),
+    min_width=20)
+
+IMOVEL_SPEC = RowSpec('locimoveis', (
+    ('endereco', '{0}.strip()', ''),
+    ('numero', "int(_NON_DIGIT.sub('', {0}) or 0)", 0),
+    ('complemento', '{0}.strip()', ''),
+    ('bairro', '{0}.strip()', ''),
+    ('cidade', '{0}.strip()', ''),
+    ('estado', '{0}.strip()', ''),
+    ('cep', '{0}.strip()', ''),
+), columns_at({0: 'codigo', 7: 'endereco', 8: 'numero', 9: 'complemento', 10: 'bairro',
+               12: 'cidade', 13: 'estado', 14: 'cep'}, 16),
+    min_width=16, env={'_NON_DIGIT': _NON_DIGIT})
+
+# Campos com poucos valores distintos: uma string por valor, não por linha
+INQUILINO_SHARED = ('complac', 'bairroac', 'cidadeac', 'estac')
+IMOVEL_SHARED = ('complemento', 'bairro', 'cidade', 'estado')
+
+
+def dump_columns(reader, spec: RowSpec) -> tuple:
+    """Colunas do CREATE TABLE do dump para `spec`. Os nomes declarados aqui
+    não vêm do schema do legado: um nome que o dump não tem é lido na
+    posição declarada (como o script fazia antes), com aviso."""
+    columns = list(reader.index.column_names(spec.table))
+    if not columns:
+        return spec.default_columns
+    present = {c.lower() for c in columns}
+    for pos, name in enumerate(spec.default_columns):
+        if name == f'col{pos}' or name.lower() in present or pos >= len(columns):
             continue
-        # Not in string
-        if ch == '(':
-            paren_depth += 1
-            if paren_depth == 1:
-                current_row = []
-                current_val = ''
+        print(f"  WARN: {spec.table}.{name} não existe no CREATE TABLE do dump; "
+              f"lendo pela posição {pos} ({columns[pos]})")
+        columns[pos] = name
+    return tuple(columns)
+
+
+def load_records(reader, spec: RowSpec, shared=()) -> dict:
+    """codigo (int) -> registro da tabela do dump; códigos inválidos ficam de fora.
+    `shared`: campos de poucos valores distintos, guardados uma vez só."""
+    columns = dump_columns(reader, spec)
+    codigo_pos = spec.position('codigo', columns)
+    Record = spec.record_class(columns, shared)
+    width = max(spec.width(columns), codigo_pos + 1)
+    records = {}
+    for r in reader.iter_values(spec.table):
+        if len(r) < width:
             continue
-        if ch == ')':
-            paren_depth -= 1
-            if paren_depth == 0:
-                current_row.append(current_val.rstrip("'").strip())
-                rows.append(tuple(current_row))
-                current_row = []
-                current_val = ''
-            continue
-        if ch == ',' and paren_depth == 1:
-            current_row.append(current_val.rstrip("'").strip())
-            current_val = ''
+        try:
+            codigo = int(r[codigo_pos].strip())
+        except (ValueError, TypeError):
             continue
-        if paren_depth >= 1:
-            current_val += ch
+        records[codigo] = Record(r)
+    return records
+
 
-    return rows
+def write_enderecos(cur, resolver: AddressResolver, batch: list):
+    """Hierarquia que falta (até 4 INSERTs) + enderecos de (pessoa_id, chave, numero, complemento)."""
+    logr_ids = resolver.resolve_many(key for _, key, _, _ in batch)
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO enderecos (id_pessoa, id_logradouro, id_tipo, end_numero, complemento) VALUES %s",
+        [(pessoa_id, logr_ids[key], 1, numero, complemento)
+         for pessoa_id, key, numero, complemento in batch],
+        page_size=len(batch),
+    )
 
 
 def main():
@@ -93,138 +139,24 @@ def main():
 
     # Step 2: Parse MySQL dump
     print(f"  Lendo dump MySQL...")
-    inquilinos = {}  # codigo -> dict
-    imoveis = {}     # codigo -> dict
-
-    with open(DUMP, 'r', errors='replace') as f:
-        for line in f:
-            if 'INSERT INTO `locinquilino`' in line:
-                rows = parse_mysql_values(line)
-                for r in rows:
-                    if len(r) < 20:
-                        continue
-                    codigo = r[0].strip()
-                    try:
-                        codigo_int = int(codigo)
-                    except (ValueError, TypeError):
-                        continue
-                    inquilinos[codigo_int] = {
-                        'imovel': int(r[2]) if r[2].strip().lstrip('-').isdigit() else 0,
-                        'endac': r[14].strip() if len(r) > 14 else '',
-                        'complac': r[15].strip() if len(r) > 15 else '',
-                        'bairroac': r[16].strip() if len(r) > 16 else '',
-                        'cidadeac': r[17].strip() if len(r) > 17 else '',
-                        'estac': r[18].strip() if len(r) > 18 else '',
-                        'cepac': r[19].strip() if len(r) > 19 else '',
-                    }
-
-            elif 'INSERT INTO `locimoveis`' in line:
-                rows = parse_mysql_values(line)
-                for r in rows:
-                    if len(r) < 16:
-                        continue
-                    codigo = r[0].strip()
-                    try:
-                        codigo_int = int(codigo)
-                    except (ValueError, TypeError):
-                        continue
-                    imoveis[codigo_int] = {
-                        'endereco': r[7].strip() if len(r) > 7 else '',
-                        'numero': r[8].strip() if len(r) > 8 else '',
-                        'complemento': r[9].strip() if len(r) > 9 else '',
-                        'bairro': r[10].strip() if len(r) > 10 else '',
-                        'cidade': r[12].strip() if len(r) > 12 else '',
-                        'estado': r[13].strip() if len(r) > 13 else '',
-                        'cep': r[14].strip() if len(r) > 14 else '',
-                    }
+    reader = DumpReader(DUMP)
+    inquilinos = load_records(reader, INQUILINO_SPEC, INQUILINO_SHARED)  # codigo -> registro
+    imoveis = load_records(reader, IMOVEL_SPEC, IMOVEL_SHARED)
+    reader.close()
 
     print(f"  Inquilinos no dump: {len(inquilinos)}")
     print(f"  Imóveis no dump: {len(imoveis)}")
 
-    # Step 3: Build caches for estado/cidade/bairro
-    cur.execute("SELECT id, uf FROM estados")
-    estado_cache = {row[1].upper(): row[0] for row in cur.fetchall()}
-
-    cur.execute("SELECT id, nome, id_estado FROM cidades")
-    cidade_cache = {}
-    for row in cur.fetchall():
-        key = f"{row[1].upper()}_{row[2]}"
-        cidade_cache[key] = row[0]
-
-    cur.execute("SELECT id, nome, id_cidade FROM bairros")
-    bairro_cache = {}
-    for row in cur.fetchall():
-        key = f"{row[1].upper()}_{row[2]}"
-        bairro_cache[key] = row[0]
-
-    cur.execute("SELECT id, logradouro, cep, id_bairro FROM logradouros")
-    logr_cache = {}
-    for row in cur.fetchall():
-        key = f"{row[1]}_{row[2]}_{row[3]}"
-        logr_cache[key] = row[0]
-
-    print(f"  Cache: {len(estado_cache)} estados, {len(cidade_cache)} cidades, {len(bairro_cache)} bairros, {len(logr_cache)} logradouros")
-
-    now = datetime.now()
-
-    def get_or_create_estado(uf):
-        uf = (uf or 'SP').strip().upper()[:2]
-        if not uf:
-            uf = 'SP'
-        if uf in estado_cache:
-            return estado_cache[uf]
-        cur.execute("INSERT INTO estados (uf, nome) VALUES (%s, %s) RETURNING id", (uf, uf))
-        eid = cur.fetchone()[0]
-        estado_cache[uf] = eid
-        return eid
-
-    def get_or_create_cidade(nome, estado_id):
-        nome = (nome or 'SEM CIDADE').strip()[:100]
-        if not nome:
-            nome = 'SEM CIDADE'
-        key = f"{nome.upper()}_{estado_id}"
-        if key in cidade_cache:
-            return cidade_cache[key]
-        cur.execute("INSERT INTO cidades (nome, id_estado) VALUES (%s, %s) RETURNING id", (nome, estado_id))
-        cid = cur.fetchone()[0]
-        cidade_cache[key] = cid
-        return cid
-
-    def get_or_create_bairro(nome, cidade_id):
-        nome = (nome or 'SEM BAIRRO').strip()[:100]
-        if not nome:
-            nome = 'SEM BAIRRO'
-        key = f"{nome.upper()}_{cidade_id}"
-        if key in bairro_cache:
-            return bairro_cache[key]
-        cur.execute("INSERT INTO bairros (nome, id_cidade) VALUES (%s, %s) RETURNING id", (nome, cidade_id))
-        bid = cur.fetchone()[0]
-        bairro_cache[key] = bid
-        return bid
-
-    def get_or_create_logradouro(logr_str, cep, bairro_id):
-        logr_str = (logr_str or 'SEM ENDERECO').strip()[:255]
-        if not logr_str:
-            logr_str = 'SEM ENDERECO'
-        cep = re.sub(r'\D', '', cep or '')[:8]
-        if not cep:
-            cep = '00000000'
-        cep = cep.ljust(8, '0')
-        key = f"{logr_str}_{cep}_{bairro_id}"
-        if key in logr_cache:
-            return logr_cache[key]
-        cur.execute(
-            "INSERT INTO logradouros (logradouro, cep, id_bairro, created_at, updated_at) VALUES (%s, %s, %s, %s, %s) RETURNING id",
-            (logr_str, cep, bairro_id, now, now)
-        )
-        lid = cur.fetchone()[0]
-        logr_cache[key] = lid
-        return lid
-
-    # Step 4: Process each person without address
-    inserted = 0
+    # Step 3: Caches de estado/cidade/bairro/logradouro
+    resolver = AddressResolver(cur, datetime.now())
+    print(f"  Cache: {resolver.summary()}")
+    merged = {lv: m for lv, (_, _, m) in resolver.merge_report().items() if m}
+    if merged:
+        print(f"  Grafias equivalentes já duplicadas no banco (usa o menor id): {merged}")
+
+    # Step 4: Endereço de cada pessoa (endac próprio ou o do imóvel)
+    pendentes = []  # (pessoa_id, chave do endereço, numero, complemento)
     skipped = 0
-    errors = 0
     tier1 = 0  # endac proprio
     tier2 = 0  # imovel
 
@@ -234,69 +166,69 @@ def main():
             skipped += 1
             continue
 
-        try:
-            endereco_str = ''
-            complemento = ''
-            bairro_str = ''
-            cidade_str = ''
-            estado_str = ''
-            cep_str = ''
-            numero = 0
-
-            # Tier 1: endac proprio
-            if inq['endac']:
-                endereco_str = inq['endac']
-                complemento = inq['complac']
-                bairro_str = inq['bairroac']
-                cidade_str = inq['cidadeac']
-                estado_str = inq['estac']
-                cep_str = inq['cepac']
-                tier1 += 1
-            else:
-                # Tier 2: imovel
-                im = imoveis.get(inq['imovel'])
-                if im and im['endereco']:
-                    endereco_str = im['endereco']
-                    try:
-                        numero = int(re.sub(r'\D', '', im['numero'] or '0') or '0')
-                    except:
-                        numero = 0
-                    complemento = im['complemento']
-                    bairro_str = im['bairro']
-                    cidade_str = im['cidade']
-                    estado_str = im['estado']
-                    cep_str = im['cep']
-                    tier2 += 1
-                else:
-                    skipped += 1
-                    continue
-
+        numero = 0
+        # Tier 1: endac proprio
+        endereco_str = inq.endac
+        if endereco_str:
+            complemento = inq.complac
+            bairro_str = inq.bairroac
+            cidade_str = inq.cidadeac
+            estado_str = inq.estac
+            cep_str = inq.cepac
+            tier1 += 1
+        else:
+            # Tier 2: imovel
+            im = imoveis.get(inq.imovel)
+            endereco_str = im.endereco if im else ''
             if not endereco_str:
                 skipped += 1
                 continue
-
-            estado_id = get_or_create_estado(estado_str)
-            cidade_id = get_or_create_cidade(cidade_str, estado_id)
-            bairro_id = get_or_create_bairro(bairro_str, cidade_id)
-            logr_id = get_or_create_logradouro(endereco_str, cep_str, bairro_id)
-
-            cur.execute(
-                "INSERT INTO enderecos (id_pessoa, id_logradouro, id_tipo, end_numero, complemento) VALUES (%s, %s, %s, %s, %s)",
-                (pessoa_id, logr_id, 1, numero, complemento or None)
-            )
-            inserted += 1
-
-            if inserted % 500 == 0:
-                conn.commit()
-                print(f"  ... {inserted} inseridos")
-
+            numero = im.numero
+            complemento = im.complemento
+            bairro_str = im.bairro
+            cidade_str = im.cidade
+            estado_str = im.estado
+            cep_str = im.cep
+            tier2 += 1
+
+        key = resolver.key(estado_str, cidade_str, bairro_str, endereco_str, cep_str)
+        pendentes.append((pessoa_id, key, numero, complemento or None))
+
+    # Step 5: Por lote, hierarquia criada nível a nível + enderecos em massa.
+    # Lote com erro é desfeito e refeito pessoa a pessoa, cada uma num SAVEPOINT
+    inserted = 0
+    errors = 0
+    for start in range(0, len(pendentes), BATCH_SIZE):
+        batch = pendentes[start:start + BATCH_SIZE]
+        try:
+            write_enderecos(cur, resolver, batch)
+            conn.commit()
+            inserted += len(batch)
         except Exception as e:
-            errors += 1
-            if errors <= 5:
-                print(f"  ERRO pessoa {pessoa_id} (cod={cod}): {e}")
             conn.rollback()
-
-    conn.commit()
+            resolver.rollback()
+            print(f"  Lote de {len(batch)} com erro ({e}); refazendo um a um")
+            for item in batch:
+                cur.execute("SAVEPOINT endereco")
+                mark = resolver.checkpoint()
+                try:
+                    write_enderecos(cur, resolver, [item])
+                except Exception as row_error:
+                    cur.execute("ROLLBACK TO SAVEPOINT endereco")
+                    resolver.rollback(mark)
+                    errors += 1
+                    if errors <= 5:
+                        print(f"  ERRO pessoa {item[0]}: {row_error}")
+                    continue
+                cur.execute("RELEASE SAVEPOINT endereco")
+                inserted += 1
+            conn.commit()
+        resolver.commit()
+        print(f"  ... {inserted} inseridos")
+
+    created = resolver.created
+    print(f"  Criados: {created['estados']} estados, {created['cidades']} cidades, "
+          f"{created['bairros']} bairros, {created['logradouros']} logradouros")
 
     # Final check
     cur.execute("SELECT COUNT(*) FROM pessoas p WHERE NOT EXISTS (SELECT 1 FROM enderecos e WHERE e.id_pessoa = p.idpessoa)")
@@ -6,97 +6,80 @@ Causa raiz: config.py apontava para dump compacto (36MB, ~10% dos dados financei
              em vez do dump completo (272MB).
 
 O que este script faz:
-  1. Reconstrói mapeamentos (cod→id) a partir do PostgreSQL existente
-  2. Importa recibos faltantes (locrecibo → lancamentos_financeiros): ~72k
-  3. Atualiza verbas dos novos recibos (locrechist): ~216k
-  4. Importa lançamentos CC faltantes (loclanctocc → lancamentos_financeiros): ~391k
-  5. Importa repasses faltantes (locrepasse → prestacoes_contas): ~38k
-  6. Importa corretores (10) e corretoras (2) → pessoas + tipo
+  1. Reconstrói mapeamentos (cod→id) na tabela migration_id_map do PostgreSQL
+  2. Importa recibos faltantes (locrecibo → lancamentos_financeiros): ~72k,
+     já com as verbas agregadas de locrechist (~216k) — uma escrita por recibo
+  3. Aplica verbas aos recibos que já existiam no PostgreSQL
+  4. Sincroniza lançamentos CC (loclanctocc → lancamentos_financeiros): ~391k
+  5. Sincroniza repasses (locrepasse → prestacoes_contas): ~38k
+  6. Importa corretores (10) e corretoras (2) ainda não importados → pessoas + tipo
   7. Cria vínculos fiador↔inquilino (265) → fiadores_inquilinos
-  8. Re-migra lancamentos_financeiros → lancamentos (tabela final)
+  8. Sincroniza lancamentos_financeiros → lancamentos (tabela final)
+
+Com os mapeamentos prontos, os passos 2-7 são independentes e rodam em
+processos paralelos (cada um com sua conexão); o passo 8 espera 2-4.
+
+As transformações não traduzem códigos no Python: as tuplas vão para uma
+tabela de staging com os códigos do legado e a tradução é um JOIN com
+migration_id_map no INSERT ... SELECT (id_map_pg.py).
+
+Com MIGRATION_TRANSFORM=sql (ELT) o Python só extrai: locrecibo, locrechist,
+loclanctocc, locrepasse e locfiador_inq vão literais para o schema
+mysql_staging (elt_staging.py) e os SELECTs ELT_* fazem as mesmas
+transformações no servidor, com SITUACAO_MAP/VERBA_MAP/TIPO_POR_SINAL como
+tabelas de lookup.
+
+Passos 4, 5 e 8 são incrementais: cada linha guarda a chave de origem
+(loclanctocc.codigo, locrepasse.codigo, lancamentos_financeiros.id) e uma
+nova execução só insere/atualiza/apaga o que mudou no dump.
 
 Uso: python3 hotfix_complete_migration.py
+     MIGRATION_LOADER=execute_values python3 hotfix_complete_migration.py  # sem COPY
+     MIGRATION_IMPORT_MODE=full python3 hotfix_complete_migration.py       # apaga e recarrega
+     MIGRATION_WORKERS=1 python3 hotfix_complete_migration.py              # sequencial
+     MIGRATION_TRANSFORM=sql python3 hotfix_complete_migration.py          # ELT (mysql_staging)
 """
-import re
+import os
 import sys
 import psycopg2
-import psycopg2.extras
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
+from functools import lru_cache, partial
+
+sys.path.insert(0, os.path.dirname(__file__))
+import config as cfg
+from dump_reader import DumpReader
+from scheduler import run_graph
+from id_map_pg import mapped_select, put_ids, refresh_id_map, stage_mapped
+from pipeline import (batched, copy_rows, load_rows, peak_rss_mb, stage_batches, stage_rows,
+                      stage_select, sync_table, wal_bytes_since, wal_lsn)
+from elt_staging import ensure_staging_schema, materialize_lookup, stage_dump_table
+from address_resolver import Placeholders
+from pessoa_writer import create_pessoas
+from row_spec import RowSpec
+from money import cents_text, to_cents
+from columnar import CentsColumn, ColumnBatch, ConstColumn, DateColumn, DictColumn, IntColumn
 
 DUMP = '/home/marciorsm/AlmasaStudio/bkpBancoFormatoAntigo/bkpjpw_20260220_121003.sql'
 PG_DSN = "host=127.0.0.1 port=5432 dbname=almasa_prod user=almasa_local password=password"
 
-# Column indices for MySQL tables
-# locrecibo: recibo(0), nrobancario(1), inquilino(2), competencia(3), vencto(4), limite(5),
-#            valor(6), situacao(7), datasit(8), valorpago(9), tipobx(10), abono(11),
-#            irate(12), multa(13), irapos(14), contabanc(15), contrapartida(16),
-#            codbanco(17), carta(18), acordo(19), dtacordo(20), multaacordo(21),
-#            comissao(22), parccomis(23), contaprop(24), datahora(25)
-
-# loclanctocc: codigo(0), data(1), contrapartida(2), tpref(3), referencia(4), conta(5),
-#              historico(6), valor(7), sinal(8), recibo(9), imovel(10), lanctocpmf(11),
-#              inquilino(12), lctoConpag(13), datahora(14), idrepasse(15), processo(16)
-
-# locrepasse: codigo(0), proprietario(1), valor(2), periodo1(3), periodo2(4),
-#             databaixa(5), idlancto(6), imovel(7)
-
-# locrechist: id(0), recibo(1), conta(2), descricao(3), valor(4), datahora(5)
-
-
-def parse_mysql_values(line: str) -> list:
-    """Parse MySQL INSERT INTO ... VALUES (...),(...); into list of tuples."""
-    idx = line.find('VALUES')
-    if idx == -1:
-        return []
-    data = line[idx + 6:].rstrip().rstrip(';')
-
-    rows = []
-    current_row = []
-    current_val = ''
-    in_string = False
-    escape_next = False
-    paren_depth = 0
-
-    for ch in data:
-        if escape_next:
-            current_val += ch
-            escape_next = False
-            continue
-        if ch == '\\':
-            escape_next = True
-            current_val += ch
-            continue
-        if ch == "'" and not in_string:
-            in_string = True
-            continue
-        if ch == "'" and in_string:
-            in_string = False
-            continue
-        if in_string:
-            current_val += ch
-            continue
-        if ch == '(':
-            paren_depth += 1
-            if paren_depth == 1:
-                current_row = []
-                current_val = ''
-            continue
-        if ch == ')':
-            paren_depth -= 1
-            if paren_depth == 0:
-                current_row.append(current_val.strip())
-                rows.append(tuple(current_row))
-                current_row = []
-                current_val = ''
-            continue
-        if ch == ',' and paren_depth == 1:
-            current_row.append(current_val.strip())
-            current_val = ''
-            continue
-        if paren_depth >= 1:
-            current_val += ch
-
-    return rows
+# Colunas das tabelas do dump, por posição. As transformações resolvem as
+# posições pelos nomes (row_spec.py) com o CREATE TABLE do dump; estes nomes
+# valem quando o dump não traz o CREATE TABLE e nomeiam as colunas no staging.
+DUMP_COLUMNS = {
+    'locrecibo': ('recibo', 'nrobancario', 'inquilino', 'competencia', 'vencto', 'limite',
+                  'valor', 'situacao', 'datasit', 'valorpago', 'tipobx', 'abono',
+                  'irate', 'multa', 'irapos', 'contabanc', 'contrapartida',
+                  'codbanco', 'carta', 'acordo', 'dtacordo', 'multaacordo',
+                  'comissao', 'parccomis', 'contaprop', 'datahora'),
+    'locrechist': ('id', 'recibo', 'conta', 'descricao', 'valor', 'datahora'),
+    'loclanctocc': ('codigo', 'data', 'contrapartida', 'tpref', 'referencia', 'conta',
+                    'historico', 'valor', 'sinal', 'recibo', 'imovel', 'lanctocpmf',
+                    'inquilino', 'lctoconpag', 'datahora', 'idrepasse', 'processo'),
+    'locrepasse': ('codigo', 'proprietario', 'valor', 'periodo1', 'periodo2',
+                   'databaixa', 'idlancto', 'imovel'),
+    'locfiador_inq': ('fiador', 'inquilino'),
+}
 
 
 def safe_float(v, default=0.0):
@@ -114,17 +97,34 @@ def safe_int(v, default=0):
         return default
 
 
+# O dump tem poucos milhares de datas distintas em ~700k linhas: as
+# conversões ficam memorizadas pela string crua (LRU limitado).
+DATE_CACHE_SIZE = 16384
+NO_DATE = frozenset(('NULL', 'None', '0000-00-00', '1901-01-01'))
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def safe_date(v):
     """Parse MySQL date. Returns None for invalid/zero dates."""
-    if not v or v in ('NULL', 'None', '0000-00-00', '1901-01-01'):
+    if not v:
         return None
     v = v.strip()
+    if v in NO_DATE:
+        return None
+    # 'AAAA-MM-DD' por fatiamento; o resto (ex.: '2020-1-5') pelo strptime
+    if (len(v) == 10 and v[4] == '-' and v[7] == '-'
+            and v[:4].isdigit() and v[5:7].isdigit() and v[8:].isdigit()):
+        try:
+            return date(int(v[:4]), int(v[5:7]), int(v[8:]))
+        except ValueError:
+            return None
     try:
         return datetime.strptime(v, '%Y-%m-%d').date()
     except ValueError:
         return None
 
 
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def parse_competencia(comp_str):
     """Parse competencia MM/YYYY or YYYY-MM to date (first of month)."""
     if not comp_str or comp_str == 'NULL':
@@ -144,327 +144,450 @@ def parse_competencia(comp_str):
 
 SITUACAO_MAP = {0: 'aberto', 1: 'pago', 2: 'cancelado', 3: 'acordado', 4: 'judicial', 5: 'aberto'}
 
+LF_COLUMNS = (
+    'id_contrato', 'id_imovel', 'id_inquilino', 'id_proprietario',
+    'id_conta', 'id_conta_bancaria', 'numero_acordo', 'numero_parcela',
+    'numero_recibo', 'numero_boleto',
+    'competencia', 'data_lancamento', 'data_vencimento', 'data_limite',
+    'valor_principal', 'valor_condominio', 'valor_iptu', 'valor_agua', 'valor_luz', 'valor_gas', 'valor_outros',
+    'valor_multa', 'valor_juros', 'valor_honorarios', 'valor_desconto', 'valor_bonificacao',
+    'valor_total', 'valor_pago', 'valor_saldo',
+    'situacao', 'tipo_lancamento', 'origem',
+    'descricao', 'historico', 'observacoes',
+    'created_at', 'updated_at',
+)
+
+# loclanctocc carrega a chave de origem (loclanctocc.codigo) para o diff
+LF_CC_COLUMNS = LF_COLUMNS + ('codigo_origem',)
+
+PC_COLUMNS = (
+    'numero', 'ano', 'data_inicio', 'data_fim', 'tipo_periodo', 'competencia',
+    'id_proprietario', 'id_imovel',
+    'incluir_ficha_financeira', 'incluir_lancamentos',
+    'total_receitas', 'total_despesas', 'total_taxa_admin', 'total_retencao_ir',
+    'valor_repasse',
+    'status', 'data_repasse', 'forma_repasse',
+    'id_conta_bancaria', 'comprovante_repasse', 'observacoes',
+    'created_at', 'updated_at', 'created_by',
+    'codigo_origem',
+)
+
+# Novas prestações continuam a numeração existente, na ordem do legado
+PC_NUMERO_EXPR = ("(SELECT COALESCE(MAX(numero), 0) FROM prestacoes_contas)"
+                  " + row_number() OVER (ORDER BY s.codigo_origem)")
+
+# locrechist.conta -> coluna de verba (demais contas vão para valor_outros)
+VERBA_MAP = {
+    1001: 'valor_principal', 1006: 'valor_condominio', 1008: 'valor_iptu',
+    1028: 'valor_agua', 1048: 'valor_luz', 1029: 'valor_gas',
+}
+VERBA_COLUMNS = ('valor_principal', 'valor_condominio', 'valor_iptu', 'valor_agua',
+                 'valor_luz', 'valor_gas', 'valor_outros')
+
+# loclanctocc.sinal -> tipo_lancamento (demais sinais: despesa)
+TIPO_POR_SINAL = {'C': 'receita'}
+
+# Verbas agregadas por recibo aplicadas num único UPDATE ... FROM.
+# Colunas sem verba no staging (NULL) mantêm o valor atual; valor_total é
+# recalculado com os valores finais.
+APPLY_VERBAS_SQL = """
+    UPDATE lancamentos_financeiros lf SET
+        valor_principal  = COALESCE(v.valor_principal,  lf.valor_principal),
+        valor_condominio = COALESCE(v.valor_condominio, lf.valor_condominio),
+        valor_iptu       = COALESCE(v.valor_iptu,       lf.valor_iptu),
+        valor_agua       = COALESCE(v.valor_agua,       lf.valor_agua),
+        valor_luz        = COALESCE(v.valor_luz,        lf.valor_luz),
+        valor_gas        = COALESCE(v.valor_gas,        lf.valor_gas),
+        valor_outros     = COALESCE(v.valor_outros,     lf.valor_outros),
+        valor_total =
+            COALESCE(v.valor_principal,  lf.valor_principal,  0) +
+            COALESCE(v.valor_condominio, lf.valor_condominio, 0) +
+            COALESCE(v.valor_iptu,       lf.valor_iptu,       0) +
+            COALESCE(v.valor_agua,       lf.valor_agua,       0) +
+            COALESCE(v.valor_luz,        lf.valor_luz,        0) +
+            COALESCE(v.valor_gas,        lf.valor_gas,        0) +
+            COALESCE(v.valor_outros,     lf.valor_outros,     0) +
+            COALESCE(lf.valor_multa, 0) + COALESCE(lf.valor_juros, 0)
+    FROM tmp_verbas v
+    WHERE lf.numero_recibo = v.numero_recibo
+      AND lf.origem = 'migracao_mysql'
+"""
 
-def main():
-    t0 = datetime.now()
-    print(f"[{t0}] Hotfix: Importação completa de dados faltantes")
-    print(f"  Dump: {DUMP}")
-
-    conn = psycopg2.connect(PG_DSN)
-    conn.autocommit = False
-    cur = conn.cursor()
-
-    # =========================================================
-    # STEP 0: Rebuild ID mappings from PostgreSQL
-    # =========================================================
-    print("\n=== STEP 0: Reconstruindo mapeamentos ===")
-
-    # loclocador[cod] → pessoas.idpessoa (tipo=4)
-    cur.execute("SELECT p.cod, p.idpessoa FROM pessoas p JOIN pessoas_tipos pt ON pt.id_pessoa = p.idpessoa WHERE pt.id_tipo_pessoa = 4")
-    locador_map = {r[0]: r[1] for r in cur.fetchall()}
-
-    # locinquilino[cod] → pessoas.idpessoa (tipo=12)
-    cur.execute("SELECT p.cod, p.idpessoa FROM pessoas p JOIN pessoas_tipos pt ON pt.id_pessoa = p.idpessoa WHERE pt.id_tipo_pessoa = 12")
-    inquilino_map = {r[0]: r[1] for r in cur.fetchall()}
-
-    # locfiador[cod] → pessoas.idpessoa (tipo=1)
-    cur.execute("SELECT p.cod, p.idpessoa FROM pessoas p JOIN pessoas_tipos pt ON pt.id_pessoa = p.idpessoa WHERE pt.id_tipo_pessoa = 1")
-    fiador_map = {r[0]: r[1] for r in cur.fetchall()}
-
-    # locimovel[cod] → imoveis.id (formato IM0005 → 5)
-    cur.execute("SELECT CAST(REGEXP_REPLACE(codigo_interno, '[^0-9]', '', 'g') AS INTEGER), id FROM imoveis WHERE codigo_interno ~ '[0-9]'")
-    imovel_map = {r[0]: r[1] for r in cur.fetchall()}
-
-    # contrato: inquilino_cod → imoveis_contratos.id (via imoveis_contratos join)
-    cur.execute("""
-        SELECT p.cod, ic.id, ic.id_imovel
-        FROM imoveis_contratos ic
-        JOIN pessoas p ON p.idpessoa = ic.id_pessoa_locatario
-        JOIN pessoas_tipos pt ON pt.id_pessoa = p.idpessoa AND pt.id_tipo_pessoa = 12
-    """)
-    contrato_map = {}  # inq_cod → (contrato_id, imovel_id)
-    for r in cur.fetchall():
-        contrato_map[r[0]] = (r[1], r[2])
-
-    # imovel → proprietario (for loclanctocc)
-    cur.execute("SELECT id, id_pessoa_proprietario FROM imoveis WHERE id_pessoa_proprietario IS NOT NULL")
-    imovel_prop_map = {r[0]: r[1] for r in cur.fetchall()}
+# lancamentos espelha lancamentos_financeiros (chave: id_lancamento_financeiro).
+# NULLs tipados para que a subconsulta sirva de origem ao INSERT e ao UPDATE.
+LANC_COLUMNS = (
+    'data_movimento', 'id_plano_conta', 'id_imovel', 'id_proprietario', 'id_inquilino',
+    'valor', 'tipo', 'historico', 'numero_recibo', 'numero_documento', 'competencia',
+    'created_at', 'updated_at', 'data_vencimento', 'data_pagamento', 'numero', 'centro_custo',
+    'id_pessoa_credor', 'id_pessoa_pagador', 'id_contrato', 'id_conta_bancaria', 'id_boleto',
+    'valor_pago', 'valor_desconto', 'valor_juros', 'valor_multa',
+    'reter_inss', 'perc_inss', 'valor_inss', 'reter_iss', 'perc_iss', 'valor_iss',
+    'forma_pagamento', 'tipo_documento', 'status', 'suspenso_motivo', 'origem', 'id_processo',
+    'observacoes', 'created_by', 'id_lancamento_financeiro',
+)
+
+LANCAMENTOS_SOURCE_SQL = """(
+    SELECT
+        lf.data_lancamento AS data_movimento,
+        CASE
+            WHEN lf.tipo_lancamento = 'aluguel' THEN 995
+            WHEN lf.tipo_lancamento = 'receita' THEN 1029
+            WHEN lf.tipo_lancamento = 'despesa' THEN 1021
+            ELSE 995
+        END AS id_plano_conta,
+        lf.id_imovel, lf.id_proprietario, lf.id_inquilino,
+        lf.valor_total AS valor,
+        CASE
+            WHEN lf.tipo_lancamento IN ('receita', 'aluguel') THEN 'receber'
+            WHEN lf.tipo_lancamento = 'despesa' THEN 'pagar'
+            ELSE 'receber'
+        END AS tipo,
+        COALESCE(lf.historico, lf.descricao) AS historico,
+        CASE WHEN lf.numero_recibo ~ '^[0-9]+$' THEN CAST(lf.numero_recibo AS INTEGER) ELSE NULL END AS numero_recibo,
+        NULL::varchar AS numero_documento,
+        TO_CHAR(lf.competencia, 'YYYY-MM') AS competencia,
+        lf.created_at, lf.updated_at,
+        lf.data_vencimento,
+        CASE WHEN lf.situacao = 'pago' THEN lf.data_vencimento ELSE NULL END AS data_pagamento,
+        NULL::integer AS numero, NULL::varchar AS centro_custo,
+        CASE WHEN lf.tipo_lancamento IN ('receita', 'aluguel') THEN lf.id_proprietario ELSE NULL END AS id_pessoa_credor,
+        CASE WHEN lf.tipo_lancamento IN ('receita', 'aluguel') THEN lf.id_inquilino ELSE NULL END AS id_pessoa_pagador,
+        lf.id_contrato, lf.id_conta_bancaria, NULL::integer AS id_boleto,
+        COALESCE(lf.valor_pago, 0)::numeric(15,2) AS valor_pago,
+        COALESCE(lf.valor_desconto, 0)::numeric(15,2) AS valor_desconto,
+        COALESCE(lf.valor_juros, 0)::numeric(15,2) AS valor_juros,
+        COALESCE(lf.valor_multa, 0)::numeric(15,2) AS valor_multa,
+        false AS reter_inss, NULL::numeric AS perc_inss, NULL::numeric AS valor_inss,
+        false AS reter_iss, NULL::numeric AS perc_iss, NULL::numeric AS valor_iss,
+        NULL::varchar AS forma_pagamento, NULL::varchar AS tipo_documento,
+        CASE
+            WHEN lf.situacao = 'aberto' THEN 'aberto'
+            WHEN lf.situacao = 'pago' THEN 'pago'
+            WHEN lf.situacao = 'cancelado' THEN 'cancelado'
+            WHEN lf.situacao = 'estornado' THEN 'cancelado'
+            WHEN lf.situacao = 'parcial' THEN 'pago_parcial'
+            ELSE 'aberto'
+        END AS status,
+        NULL::varchar AS suspenso_motivo,
+        CASE WHEN lf.origem IS NOT NULL THEN lf.origem ELSE 'importacao' END AS origem,
+        NULL::integer AS id_processo,
+        lf.observacoes,
+        lf.created_by,
+        lf.id AS id_lancamento_financeiro
+    FROM lancamentos_financeiros lf
+    WHERE lf.id IS NOT NULL
+)"""
+
+# Colunas de staging que guardam um código do legado -> entidade em
+# migration_id_map. recibos: todas recebem locrecibo.inquilino (o contrato,
+# o imóvel e o proprietário vêm do contrato do inquilino).
+RECIBO_MAPPED = {
+    'id_contrato': 'locinquilino.contrato',
+    'id_imovel': 'locinquilino.contrato_imovel',
+    'id_inquilino': 'locinquilino',
+    'id_proprietario': 'locinquilino.contrato_proprietario',
+}
+# loclanctocc: imóvel e proprietário recebem loclanctocc.imovel
+LANCTOCC_MAPPED = {
+    'id_imovel': 'locimovel',
+    'id_inquilino': 'locinquilino',
+    'id_proprietario': 'locimovel.proprietario',
+    'id_conta': 'plano_contas',
+}
+# locrepasse: repasse sem locador mapeado é descartado (required)
+REPASSE_MAPPED = {'id_proprietario': 'loclocador', 'id_imovel': 'locimovel'}
+FIADOR_INQ_MAPPED = {'id_fiador': 'locfiador', 'id_inquilino': 'locinquilino'}
+
+# Tabelas do dump lidas por este hotfix
+SOURCE_TABLES = ('locrecibo', 'locrechist', 'loclanctocc', 'locrepasse',
+                 'locfiador_inq', 'loccorretores', 'loccorretora')
+
+
+# =========================================================
+# MODO ELT (MIGRATION_TRANSFORM=sql): as mesmas transformações em SQL
+# =========================================================
+# As tabelas vão literais para o schema de staging; os SELECTs abaixo
+# produzem as mesmas tuplas que as funções transform_* (códigos do legado
+# nas colunas mapeadas), direto no servidor.
+
+STG = cfg.STAGING_SCHEMA
+
+# Dicionários de domínio materializados como tabelas de lookup
+ELT_LOOKUPS = (
+    ('map_situacao', 'integer', 'text', SITUACAO_MAP),
+    ('map_verba', 'integer', 'text', VERBA_MAP),
+    ('map_sinal', 'text', 'text', TIPO_POR_SINAL),
+)
+
+# aggregate_verbas: total por recibo e coluna de verba (NULL = sem verba)
+ELT_VERBAS_SQL = f"""
+    CREATE TEMP TABLE tmp_verbas AS
+    SELECT btrim(h.recibo::text) AS numero_recibo,
+""" + ',\n'.join(
+    f"           SUM({STG}.safe_num(h.valor::text)) FILTER (WHERE mv.valor "
+    + ("IS NULL" if c == 'valor_outros' else f"= '{c}'") + f")::numeric(15,2) AS {c}"
+    for c in VERBA_COLUMNS
+) + f"""
+    FROM {STG}.locrechist h
+    LEFT JOIN {STG}.map_verba mv ON mv.chave = {STG}.safe_int(h.conta::text)
+    GROUP BY 1
+"""
 
-    # plano_contas: codigo → id
-    cur.execute("SELECT CAST(codigo AS INTEGER), id FROM plano_contas WHERE codigo ~ '^[0-9]+$'")
-    plano_map = {r[0]: r[1] for r in cur.fetchall()}
+# transform_recibos (LF_COLUMNS), recibos ainda não importados
+ELT_RECIBOS_SQL = f"""
+    SELECT x.inquilino, x.inquilino, x.inquilino, x.inquilino,
+           NULL, NULL, NULL, NULL,
+           x.numero_recibo, NULLIF(x.nrobancario, ''),
+           x.competencia, COALESCE(x.datasit, x.vencto), x.vencto, x.limite,
+           t.principal, COALESCE(v.valor_condominio, 0), COALESCE(v.valor_iptu, 0),
+           COALESCE(v.valor_agua, 0), COALESCE(v.valor_luz, 0), COALESCE(v.valor_gas, 0),
+           COALESCE(v.valor_outros, 0),
+           x.multa, 0, 0, 0, 0,
+           t.total, x.valorpago, GREATEST(t.total - x.valorpago, 0),
+           COALESCE(ms.valor, 'aberto'), 'aluguel', 'migracao_mysql',
+           NULL, NULL, NULL,
+           %(now)s, %(now)s
+    FROM (
+        SELECT btrim(r.recibo::text) AS numero_recibo,
+               btrim(r.nrobancario::text) AS nrobancario,
+               {STG}.safe_int(r.inquilino::text) AS inquilino,
+               COALESCE({STG}.parse_competencia(r.competencia::text),
+                        DATE '2020-01-01') AS competencia,
+               COALESCE({STG}.safe_date(r.vencto::text),
+                        {STG}.parse_competencia(r.competencia::text),
+                        DATE '2020-01-01') AS vencto,
+               {STG}.safe_date(r.limite::text) AS limite,
+               {STG}.safe_num(r.valor::text) AS valor,
+               {STG}.safe_int(r.situacao::text) AS situacao,
+               {STG}.safe_date(r.datasit::text) AS datasit,
+               {STG}.safe_num(r.valorpago::text) AS valorpago,
+               {STG}.safe_num(r.multa::text) AS multa
+        FROM {STG}.locrecibo r
+    ) x
+    LEFT JOIN tmp_verbas v ON v.numero_recibo = x.numero_recibo
+    LEFT JOIN {STG}.map_situacao ms ON ms.chave = x.situacao
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(v.valor_principal, x.valor) AS principal,
+               COALESCE(v.valor_principal, x.valor) + COALESCE(v.valor_condominio, 0)
+               + COALESCE(v.valor_iptu, 0) + COALESCE(v.valor_agua, 0)
+               + COALESCE(v.valor_luz, 0) + COALESCE(v.valor_gas, 0)
+               + COALESCE(v.valor_outros, 0) + x.multa AS total
+    ) t
+    WHERE NOT EXISTS (SELECT 1 FROM lancamentos_financeiros lf
+                      WHERE lf.numero_recibo = x.numero_recibo)
+"""
 
-    # Existing recibos (to skip duplicates)
-    cur.execute("SELECT numero_recibo FROM lancamentos_financeiros WHERE numero_recibo IS NOT NULL")
-    existing_recibos = {r[0] for r in cur.fetchall()}
+# transform_lanctocc (LF_CC_COLUMNS)
+ELT_LANCTOCC_SQL = f"""
+    SELECT NULL, x.imovel, x.inquilino, x.imovel, x.conta,
+           NULL, NULL, NULL, NULL, NULL,
+           date_trunc('month', x.data)::date, x.data, x.data, NULL,
+           x.valor, 0, 0, 0, 0, 0, 0,
+           0, 0, 0, 0, 0,
+           x.valor, x.valor, 0,
+           'pago', COALESCE(mt.valor, 'despesa'), 'extrato_cc_migracao',
+           NULL, x.historico, NULL,
+           %(now)s, %(now)s,
+           x.codigo
+    FROM (
+        SELECT {STG}.safe_int(c.codigo::text) AS codigo,
+               {STG}.safe_date(c.data::text) AS data,
+               {STG}.safe_int(c.conta::text) AS conta,
+               left(btrim(NULLIF(c.historico::text, '')), 255) AS historico,
+               {STG}.safe_num(c.valor::text) AS valor,
+               upper(btrim(c.sinal::text)) AS sinal,
+               {STG}.safe_int(c.imovel::text) AS imovel,
+               {STG}.safe_int(c.inquilino::text) AS inquilino
+        FROM {STG}.loclanctocc c
+    ) x
+    LEFT JOIN {STG}.map_sinal mt ON mt.chave = x.sinal
+    WHERE x.data IS NOT NULL AND x.valor > 0
+"""
 
-    # Existing loclanctocc IDs (check by origin)
-    cur.execute("SELECT id FROM lancamentos_financeiros WHERE origem = 'extrato_cc_migracao'")
-    existing_cc_count = cur.rowcount
+# transform_repasses (PC_COLUMNS)
+ELT_REPASSES_SQL = f"""
+    SELECT row_number() OVER (ORDER BY x.codigo), extract(year FROM x.periodo2)::int,
+           x.periodo1, x.periodo2, 'mensal', to_char(x.periodo2, 'YYYY-MM'),
+           x.proprietario, x.imovel,
+           false, false,
+           x.valor, 0, 0, 0,
+           x.valor,
+           'pago', COALESCE(x.databaixa, x.periodo2), 'transferencia',
+           NULL, NULL, NULL,
+           %(now)s, %(now)s, NULL,
+           x.codigo
+    FROM (
+        SELECT {STG}.safe_int(r.codigo::text) AS codigo,
+               {STG}.safe_int(r.proprietario::text) AS proprietario,
+               {STG}.safe_num(r.valor::text) AS valor,
+               COALESCE({STG}.safe_date(r.periodo1::text), DATE '2020-01-01') AS periodo1,
+               COALESCE({STG}.safe_date(r.periodo2::text), {STG}.safe_date(r.periodo1::text),
+                        DATE '2020-01-01') AS periodo2,
+               {STG}.safe_date(r.databaixa::text) AS databaixa,
+               {STG}.safe_int(r.imovel::text) AS imovel
+        FROM {STG}.locrepasse r
+    ) x
+"""
 
-    print(f"  Locadores: {len(locador_map)}, Inquilinos: {len(inquilino_map)}, Fiadores: {len(fiador_map)}")
-    print(f"  Imóveis: {len(imovel_map)}, Contratos: {len(contrato_map)}")
-    print(f"  Plano contas: {len(plano_map)}, Recibos existentes: {len(existing_recibos)}")
+ELT_FIADOR_INQ_SQL = f"""
+    SELECT {STG}.safe_int(f.fiador::text), {STG}.safe_int(f.inquilino::text)
+    FROM {STG}.locfiador_inq f
+"""
 
-    # =========================================================
-    # STEP 1: Parse full MySQL dump
-    # =========================================================
-    print("\n=== STEP 1: Lendo dump MySQL completo ===")
-    recibos = []
-    rechist = []
-    lanctocc = []
-    repasses = []
-    fiador_inq = []
-    corretores = []
-    corretoras = []
-
-    with open(DUMP, 'r', errors='replace') as f:
-        for line in f:
-            if 'INSERT INTO `locrecibo`' in line:
-                for r in parse_mysql_values(line):
-                    if len(r) >= 20:
-                        recibos.append(r)
-            elif 'INSERT INTO `locrechist`' in line:
-                for r in parse_mysql_values(line):
-                    if len(r) >= 5:
-                        rechist.append(r)
-            elif 'INSERT INTO `loclanctocc`' in line:
-                for r in parse_mysql_values(line):
-                    if len(r) >= 15:
-                        lanctocc.append(r)
-            elif 'INSERT INTO `locrepasse`' in line:
-                for r in parse_mysql_values(line):
-                    if len(r) >= 6:
-                        repasses.append(r)
-            elif 'INSERT INTO `locfiador_inq`' in line:
-                for r in parse_mysql_values(line):
-                    if len(r) >= 2:
-                        fiador_inq.append(r)
-            elif 'INSERT INTO `loccorretores`' in line:
-                for r in parse_mysql_values(line):
-                    if len(r) >= 2:
-                        corretores.append(r)
-            elif 'INSERT INTO `loccorretora`' in line:
-                for r in parse_mysql_values(line):
-                    if len(r) >= 2:
-                        corretoras.append(r)
-
-    print(f"  locrecibo: {len(recibos)}")
-    print(f"  locrechist: {len(rechist)}")
-    print(f"  loclanctocc: {len(lanctocc)}")
-    print(f"  locrepasse: {len(repasses)}")
-    print(f"  locfiador_inq: {len(fiador_inq)}")
-    print(f"  loccorretores: {len(corretores)}")
-    print(f"  loccorretora: {len(corretoras)}")
 
-    # =========================================================
-    # STEP 2: Import missing recibos → lancamentos_financeiros
-    # =========================================================
-    print("\n=== STEP 2: Importando recibos faltantes ===")
-    recibo_inserted = 0
-    recibo_skipped = 0
-    recibo_id_map = {}  # old_recibo_id → new_lf_id
-
-    # First, build map for existing recibos
-    cur.execute("SELECT numero_recibo, id FROM lancamentos_financeiros WHERE origem = 'migracao_mysql'")
-    for r in cur.fetchall():
-        recibo_id_map[r[0]] = r[1]
-
-    now = datetime.now()
-    batch = []
-    for r in recibos:
-        recibo_id = r[0].strip()
+# =========================================================
+# TRANSFORMAÇÕES (geradores: tupla do dump -> tupla de destino)
+# =========================================================
+
+# Campos lidos de cada tabela, na ordem em que as transformações os
+# desempacotam (ver row_spec.py). Valores monetários em centavos (money.py):
+# somas e diferenças são exatas e saem como texto numeric.
+RECHIST_SPEC = RowSpec('locrechist', (
+    ('recibo', '{0}.strip()'),
+    ('conta', safe_int),
+    ('valor', to_cents),
+), DUMP_COLUMNS['locrechist'], min_width=5)
+
+RECIBO_SPEC = RowSpec('locrecibo', (
+    ('nrobancario', '{0}.strip() or None'),
+    ('inquilino', safe_int),
+    ('competencia', parse_competencia),
+    ('vencto', safe_date),
+    ('limite', safe_date),
+    ('valor', to_cents),
+    ('situacao', "SITUACAO_MAP.get(safe_int({0}), 'aberto')"),
+    ('datasit', safe_date),
+    ('valorpago', to_cents),
+    ('multa', to_cents),
+), DUMP_COLUMNS['locrecibo'], min_width=20,
+    env={'SITUACAO_MAP': SITUACAO_MAP, 'safe_int': safe_int})
+
+LANCTOCC_SPEC = RowSpec('loclanctocc', (
+    ('codigo', safe_int),
+    ('conta', safe_int),
+    ('historico', '{0}.strip()[:255] if {0} else None'),
+    ('sinal', "TIPO_POR_SINAL.get({0}.strip().upper(), 'despesa')"),
+    ('imovel', safe_int),
+    ('inquilino', safe_int),
+), DUMP_COLUMNS['loclanctocc'], min_width=15, env={'TIPO_POR_SINAL': TIPO_POR_SINAL})
+
+REPASSE_SPEC = RowSpec('locrepasse', (
+    ('codigo', safe_int),
+    ('proprietario', safe_int),
+    ('valor', to_cents),
+    ('periodo1', safe_date),
+    ('periodo2', safe_date),
+    ('databaixa', safe_date),
+    ('imovel', safe_int, 0),
+), DUMP_COLUMNS['locrepasse'], min_width=6)
+
+
+# Verbas de um recibo sem locrechist (só o principal)
+NO_VERBAS = ('0.00',) * (len(VERBA_COLUMNS) - 1)
+
+
+def aggregate_verbas(rows, columns=None) -> dict:
+    """locrechist agrupado por recibo: recibo_str -> {coluna_verba: total em centavos}."""
+    extract, width = RECHIST_SPEC.compile(columns), RECHIST_SPEC.width(columns)
+    verba_accum = {}
+    for r in rows:
+        if len(r) < width:
+            continue
+        recibo_str, conta, valor = extract(r)
+        col = VERBA_MAP.get(conta, 'valor_outros')
+        verbas = verba_accum.get(recibo_str)
+        if verbas is None:
+            verbas = verba_accum[recibo_str] = {}
+        verbas[col] = verbas.get(col, 0) + valor
+    return verba_accum
+
+
+def transform_recibos(rows, existing_recibos, verba_accum, now, stats, columns=None):
+    """locrecibo -> lancamentos_financeiros (tipo aluguel), com as verbas finais.
+
+    Colunas de RECIBO_MAPPED saem com o código do inquilino no legado.
+    `columns`: nomes das colunas do dump (padrão: DUMP_COLUMNS).
+    """
+    extract, width = RECIBO_SPEC.compile(columns), RECIBO_SPEC.width(columns)
+    recibo_pos = RECIBO_SPEC.position('recibo', columns)
+    for r in rows:
+        if len(r) < width:
+            continue
+        recibo_id = r[recibo_pos].strip()
         if recibo_id in existing_recibos:
-            recibo_skipped += 1
+            stats['skipped'] += 1
             continue
 
-        inq_old = safe_int(r[2])
-        inq_new = inquilino_map.get(inq_old)
-        competencia = parse_competencia(r[3])
+        (nrobancario, inq_old, competencia, vencto, limite, valor,
+         situacao, datasit, valorpago, multa) = extract(r)
         if not competencia:
             competencia = date(2020, 1, 1)
-        vencto = safe_date(r[4]) or competencia
-        limite = safe_date(r[5])
-        valor = safe_float(r[6])
-        situacao = SITUACAO_MAP.get(safe_int(r[7]), 'aberto')
-        datasit = safe_date(r[8])
-        valorpago = safe_float(r[9])
-        multa = safe_float(r[13])
-        juros = 0.0  # irate is IR rate, not juros
-        nrobancario = r[1].strip() if r[1].strip() else None
+        vencto = vencto or competencia
+        juros = 0  # irate is IR rate, not juros
         data_lancamento = datasit or vencto
 
-        # Resolve contrato and imovel via inquilino
-        contrato_id = None
-        imovel_id = None
-        prop_id = None
-        if inq_old in contrato_map:
-            contrato_id, imovel_id = contrato_map[inq_old]
-            prop_id = imovel_prop_map.get(imovel_id)
-
-        valor_total = valor + multa
-
-        batch.append((
-            contrato_id, imovel_id, inq_new, prop_id,
+        # Verbas de locrechist já entram no INSERT (sem UPDATE posterior)
+        verbas = verba_accum.get(recibo_id)
+        if verbas:
+            stats['with_verbas'] += 1
+            principal = verbas.get('valor_principal', valor)
+            cond, iptu, agua, luz, gas, outros = (verbas.get(c, 0) for c in VERBA_COLUMNS[1:])
+            valor_total = principal + cond + iptu + agua + luz + gas + outros + multa + juros
+            verba_values = (cents_text(principal), cents_text(cond), cents_text(iptu),
+                            cents_text(agua), cents_text(luz), cents_text(gas), cents_text(outros))
+        else:
+            valor_total = valor + multa
+            verba_values = (cents_text(valor),) + NO_VERBAS
+
+        yield (
+            inq_old, inq_old, inq_old, inq_old,  # contrato, imovel, inquilino, proprietario
             None,  # id_conta (plano_contas) — NULL, like source
             None,  # id_conta_bancaria
             None,  # numero_acordo
             None,  # numero_parcela
             recibo_id, nrobancario,
             competencia, data_lancamento, vencto, limite,
-            valor, 0, 0, 0, 0, 0, 0,  # principal, cond, iptu, agua, luz, gas, outros
-            multa, juros, 0, 0, 0,  # multa, juros, honorarios, desconto, bonificacao
-            valor_total, valorpago, max(valor_total - valorpago, 0),
+            *verba_values,  # principal, cond, iptu, agua, luz, gas, outros
+            cents_text(multa), 0, 0, 0, 0,  # multa, juros, honorarios, desconto, bonificacao
+            cents_text(valor_total), cents_text(valorpago), cents_text(max(valor_total - valorpago, 0)),
             situacao, 'aluguel', 'migracao_mysql',
             None, None, None,  # descricao, historico, observacoes
             now, now
-        ))
-
-        if len(batch) >= 1000:
-            psycopg2.extras.execute_values(
-                cur,
-                """INSERT INTO lancamentos_financeiros (
-                    id_contrato, id_imovel, id_inquilino, id_proprietario,
-                    id_conta, id_conta_bancaria, numero_acordo, numero_parcela,
-                    numero_recibo, numero_boleto,
-                    competencia, data_lancamento, data_vencimento, data_limite,
-                    valor_principal, valor_condominio, valor_iptu, valor_agua, valor_luz, valor_gas, valor_outros,
-                    valor_multa, valor_juros, valor_honorarios, valor_desconto, valor_bonificacao,
-                    valor_total, valor_pago, valor_saldo,
-                    situacao, tipo_lancamento, origem,
-                    descricao, historico, observacoes,
-                    created_at, updated_at
-                ) VALUES %s""",
-                batch,
-                template="(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            )
-            recibo_inserted += len(batch)
-            conn.commit()
-            batch = []
-            if recibo_inserted % 10000 == 0:
-                print(f"  ... {recibo_inserted} recibos inseridos")
-
-    if batch:
-        psycopg2.extras.execute_values(
-            cur,
-            """INSERT INTO lancamentos_financeiros (
-                id_contrato, id_imovel, id_inquilino, id_proprietario,
-                id_conta, id_conta_bancaria, numero_acordo, numero_parcela,
-                numero_recibo, numero_boleto,
-                competencia, data_lancamento, data_vencimento, data_limite,
-                valor_principal, valor_condominio, valor_iptu, valor_agua, valor_luz, valor_gas, valor_outros,
-                valor_multa, valor_juros, valor_honorarios, valor_desconto, valor_bonificacao,
-                valor_total, valor_pago, valor_saldo,
-                situacao, tipo_lancamento, origem,
-                descricao, historico, observacoes,
-                created_at, updated_at
-            ) VALUES %s""",
-            batch,
-            template="(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
         )
-        recibo_inserted += len(batch)
-        conn.commit()
-
-    print(f"  Recibos inseridos: {recibo_inserted}, pulados: {recibo_skipped}")
 
-    # Rebuild recibo_id_map for rechist
-    cur.execute("SELECT numero_recibo, id FROM lancamentos_financeiros WHERE origem = 'migracao_mysql'")
-    recibo_id_map = {r[0]: r[1] for r in cur.fetchall()}
 
-    # =========================================================
-    # STEP 3: Update verbas from locrechist
-    # =========================================================
-    print(f"\n=== STEP 3: Atualizando verbas ({len(rechist)} registros) ===")
-    VERBA_MAP = {
-        1001: 'valor_principal', 1006: 'valor_condominio', 1008: 'valor_iptu',
-        1028: 'valor_agua', 1048: 'valor_luz', 1029: 'valor_gas',
-    }
-
-    # Accumulate verbas per recibo
-    verba_accum = {}  # recibo_str → {column: total}
-    for r in rechist:
-        recibo_str = r[1].strip()
-        conta = safe_int(r[2])
-        valor = safe_float(r[4])
-        col = VERBA_MAP.get(conta, 'valor_outros')
-        if recibo_str not in verba_accum:
-            verba_accum[recibo_str] = {}
-        verba_accum[recibo_str][col] = verba_accum[recibo_str].get(col, 0.0) + valor
+def transform_lanctocc(rows, now, stats, columns=None):
+    """loclanctocc -> lancamentos_financeiros (receita/despesa do extrato CC).
 
-    # Apply updates in batches
-    updated = 0
-    for recibo_str, verbas in verba_accum.items():
-        lf_id = recibo_id_map.get(recibo_str)
-        if not lf_id:
-            continue
-        sets = []
-        vals = []
-        for col, total in verbas.items():
-            sets.append(f"{col} = %s")
-            vals.append(round(total, 2))
-        if not sets:
+    Colunas de LANCTOCC_MAPPED saem com os códigos do legado.
+    `columns`: nomes das colunas do dump (padrão: DUMP_COLUMNS).
+    """
+    extract, width = LANCTOCC_SPEC.compile(columns), LANCTOCC_SPEC.width(columns)
+    data_pos = LANCTOCC_SPEC.position('data', columns)
+    valor_pos = LANCTOCC_SPEC.position('valor', columns)
+    for r in rows:
+        if len(r) < width:
             continue
-        # Also recalc valor_total
-        sets.append("valor_total = COALESCE(valor_principal,0)+COALESCE(valor_condominio,0)+COALESCE(valor_iptu,0)+COALESCE(valor_agua,0)+COALESCE(valor_luz,0)+COALESCE(valor_gas,0)+COALESCE(valor_outros,0)+COALESCE(valor_multa,0)+COALESCE(valor_juros,0)")
-        vals.append(lf_id)
-        cur.execute(f"UPDATE lancamentos_financeiros SET {', '.join(sets)} WHERE id = %s", vals)
-        updated += 1
-        if updated % 5000 == 0:
-            conn.commit()
-            print(f"  ... {updated} recibos atualizados com verbas")
-
-    conn.commit()
-    print(f"  Verbas aplicadas: {updated} recibos")
-
-    # =========================================================
-    # STEP 4: Import missing loclanctocc → lancamentos_financeiros
-    # =========================================================
-    print(f"\n=== STEP 4: Importando lançamentos CC faltantes ({len(lanctocc)} total) ===")
-
-    # Get max existing loclanctocc codigo to detect what's already imported
-    cur.execute("SELECT COUNT(*) FROM lancamentos_financeiros WHERE origem = 'extrato_cc_migracao'")
-    existing_cc = cur.fetchone()[0]
-    print(f"  Já importados: {existing_cc}")
-
-    # Delete existing CC records and re-import all (safest approach for idempotency)
-    cur.execute("DELETE FROM lancamentos_financeiros WHERE origem = 'extrato_cc_migracao'")
-    conn.commit()
-    print(f"  Deletados {existing_cc} registros CC antigos para re-importação completa")
-
-    cc_inserted = 0
-    cc_skipped = 0
-    batch = []
-
-    for r in lanctocc:
-        data = safe_date(r[1])
+        # Filtros antes de converter o resto da linha
+        data = safe_date(r[data_pos])
         if not data:
-            cc_skipped += 1
+            stats['skipped'] += 1
             continue
-        valor = safe_float(r[7])
-        if valor <= 0:
-            cc_skipped += 1
+        valor_cents = to_cents(r[valor_pos])
+        if valor_cents <= 0:
+            stats['skipped'] += 1
             continue
+        valor = cents_text(valor_cents)
 
-        conta_cod = safe_int(r[5])
-        sinal = r[8].strip().upper()
-        imovel_old = safe_int(r[10])
-        inq_old = safe_int(r[12])
-        historico = r[6].strip()[:255] if r[6] else None
-
-        imovel_new = imovel_map.get(imovel_old)
-        inq_new = inquilino_map.get(inq_old)
-        prop_new = imovel_prop_map.get(imovel_new) if imovel_new else None
-        plano_id = plano_map.get(conta_cod)
-
-        tipo_lancamento = 'receita' if sinal == 'C' else 'despesa'
+        codigo, conta_cod, historico, tipo_lancamento, imovel_old, inq_old = extract(r)
         competencia = data.replace(day=1)
 
-        batch.append((
+        yield (
             None,  # id_contrato
-            imovel_new,
-            inq_new,
-            prop_new,
-            plano_id,  # id_conta
+            imovel_old,
+            inq_old,
+            imovel_old,  # id_proprietario (pelo imóvel)
+            conta_cod,  # id_conta
             None,  # id_conta_bancaria
             None, None,  # numero_acordo, parcela
             None, None,  # numero_recibo, boleto
@@ -474,83 +597,74 @@ def main():
             valor, valor, 0,  # valor_total, valor_pago, valor_saldo
             'pago', tipo_lancamento, 'extrato_cc_migracao',
             None, historico, None,  # descricao, historico, observacoes
-            now, now
-        ))
-
-        if len(batch) >= 2000:
-            psycopg2.extras.execute_values(
-                cur,
-                """INSERT INTO lancamentos_financeiros (
-                    id_contrato, id_imovel, id_inquilino, id_proprietario,
-                    id_conta, id_conta_bancaria, numero_acordo, numero_parcela,
-                    numero_recibo, numero_boleto,
-                    competencia, data_lancamento, data_vencimento, data_limite,
-                    valor_principal, valor_condominio, valor_iptu, valor_agua, valor_luz, valor_gas, valor_outros,
-                    valor_multa, valor_juros, valor_honorarios, valor_desconto, valor_bonificacao,
-                    valor_total, valor_pago, valor_saldo,
-                    situacao, tipo_lancamento, origem,
-                    descricao, historico, observacoes,
-                    created_at, updated_at
-                ) VALUES %s""",
-                batch,
-                template="(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            )
-            cc_inserted += len(batch)
-            conn.commit()
-            batch = []
-            if cc_inserted % 50000 == 0:
-                print(f"  ... {cc_inserted} lançamentos CC inseridos")
-
-    if batch:
-        psycopg2.extras.execute_values(
-            cur,
-            """INSERT INTO lancamentos_financeiros (
-                id_contrato, id_imovel, id_inquilino, id_proprietario,
-                id_conta, id_conta_bancaria, numero_acordo, numero_parcela,
-                numero_recibo, numero_boleto,
-                competencia, data_lancamento, data_vencimento, data_limite,
-                valor_principal, valor_condominio, valor_iptu, valor_agua, valor_luz, valor_gas, valor_outros,
-                valor_multa, valor_juros, valor_honorarios, valor_desconto, valor_bonificacao,
-                valor_total, valor_pago, valor_saldo,
-                situacao, tipo_lancamento, origem,
-                descricao, historico, observacoes,
-                created_at, updated_at
-            ) VALUES %s""",
-            batch,
-            template="(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
+            now, now,
+            codigo,  # codigo_origem
         )
-        cc_inserted += len(batch)
-        conn.commit()
 
-    print(f"  Lançamentos CC inseridos: {cc_inserted}, pulados: {cc_skipped}")
 
-    # =========================================================
-    # STEP 5: Import missing repasses → prestacoes_contas
-    # =========================================================
-    print(f"\n=== STEP 5: Importando repasses faltantes ({len(repasses)} total) ===")
+COLUMNAR_BATCH_ROWS = 10000
 
-    # Delete and re-import (idempotent)
-    cur.execute("DELETE FROM prestacoes_contas")
-    conn.commit()
 
-    rep_inserted = 0
-    rep_skipped = 0
-    numero_seq = 1
-    batch = []
+def transform_lanctocc_batches(rows, now, stats, columns=None, batch_size=COLUMNAR_BATCH_ROWS):
+    """Como transform_lanctocc, em lotes colunares (columnar.ColumnBatch).
 
-    for r in repasses:
-        prop_old = safe_int(r[1])
-        prop_new = locador_map.get(prop_old)
-        if not prop_new:
-            rep_skipped += 1
+    Os filtros e conversões rodam coluna a coluna sobre o lote; o COPY
+    serializa o lote direto (stage_batches). Mesmas linhas e mesmo texto
+    que o caminho por tupla.
+    """
+    extract, width = LANCTOCC_SPEC.compile(columns), LANCTOCC_SPEC.width(columns)
+    data_pos = LANCTOCC_SPEC.position('data', columns)
+    valor_pos = LANCTOCC_SPEC.position('valor', columns)
+    for chunk in batched(rows, batch_size):
+        chunk = [r for r in chunk if len(r) >= width]
+        datas = [safe_date(r[data_pos]) for r in chunk]
+        valores = [to_cents(r[valor_pos]) if d else 0 for r, d in zip(chunk, datas)]
+        keep = [i for i, v in enumerate(valores) if v > 0]
+        stats['skipped'] += len(chunk) - len(keep)
+        if not keep:
             continue
 
-        valor = safe_float(r[2])
-        periodo1 = safe_date(r[3])
-        periodo2 = safe_date(r[4])
-        databaixa = safe_date(r[5])
-        imovel_old = safe_int(r[7]) if len(r) > 7 else 0
-        imovel_new = imovel_map.get(imovel_old)
+        codigo, conta_cod, historico, tipo_lancamento, imovel_old, inq_old = zip(
+            *[extract(chunk[i]) for i in keep])
+        datas = [datas[i] for i in keep]
+        competencia = DateColumn([d.replace(day=1) for d in datas])
+        datas = DateColumn(datas)
+        valor = CentsColumn([valores[i] for i in keep])
+        imovel = IntColumn(imovel_old)
+        zero, null = ConstColumn(0), ConstColumn(None)
+
+        yield ColumnBatch(LF_CC_COLUMNS, len(keep), {
+            'id_contrato': null, 'id_imovel': imovel, 'id_inquilino': IntColumn(inq_old),
+            'id_proprietario': imovel, 'id_conta': IntColumn(conta_cod), 'id_conta_bancaria': null,
+            'numero_acordo': null, 'numero_parcela': null, 'numero_recibo': null, 'numero_boleto': null,
+            'competencia': competencia,
+            'data_lancamento': datas, 'data_vencimento': datas, 'data_limite': null,
+            'valor_principal': valor, 'valor_condominio': zero, 'valor_iptu': zero,
+            'valor_agua': zero, 'valor_luz': zero, 'valor_gas': zero, 'valor_outros': zero,
+            'valor_multa': zero, 'valor_juros': zero, 'valor_honorarios': zero,
+            'valor_desconto': zero, 'valor_bonificacao': zero,
+            'valor_total': valor, 'valor_pago': valor, 'valor_saldo': zero,
+            'situacao': ConstColumn('pago'), 'tipo_lancamento': DictColumn(tipo_lancamento),
+            'origem': ConstColumn('extrato_cc_migracao'),
+            'descricao': null, 'historico': DictColumn(historico), 'observacoes': null,
+            'created_at': ConstColumn(now), 'updated_at': ConstColumn(now),
+            'codigo_origem': IntColumn(codigo),
+        })
+
+
+def transform_repasses(rows, now, columns=None):
+    """locrepasse -> prestacoes_contas (numeração sequencial a partir de 1).
+
+    Colunas de REPASSE_MAPPED saem com os códigos do legado.
+    `columns`: nomes das colunas do dump (padrão: DUMP_COLUMNS).
+    """
+    extract, width = REPASSE_SPEC.compile(columns), REPASSE_SPEC.width(columns)
+    numero_seq = 1
+    for r in rows:
+        if len(r) < width:
+            continue
+        codigo, prop_old, valor_cents, periodo1, periodo2, databaixa, imovel_old = extract(r)
+        valor = cents_text(valor_cents)
 
         if not periodo1:
             periodo1 = date(2020, 1, 1)
@@ -560,248 +674,471 @@ def main():
         ano = periodo2.year
         competencia = f"{periodo2.year}-{periodo2.month:02d}"
 
-        batch.append((
+        yield (
             numero_seq, ano, periodo1, periodo2, 'mensal', competencia,
-            prop_new, imovel_new,
+            prop_old, imovel_old,
             False, False,  # incluir_ficha, incluir_lancamentos
             valor, 0, 0, 0,  # total_receitas, despesas, taxa_admin, retencao_ir
             valor,  # valor_repasse
             'pago', databaixa or periodo2, 'transferencia',
             None, None, None,  # id_conta_bancaria, comprovante, observacoes
-            now, now, None  # created_at, updated_at, created_by
-        ))
+            now, now, None,  # created_at, updated_at, created_by
+            codigo,  # codigo_origem
+        )
         numero_seq += 1
 
-        if len(batch) >= 1000:
-            psycopg2.extras.execute_values(
-                cur,
-                """INSERT INTO prestacoes_contas (
-                    numero, ano, data_inicio, data_fim, tipo_periodo, competencia,
-                    id_proprietario, id_imovel,
-                    incluir_ficha_financeira, incluir_lancamentos,
-                    total_receitas, total_despesas, total_taxa_admin, total_retencao_ir,
-                    valor_repasse,
-                    status, data_repasse, forma_repasse,
-                    id_conta_bancaria, comprovante_repasse, observacoes,
-                    created_at, updated_at, created_by
-                ) VALUES %s""",
-                batch,
-                template="(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            )
-            rep_inserted += len(batch)
-            conn.commit()
-            batch = []
-            if rep_inserted % 10000 == 0:
-                print(f"  ... {rep_inserted} repasses inseridos")
-
-    if batch:
-        psycopg2.extras.execute_values(
-            cur,
-            """INSERT INTO prestacoes_contas (
-                numero, ano, data_inicio, data_fim, tipo_periodo, competencia,
-                id_proprietario, id_imovel,
-                incluir_ficha_financeira, incluir_lancamentos,
-                total_receitas, total_despesas, total_taxa_admin, total_retencao_ir,
-                valor_repasse,
-                status, data_repasse, forma_repasse,
-                id_conta_bancaria, comprovante_repasse, observacoes,
-                created_at, updated_at, created_by
-            ) VALUES %s""",
-            batch,
-            template="(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-        )
-        rep_inserted += len(batch)
+
+# =========================================================
+# PASSOS (cada um com sua conexão e seu mmap do dump)
+# =========================================================
+
+# Passo -> passos que precisam terminar antes. Com os mapeamentos do STEP 0
+# prontos, recibos, CC, repasses, corretores e fiadores são independentes;
+# o espelho em lancamentos (STEP 8) lê o que os STEPs 2-4 gravaram.
+STEP_DEPENDS = {
+    'recibos': set(),
+    'lanctocc': set(),
+    'repasses': set(),
+    'corretores': set(),
+    'fiador_inq': set(),
+    'lancamentos': {'recibos', 'lanctocc'},
+}
+
+
+def open_step():
+    conn = psycopg2.connect(PG_DSN)
+    conn.autocommit = False
+    return conn, conn.cursor(), DumpReader(DUMP)
+
+
+def close_step(conn, cur, reader):
+    cur.close()
+    conn.close()
+    reader.close()
+
+
+
+def step_recibos(ctx):
+    """STEP 2 + 3: recibos com verbas (locrecibo + locrechist)."""
+    existing_recibos = ctx['existing_recibos']
+    now = ctx['now']
+    conn, cur, reader = open_step()
+
+    print(f"\n=== STEP 2: Importando recibos faltantes com verbas "
+          f"({reader.index.row_count('locrechist')} registros de locrechist) ===")
+
+    # Staging temporário (sem WAL) com o código do inquilino; persiste entre
+    # os commits por lote do carregador e sai no DROP abaixo
+    stats = {'skipped': 0, 'with_verbas': 0}
+    cur.execute(f"CREATE TEMP TABLE tmp_recibos AS SELECT {', '.join(LF_COLUMNS)} "
+                "FROM lancamentos_financeiros WITH NO DATA")
+    if ctx['sql']:
+        # Verbas agregadas por recibo e recibos novos, tudo no servidor
+        cur.execute(ELT_VERBAS_SQL)
+        print(f"  Recibos com verbas: {cur.rowcount}")
+        cur.execute("ANALYZE tmp_verbas")
+        cur.execute(f"INSERT INTO tmp_recibos ({', '.join(LF_COLUMNS)}) {ELT_RECIBOS_SQL}",
+                    {'now': now})
+        stats['skipped'] = ctx['staged']['locrecibo'] - cur.rowcount
+        cur.execute("SELECT COUNT(*) FROM tmp_recibos r "
+                    "JOIN tmp_verbas v ON v.numero_recibo = r.numero_recibo")
+        stats['with_verbas'] = cur.fetchone()[0]
+        # Verbas de recibos novos já entram no INSERT; sobram as dos existentes
+        cur.execute("DELETE FROM tmp_verbas v USING tmp_recibos r "
+                    "WHERE v.numero_recibo = r.numero_recibo")
+        conn.commit()
+    else:
+        # Hash aggregate of locrechist per recibo, joined to locrecibo on the fly
+        verba_accum = aggregate_verbas(reader.iter_values_parallel('locrechist', cfg.PARSE_WORKERS),
+                                       reader.index.column_names('locrechist'))
+        print(f"  Recibos com verbas: {len(verba_accum)}")
         conn.commit()
+        report = load_rows(
+            conn, cfg.LOADER_BACKEND, 'tmp_recibos', LF_COLUMNS,
+            transform_recibos(reader.iter_values('locrecibo'), existing_recibos, verba_accum,
+                              now, stats, reader.index.column_names('locrecibo')),
+            1000, cfg.COPY_BATCH_SIZE, 'recibos', progress_every=10000,
+            depth=cfg.PIPELINE_DEPTH,
+        )
+        print(report.summary())
 
-    print(f"  Repasses inseridos: {rep_inserted}, pulados: {rep_skipped}")
+    wal_start = wal_lsn(cur)
+    cur.execute(f"INSERT INTO lancamentos_financeiros ({', '.join(LF_COLUMNS)}) "
+                + mapped_select('tmp_recibos', LF_COLUMNS, RECIBO_MAPPED))
+    inserted = cur.rowcount
+    cur.execute("DROP TABLE tmp_recibos")
+    conn.commit()
+    wal_insert = wal_bytes_since(cur, wal_start)
+    print(f"  Recibos inseridos: {inserted} ({stats['with_verbas']} com verbas), "
+          f"pulados: {stats['skipped']}")
 
     # =========================================================
-    # STEP 6: Import corretores (10) + corretoras (2)
+    # STEP 3: Apply verbas to recibos that already existed
     # =========================================================
+    # Novos recibos já foram gravados com as verbas; só os pré-existentes
+    # (de execuções anteriores) passam pelo UPDATE ... FROM.
+    updated = 0
+    if ctx['sql']:
+        cur.execute("SELECT COUNT(*) FROM tmp_verbas")
+        print(f"\n=== STEP 3: Aplicando verbas a recibos existentes ({cur.fetchone()[0]}) ===")
+        wal_start = wal_lsn(cur)
+        cur.execute(APPLY_VERBAS_SQL)
+        updated = cur.rowcount
+        cur.execute("DROP TABLE tmp_verbas")
+        conn.commit()
+    else:
+        pending = {k: v for k, v in verba_accum.items() if k in existing_recibos}
+        del verba_accum
+        print(f"\n=== STEP 3: Aplicando verbas a recibos existentes ({len(pending)}) ===")
+        wal_start = wal_lsn(cur)
+        if pending:
+            cur.execute("""
+                CREATE TEMP TABLE tmp_verbas (
+                    numero_recibo text PRIMARY KEY,
+                    valor_principal numeric(15,2), valor_condominio numeric(15,2),
+                    valor_iptu numeric(15,2), valor_agua numeric(15,2), valor_luz numeric(15,2),
+                    valor_gas numeric(15,2), valor_outros numeric(15,2)
+                ) ON COMMIT DROP
+            """)
+            copy_rows(cur, 'tmp_verbas', ('numero_recibo',) + VERBA_COLUMNS, (
+                (recibo_str,) + tuple(cents_text(verbas[c]) if c in verbas else None for c in VERBA_COLUMNS)
+                for recibo_str, verbas in pending.items()
+            ))
+            cur.execute("ANALYZE tmp_verbas")
+            cur.execute(APPLY_VERBAS_SQL)
+            updated = cur.rowcount
+            conn.commit()
+    wal_update = wal_bytes_since(cur, wal_start)
+    print(f"  Verbas aplicadas: {updated} recibos")
+
+    # WAL: um UPDATE reescreve a tupla inteira, então cada recibo novo com
+    # verbas custaria ~o mesmo que seu INSERT numa segunda escrita.
+    if inserted and wal_insert:
+        saved = wal_insert * stats['with_verbas'] // inserted
+        print(f"  WAL: INSERT {wal_insert / 1e6:.1f} MB, UPDATE {wal_update / 1e6:.1f} MB, "
+              f"~{saved / 1e6:.1f} MB poupados ({stats['with_verbas']} recibos sem 2ª escrita)")
+
+    close_step(conn, cur, reader)
+    return {'inseridos': inserted, 'verbas_aplicadas': updated}
+
+
+def step_lanctocc(ctx):
+    """STEP 4: loclanctocc -> lancamentos_financeiros (incremental)."""
+    now = ctx['now']
+    full = ctx['full']
+    conn, cur, reader = open_step()
+
+    print(f"\n=== STEP 4: Sincronizando lançamentos CC ({reader.index.row_count('loclanctocc')} total) ===")
+
+    cur.execute("SELECT COUNT(*), COUNT(codigo_origem) FROM lancamentos_financeiros "
+                "WHERE origem = 'extrato_cc_migracao'")
+    existing_cc, keyed_cc = cur.fetchone()
+    print(f"  Já importados: {existing_cc} ({keyed_cc} com chave de origem)")
+
+    # Linhas sem chave (cargas anteriores ao modo incremental) não entram no
+    # diff: são apagadas uma única vez e voltam com a chave preenchida
+    if full or keyed_cc < existing_cc:
+        cur.execute("DELETE FROM lancamentos_financeiros WHERE origem = 'extrato_cc_migracao'"
+                    + ("" if full else " AND codigo_origem IS NULL"))
+        print(f"  Removidos {cur.rowcount} registros CC para recarga")
+
+    stats = {'skipped': 0}
+    if ctx['sql']:
+        staged = stage_select(cur, 'tmp_lanctocc_raw', 'lancamentos_financeiros', LF_CC_COLUMNS,
+                              ELT_LANCTOCC_SQL, {'now': now})
+        stats['skipped'] = ctx['staged']['loclanctocc'] - staged
+    else:
+        staged = stage_batches(
+            cur, 'tmp_lanctocc_raw', 'lancamentos_financeiros', LF_CC_COLUMNS,
+            transform_lanctocc_batches(reader.iter_values_parallel('loclanctocc', cfg.PARSE_WORKERS),
+                                       now, stats, reader.index.column_names('loclanctocc')),
+            depth=cfg.PIPELINE_DEPTH,
+        )
+    stage_mapped(cur, 'tmp_lanctocc', 'tmp_lanctocc_raw', LF_CC_COLUMNS, LANCTOCC_MAPPED)
+    delta = sync_table(
+        cur, 'lancamentos_financeiros', 'tmp_lanctocc', 'codigo_origem', LF_CC_COLUMNS,
+        scope="t.origem = 'extrato_cc_migracao'",
+        insert_only=('created_at',), untracked=('updated_at',),
+    )
+    conn.commit()
+    print(f"  Lançamentos CC no dump: {staged}, pulados: {stats['skipped']}")
+    print(f"  Inseridos: {delta['inserted']}, atualizados: {delta['updated']}, "
+          f"removidos: {delta['deleted']}")
+
+    close_step(conn, cur, reader)
+    return delta
+
+
+def step_repasses(ctx):
+    """STEP 5: locrepasse -> prestacoes_contas (incremental)."""
+    now = ctx['now']
+    full = ctx['full']
+    conn, cur, reader = open_step()
+
+    print(f"\n=== STEP 5: Sincronizando repasses ({reader.index.row_count('locrepasse')} total) ===")
+
+    cur.execute("SELECT COUNT(*), COUNT(codigo_origem) FROM prestacoes_contas")
+    existing_pc, keyed_pc = cur.fetchone()
+    print(f"  Já importados: {existing_pc} ({keyed_pc} com chave de origem)")
+
+    # Primeira execução incremental: prestações antigas não têm chave,
+    # então a tabela é recarregada como antes
+    if full or (existing_pc and not keyed_pc):
+        cur.execute("DELETE FROM prestacoes_contas")
+        print(f"  Removidas {cur.rowcount} prestações para recarga")
+
+    if ctx['sql']:
+        staged = stage_select(cur, 'tmp_repasses_raw', 'prestacoes_contas', PC_COLUMNS,
+                              ELT_REPASSES_SQL, {'now': now})
+    else:
+        staged = stage_rows(
+            cur, 'tmp_repasses_raw', 'prestacoes_contas', PC_COLUMNS,
+            transform_repasses(reader.iter_values('locrepasse'), now,
+                               reader.index.column_names('locrepasse')),
+            depth=cfg.PIPELINE_DEPTH,
+        )
+    mapped = stage_mapped(cur, 'tmp_repasses', 'tmp_repasses_raw', PC_COLUMNS,
+                          REPASSE_MAPPED, required=('id_proprietario',))
+    delta = sync_table(
+        cur, 'prestacoes_contas', 'tmp_repasses', 'codigo_origem', PC_COLUMNS,
+        insert_only=('numero', 'created_at', 'created_by'), untracked=('updated_at',),
+        insert_exprs={'numero': PC_NUMERO_EXPR},
+    )
+    conn.commit()
+    print(f"  Repasses no dump: {staged}, pulados (sem locador): {staged - mapped}")
+    print(f"  Inseridos: {delta['inserted']}, atualizados: {delta['updated']}, "
+          f"removidos: {delta['deleted']}")
+
+    close_step(conn, cur, reader)
+    return delta
+
+
+PESSOA_COLUMNS = ('nome', 'fisica_juridica', 'tipo_pessoa', 'status', 'cod', 'dt_cadastro')
+
+# pg_advisory_xact_lock do STEP 6: duas execuções do hotfix ao mesmo tempo
+# criam corretores uma depois da outra, e a segunda vê os da primeira
+CORRETORES_LOCK = 0x6c6f6363  # 'locc'
+
+
+def existing_cods(cur, role_table: str) -> dict:
+    """cod -> id_pessoa das pessoas já criadas com um papel (pessoas_corretores...)."""
+    cur.execute(f"SELECT cod, MAX(id_pessoa) FROM {role_table} WHERE cod IS NOT NULL GROUP BY cod")
+    return dict(cur.fetchall())
+
+
+def step_corretores(ctx):
+    """STEP 6: loccorretores/loccorretora -> pessoas (só os códigos ainda não importados)."""
+    now = ctx['now']
+    conn, cur, reader = open_step()
+
+    corretores = [r for r in reader.iter_values('loccorretores') if len(r) >= 2]
+    corretoras = [r for r in reader.iter_values('loccorretora') if len(r) >= 2]
     print(f"\n=== STEP 6: Importando corretores ({len(corretores)}) e corretoras ({len(corretoras)}) ===")
 
-    cor_inserted = 0
+    # Endereço placeholder resolvido no STEP 0; cada grupo sai em 4 INSERTs
+    logradouro_id = ctx['placeholders'].logradouro_id
+
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (CORRETORES_LOCK,))
+    existing_cor = existing_cods(cur, 'pessoas_corretores')
+    existing_cora = existing_cods(cur, 'pessoas_corretoras')
+
+    pessoas = []
+    tipos = []
+    roles = []
+    seen = set(existing_cor)
     for r in corretores:
         codigo = safe_int(r[0])
+        if codigo in seen:
+            continue
+        seen.add(codigo)
         nome = r[1].strip()[:255] if r[1] else f'Corretor {codigo}'
         usuario = r[2].strip()[:255] if len(r) > 2 and r[2] else None
         status_str = r[3].strip()[:255] if len(r) > 3 and r[3] and r[3] != 'NULL' else None
         data_cadastro = safe_date(r[5]) if len(r) > 5 else None
         ativo = bool(safe_int(r[16])) if len(r) > 16 else True
 
-        # Create pessoa
-        cur.execute(
-            "INSERT INTO pessoas (nome, fisica_juridica, tipo_pessoa, status, cod, dt_cadastro) VALUES (%s, 'fisica', 'fisica', true, %s, %s) RETURNING idpessoa",
-            (nome, codigo, now)
-        )
-        pessoa_id = cur.fetchone()[0]
-
-        # Create pessoas_tipos (tipo=2 = corretor)
-        cur.execute(
-            "INSERT INTO pessoas_tipos (id_pessoa, id_tipo_pessoa, data_inicio, ativo) VALUES (%s, 2, %s, %s)",
-            (pessoa_id, date.today(), ativo)
-        )
-
-        # Create pessoas_corretores
-        cur.execute(
-            "INSERT INTO pessoas_corretores (id_pessoa, usuario, status, data_cadastro, ativo, cod) VALUES (%s, %s, %s, %s, %s, %s)",
-            (pessoa_id, usuario, status_str, data_cadastro, ativo, codigo)
-        )
-
-        # Create endereco placeholder
-        cur.execute("SELECT id FROM logradouros WHERE logradouro = 'SEM ENDERECO' LIMIT 1")
-        logr = cur.fetchone()
-        if logr:
-            cur.execute(
-                "INSERT INTO enderecos (id_pessoa, id_logradouro, id_tipo, end_numero) VALUES (%s, %s, 1, 0)",
-                (pessoa_id, logr[0])
-            )
-
-        cor_inserted += 1
+        pessoas.append((nome, 'fisica', 'fisica', True, codigo, now))
+        tipos.append((2, ativo))  # tipo=2 = corretor
+        roles.append((usuario, status_str, data_cadastro, ativo, codigo))
+    ids = create_pessoas(cur, PESSOA_COLUMNS, pessoas, tipos, 'pessoas_corretores',
+                         ('usuario', 'status', 'data_cadastro', 'ativo', 'cod'), roles, logradouro_id)
+    corretor_ids = [(p[4], pid) for p, pid in zip(pessoas, ids)]
 
+    pessoas = []
+    roles = []
+    seen = set(existing_cora)
     for r in corretoras:
         codigo = safe_int(r[0])
+        if codigo in seen:
+            continue
+        seen.add(codigo)
         nome = r[1].strip()[:255] if r[1] else f'Corretora {codigo}'
+        pessoas.append((nome, 'juridica', 'juridica', True, codigo, now))
+        roles.append((now, now, codigo))
+    ids = create_pessoas(cur, PESSOA_COLUMNS, pessoas, [(3, True)] * len(pessoas),
+                         'pessoas_corretoras', ('created_at', 'updated_at', 'cod'), roles, logradouro_id)
+    corretora_ids = [(p[4], pid) for p, pid in zip(pessoas, ids)]
+    cor_inserted = len(corretor_ids) + len(corretora_ids)
+
+    # Os já existentes também vão para o mapa (execuções anteriores a put_ids)
+    put_ids(cur, 'loccorretores', list(existing_cor.items()) + corretor_ids)
+    put_ids(cur, 'loccorretora', list(existing_cora.items()) + corretora_ids)
+    conn.commit()
+    cor_existing = len(existing_cor) + len(existing_cora)
+    print(f"  Corretores/Corretoras inseridos: {cor_inserted} (já existiam: {cor_existing})")
+
+    close_step(conn, cur, reader)
+    return {'inseridos': cor_inserted, 'existentes': cor_existing}
+
+
+def step_fiador_inq(ctx):
+    """STEP 7: locfiador_inq -> fiadores_inquilinos."""
+    conn, cur, reader = open_step()
+
+    print(f"\n=== STEP 7: Criando vínculos fiador↔inquilino "
+          f"({reader.index.row_count('locfiador_inq')}) ===")
+
+    if ctx['sql']:
+        staged = stage_select(cur, 'tmp_fiador_inq_raw', 'fiadores_inquilinos',
+                              ('id_fiador', 'id_inquilino'), ELT_FIADOR_INQ_SQL)
+    else:
+        staged = stage_rows(cur, 'tmp_fiador_inq_raw', 'fiadores_inquilinos',
+                            ('id_fiador', 'id_inquilino'), (
+                                (safe_int(r[0]), safe_int(r[1]))
+                                for r in reader.iter_values('locfiador_inq') if len(r) >= 2
+                            ))
+    # Vínculo só entra com fiador e inquilino mapeados
+    mapped = stage_mapped(cur, 'tmp_fiador_inq', 'tmp_fiador_inq_raw',
+                          ('id_fiador', 'id_inquilino'), FIADOR_INQ_MAPPED,
+                          required=tuple(FIADOR_INQ_MAPPED))
+    cur.execute("""
+        INSERT INTO fiadores_inquilinos (id_fiador, id_inquilino, ativo, observacoes)
+        SELECT id_fiador, id_inquilino, true, NULL FROM tmp_fiador_inq
+        ON CONFLICT DO NOTHING
+    """)
+    conn.commit()
+    print(f"  Vínculos inseridos: {mapped}, pulados: {staged - mapped}")
 
-        cur.execute(
-            "INSERT INTO pessoas (nome, fisica_juridica, tipo_pessoa, status, cod, dt_cadastro) VALUES (%s, 'juridica', 'juridica', true, %s, %s) RETURNING idpessoa",
-            (nome, codigo, now)
-        )
-        pessoa_id = cur.fetchone()[0]
-
-        cur.execute(
-            "INSERT INTO pessoas_tipos (id_pessoa, id_tipo_pessoa, data_inicio, ativo) VALUES (%s, 3, %s, true)",
-            (pessoa_id, date.today())
-        )
+    close_step(conn, cur, reader)
+    return {'inseridos': mapped, 'pulados': staged - mapped}
 
-        cur.execute(
-            "INSERT INTO pessoas_corretoras (id_pessoa, created_at, updated_at, cod) VALUES (%s, %s, %s, %s)",
-            (pessoa_id, now, now, codigo)
-        )
 
-        # Endereco from dump
-        endereco = r[2].strip()[:255] if len(r) > 2 and r[2] else 'SEM ENDERECO'
-        cep = r[3].strip()[:8] if len(r) > 3 and r[3] else '00000000'
-        cep = re.sub(r'\D', '', cep).ljust(8, '0')[:8]
+def step_lancamentos(ctx):
+    """STEP 8: lancamentos_financeiros -> lancamentos (incremental)."""
+    full = ctx['full']
+    conn, cur, reader = open_step()
 
-        cur.execute("SELECT id FROM logradouros WHERE logradouro = 'SEM ENDERECO' LIMIT 1")
-        logr = cur.fetchone()
-        if logr:
-            cur.execute(
-                "INSERT INTO enderecos (id_pessoa, id_logradouro, id_tipo, end_numero) VALUES (%s, %s, 1, 0)",
-                (pessoa_id, logr[0])
-            )
+    print("\n=== STEP 8: Sincronizando lancamentos (tabela final) ===")
 
-        cor_inserted += 1
+    cur.execute("SELECT COUNT(*), COUNT(id_lancamento_financeiro) FROM lancamentos")
+    existing_lanc, keyed_lanc = cur.fetchone()
+    if full or (existing_lanc and not keyed_lanc):
+        cur.execute("DELETE FROM lancamentos")
+        print(f"  Removidos {cur.rowcount} lancamentos para recarga")
 
+    delta = sync_table(cur, 'lancamentos', LANCAMENTOS_SOURCE_SQL,
+                       'id_lancamento_financeiro', LANC_COLUMNS)
     conn.commit()
-    print(f"  Corretores/Corretoras inseridos: {cor_inserted}")
+    print(f"  Lancamentos inseridos: {delta['inserted']}, atualizados: {delta['updated']}, "
+          f"removidos: {delta['deleted']}")
+
+    close_step(conn, cur, reader)
+    return delta
+
+
+def main():
+    t0 = datetime.now()
+    print(f"[{t0}] Hotfix: Importação completa de dados faltantes")
+    print(f"  Dump: {DUMP}")
+    print(f"  Carga: {cfg.LOADER_BACKEND}, reimportação: {cfg.IMPORT_MODE}, "
+          f"transformação: {cfg.TRANSFORM_MODE}")
+    full = cfg.IMPORT_MODE == 'full'
+
+    conn = psycopg2.connect(PG_DSN)
+    conn.autocommit = False
+    cur = conn.cursor()
 
     # =========================================================
-    # STEP 7: Create fiador↔inquilino links
+    # STEP 0: Rebuild ID mappings from PostgreSQL
     # =========================================================
-    print(f"\n=== STEP 7: Criando vínculos fiador↔inquilino ({len(fiador_inq)}) ===")
+    print("\n=== STEP 0: Reconstruindo mapeamentos ===")
 
-    fi_inserted = 0
-    fi_skipped = 0
-    batch = []
+    # cod → id de pessoas, imóveis, contratos e plano de contas, gravados em
+    # migration_id_map; os passos traduzem os códigos com JOIN nessa tabela
+    id_counts = refresh_id_map(cur)
 
-    for r in fiador_inq:
-        fiador_old = safe_int(r[0])
-        inq_old = safe_int(r[1])
+    # Linhas-sentinela de endereço ('SEM ENDERECO'...), uma consulta por execução
+    placeholders = Placeholders(cur)
 
-        fiador_new = fiador_map.get(fiador_old)
-        inq_new = inquilino_map.get(inq_old)
+    # Existing recibos (to skip duplicates)
+    cur.execute("SELECT numero_recibo FROM lancamentos_financeiros WHERE numero_recibo IS NOT NULL")
+    existing_recibos = {r[0] for r in cur.fetchall()}
 
-        if not fiador_new or not inq_new:
-            fi_skipped += 1
-            continue
+    # Existing loclanctocc IDs (check by origin)
+    cur.execute("SELECT id FROM lancamentos_financeiros WHERE origem = 'extrato_cc_migracao'")
+    existing_cc_count = cur.rowcount
 
-        batch.append((fiador_new, inq_new, True, None))
+    print(f"  Locadores: {id_counts['loclocador']}, Inquilinos: {id_counts['locinquilino']}, "
+          f"Fiadores: {id_counts['locfiador']}")
+    print(f"  Imóveis: {id_counts['locimovel']}, Contratos: {id_counts['locinquilino.contrato']}")
+    print(f"  Plano contas: {id_counts['plano_contas']}, Recibos existentes: {len(existing_recibos)}")
+    print(f"  Placeholders: {placeholders.summary()}")
 
-    if batch:
-        psycopg2.extras.execute_values(
-            cur,
-            "INSERT INTO fiadores_inquilinos (id_fiador, id_inquilino, ativo, observacoes) VALUES %s ON CONFLICT DO NOTHING",
-            batch,
-            template="(%s, %s, %s, %s)"
-        )
-        fi_inserted = len(batch) - fi_skipped
+    # =========================================================
+    # STEP 1: Index MySQL dump (rows are streamed per step)
+    # =========================================================
+    print("\n=== STEP 1: Indexando dump MySQL completo ===")
+    # Nada é materializado aqui: cada passo lê sua tabela em streaming
+    reader = DumpReader(DUMP)
+    for table in SOURCE_TABLES:
+        print(f"  {table}: {reader.index.row_count(table)}")
+
+    sql_mode = cfg.TRANSFORM_MODE == 'sql'
+    staged = {}
+    if sql_mode:
+        # ELT: tabelas literais no staging; os passos transformam em SQL
+        print(f"\n=== STEP 1b: Copiando tabelas para o schema {cfg.STAGING_SCHEMA} ===")
+        ensure_staging_schema(cur)
+        for name, key_type, value_type, mapping in ELT_LOOKUPS:
+            materialize_lookup(cur, name, key_type, value_type, mapping)
+        for table, names in DUMP_COLUMNS.items():
+            staged[table] = stage_dump_table(cur, reader, table, names, cfg.PARSE_WORKERS)
+            conn.commit()
+            print(f"  {cfg.STAGING_SCHEMA}.{table}: {staged[table]} linhas")
+    reader.close()
 
-    conn.commit()
-    print(f"  Vínculos inseridos: {len(batch)}, pulados: {fi_skipped}")
+    ctx = {'existing_recibos': existing_recibos, 'now': datetime.now(), 'full': full,
+           'sql': sql_mode, 'staged': staged, 'placeholders': placeholders}
+    conn.commit()  # publica o mapa e não segura locks enquanto os passos rodam
 
     # =========================================================
-    # STEP 8: Re-migrate lancamentos_financeiros → lancamentos
+    # STEPS 2-8: independentes em paralelo (MIGRATION_WORKERS)
     # =========================================================
-    print("\n=== STEP 8: Re-migrando lancamentos (tabela final) ===")
-
-    cur.execute("DELETE FROM lancamentos")
-    conn.commit()
+    workers = min(cfg.HOTFIX_WORKERS, len(STEP_DEPENDS))
+    print(f"\n=== STEPS 2-8: {workers} processo(s) ===")
+    tasks = {
+        'recibos': partial(step_recibos, ctx),
+        'lanctocc': partial(step_lanctocc, ctx),
+        'repasses': partial(step_repasses, ctx),
+        'corretores': partial(step_corretores, ctx),
+        'fiador_inq': partial(step_fiador_inq, ctx),
+        'lancamentos': partial(step_lancamentos, ctx),
+    }
 
-    cur.execute("""
-        INSERT INTO lancamentos (
-            data_movimento, id_plano_conta, id_imovel, id_proprietario, id_inquilino,
-            valor, tipo, historico, numero_recibo, numero_documento, competencia,
-            created_at, updated_at, data_vencimento, data_pagamento, numero, centro_custo,
-            id_pessoa_credor, id_pessoa_pagador, id_contrato, id_conta_bancaria, id_boleto,
-            valor_pago, valor_desconto, valor_juros, valor_multa,
-            reter_inss, perc_inss, valor_inss, reter_iss, perc_iss, valor_iss,
-            forma_pagamento, tipo_documento, status, suspenso_motivo, origem, id_processo,
-            observacoes, created_by
-        )
-        SELECT
-            lf.data_lancamento,
-            CASE
-                WHEN lf.tipo_lancamento = 'aluguel' THEN 995
-                WHEN lf.tipo_lancamento = 'receita' THEN 1029
-                WHEN lf.tipo_lancamento = 'despesa' THEN 1021
-                ELSE 995
-            END,
-            lf.id_imovel, lf.id_proprietario, lf.id_inquilino,
-            lf.valor_total,
-            CASE
-                WHEN lf.tipo_lancamento IN ('receita', 'aluguel') THEN 'receber'
-                WHEN lf.tipo_lancamento = 'despesa' THEN 'pagar'
-                ELSE 'receber'
-            END,
-            COALESCE(lf.historico, lf.descricao),
-            CASE WHEN lf.numero_recibo ~ '^[0-9]+$' THEN CAST(lf.numero_recibo AS INTEGER) ELSE NULL END,
-            NULL,
-            TO_CHAR(lf.competencia, 'YYYY-MM'),
-            lf.created_at, lf.updated_at,
-            lf.data_vencimento,
-            CASE WHEN lf.situacao = 'pago' THEN lf.data_vencimento ELSE NULL END,
-            NULL, NULL,
-            CASE WHEN lf.tipo_lancamento IN ('receita', 'aluguel') THEN lf.id_proprietario ELSE NULL END,
-            CASE WHEN lf.tipo_lancamento IN ('receita', 'aluguel') THEN lf.id_inquilino ELSE NULL END,
-            lf.id_contrato, lf.id_conta_bancaria, NULL,
-            COALESCE(lf.valor_pago, 0)::numeric(15,2),
-            COALESCE(lf.valor_desconto, 0)::numeric(15,2),
-            COALESCE(lf.valor_juros, 0)::numeric(15,2),
-            COALESCE(lf.valor_multa, 0)::numeric(15,2),
-            false, NULL, NULL,
-            false, NULL, NULL,
-            NULL, NULL,
-            CASE
-                WHEN lf.situacao = 'aberto' THEN 'aberto'
-                WHEN lf.situacao = 'pago' THEN 'pago'
-                WHEN lf.situacao = 'cancelado' THEN 'cancelado'
-                WHEN lf.situacao = 'estornado' THEN 'cancelado'
-                WHEN lf.situacao = 'parcial' THEN 'pago_parcial'
-                ELSE 'aberto'
-            END,
-            NULL,
-            CASE WHEN lf.origem IS NOT NULL THEN lf.origem ELSE 'importacao' END,
-            NULL,
-            lf.observacoes,
-            lf.created_by
-        FROM lancamentos_financeiros lf
-        WHERE lf.id IS NOT NULL
-    """)
-    lanc_count = cur.rowcount
-    conn.commit()
-    print(f"  Lancamentos migrados: {lanc_count}")
+    def on_done(name, result, error):
+        if error is not None:
+            print(f"[{name}] FALHOU: {error!r}")
+        else:
+            print(f"[{name}] concluído: {result}")
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = run_graph(STEP_DEPENDS, tasks, executor, on_done)
+    else:
+        results = run_graph(STEP_DEPENDS, tasks, None, on_done)
+    failed = sorted(k for k, v in results.items() if v is None or isinstance(v, Exception))
+    if failed:
+        print(f"  Passos com erro ou não executados: {', '.join(failed)}")
 
     # =========================================================
     # STEP 9: Final validation
@@ -833,7 +1170,7 @@ def main():
     conn.close()
 
     t1 = datetime.now()
-    print(f"\n[{t1}] Concluído em {(t1-t0).total_seconds():.1f}s")
+    print(f"\n[{t1}] Concluído em {(t1-t0).total_seconds():.1f}s (pico RSS {peak_rss_mb():.0f} MB)")
 
 
 if __name__ == '__main__':
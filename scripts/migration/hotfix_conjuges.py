@@ -4,26 +4,217 @@ hotfix_conjuges.py — Cria Pessoa records para cônjuges de fiadores e inquilin
 Lê dados do dump MySQL (locfiadores.nomeconj*, locinquilino.nomecjg)
 e cria registros correspondentes no PostgreSQL.
 
+Em lotes de BATCH_SIZE cônjuges: o estado atual (id_conjuge dos fiadores,
+observacoes dos inquilinos) vem numa consulta só; as pessoas entram num
+INSERT ... RETURNING de várias linhas e documentos, profissões, telefones,
+vínculos e UPDATEs saem como operações de conjunto, com um commit por lote.
+Profissões e telefones vêm de caches carregados uma vez (lookup_cache.py).
+Um lote que falha é refeito linha a linha com SAVEPOINT, e só as linhas
+com erro ficam de fora.
+
 Data: 2026-02-21
 """
 
-import json
 import os
 import re
 import sys
-from datetime import datetime, date
+from functools import partial
 
 sys.path.insert(0, os.path.dirname(__file__))
 import config as cfg
-from migrate import MySQLDumpParser, StateManager, safe_str, safe_int, safe_date, safe_float, clean_doc
+from migrate import safe_str, safe_int, safe_date, safe_float, clean_doc
+from dump_reader import DumpReader
+from id_map_store import IdMapStore
+from lookup_cache import profissoes_cache, telefones_cache
+from pessoa_writer import insert_pessoas
+from pipeline import batched
 
 import psycopg2
 import psycopg2.extras
 
 
+BATCH_SIZE = 500
+
+
+# =========================================================================
+# Leitura do dump
+# =========================================================================
+
+def _fiador_conjuge(row) -> dict:
+    """Dados do cônjuge de uma linha de locfiadores, já convertidos."""
+    rendaconj = safe_float(row.get("rendaconj"))
+    nacionconj = safe_str(row.get("nacionconj")) or ""
+    conjpaif = safe_str(row.get("conjpaif")) or safe_str(row.get("conjpai")) or ""
+    conjmaef = safe_str(row.get("conjmaef")) or safe_str(row.get("conjmae")) or ""
+    conjempresaf = safe_str(row.get("conjempresaf"))
+    conjtelemp = safe_str(row.get("conjtelemp")) or safe_str(row.get("conjtelempf")) or ""
+    emissaorgconj = safe_str(row.get("emissaorgconj"))
+    orgaorgconj = safe_str(row.get("orgaorgconj"))
+
+    obs_parts = []
+    if emissaorgconj:
+        obs_parts.append(f"RG emissão: {emissaorgconj}")
+    if orgaorgconj:
+        obs_parts.append(f"RG órgão: {orgaorgconj}")
+
+    cpf = clean_doc(safe_str(row.get("cpfconj")) or "")
+    rg = safe_str(row.get("rgconj")) or ""
+    rg = clean_doc(rg)[:30] if rg not in ("0", "00") else ""
+    atividade = safe_str(row.get("atividadeconj"))
+
+    return {
+        'nome': safe_str(row.get("nomeconj"))[:100],
+        'data_nascimento': safe_date(row.get("dtnascconj")),
+        'renda': str(rendaconj) if rendaconj > 0 else None,
+        'nome_pai': conjpaif[:100] or None,
+        'nome_mae': conjmaef[:100] or None,
+        'observacoes': "\n".join(obs_parts) or None,
+        'nacionalidade_id': cfg.DEFAULT_NACIONALIDADE_ID if nacionconj.lower().startswith("brasil") else None,
+        'cpf': cpf[:30] if cpf and cpf not in ("0", "00") else None,
+        'rg': rg or None,
+        'profissao': atividade[:100] if atividade else None,
+        'empresa': conjempresaf[:100] if conjempresaf else None,
+        'data_admissao': safe_date(row.get("admissaoconj")),
+        'telefone': re.sub(r"\s+", "", conjtelemp)[:25] or None,
+        'trabalha': bool(safe_int(row.get("conjtrabalha") or row.get("conjtrabalhaf") or 0)),
+    }
+
+
+# =========================================================================
+# Gravação de um lote
+# =========================================================================
+
+def _write_fiadores(cur, batch, profissoes, telefones) -> dict:
+    """Cria os cônjuges de um lote de fiadores (sem commit). Retorna contagens."""
+    conj_ids = insert_pessoas(
+        cur,
+        ("nome", "dt_cadastro", "tipo_pessoa", "status", "fisica_juridica", "data_nascimento",
+         "renda", "nome_pai", "nome_mae", "observacoes", "theme_light", "nacionalidade_id"),
+        [(c['nome'], cfg.TIPO_PESSOA_FIADOR_ID,  # conjuge é fiador também
+          c['data_nascimento'], c['renda'], c['nome_pai'], c['nome_mae'],
+          c['observacoes'], c['nacionalidade_id']) for c in batch],
+        template="(%s, NOW(), %s, TRUE, 'fisica', %s, %s, %s, %s, %s, TRUE, %s)")
+    pairs = list(zip(conj_ids, batch))
+
+    docs = [(pid, cfg.DEFAULT_TIPO_DOCUMENTO_CPF_ID, c['cpf']) for pid, c in pairs if c['cpf']]
+    docs += [(pid, cfg.DEFAULT_TIPO_DOCUMENTO_RG_ID, c['rg']) for pid, c in pairs if c['rg']]
+    if docs:
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO pessoas_documentos (id_pessoa, id_tipo_documento, numero_documento, ativo)
+            VALUES %s ON CONFLICT DO NOTHING
+        """, docs, template="(%s, %s, %s, TRUE)")
+
+    profs = profissoes.ids_for(cur, [c['profissao'] for c in batch if c['profissao']])
+    # Nome que normaliza para vazio (só pontuação/espaços) não vira profissão
+    prof_rows = [(pid, profs[c['profissao']], c['renda'], c['empresa'], c['data_admissao'])
+                 for pid, c in pairs if c['profissao'] in profs]
+    if prof_rows:
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO pessoas_profissoes (id_pessoa, id_profissao, renda, empresa, data_admissao, ativo)
+            VALUES %s ON CONFLICT DO NOTHING
+        """, prof_rows, template="(%s, %s, %s, %s, %s, TRUE)")
+
+    tels = telefones.ids_for(cur, [c['telefone'] for c in batch if c['telefone']])
+    tel_rows = [(pid, tels[c['telefone']]) for pid, c in pairs if c['telefone'] in tels]
+    if tel_rows:
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO pessoas_telefones (id_pessoa, id_telefone) VALUES %s ON CONFLICT DO NOTHING
+        """, tel_rows)
+
+    psycopg2.extras.execute_values(cur, """
+        UPDATE pessoas_fiadores f SET id_conjuge = v.id_conjuge, conjuge_trabalha = v.trabalha
+        FROM (VALUES %s) AS v(id_pessoa, id_conjuge, trabalha)
+        WHERE f.id_pessoa = v.id_pessoa
+    """, [(c['fiador_pessoa_id'], pid, c['trabalha']) for pid, c in pairs],
+        template="(%s::integer, %s::integer, %s::boolean)")
+
+    psycopg2.extras.execute_values(cur, """
+        INSERT INTO pessoas_tipos (id_pessoa, id_tipo_pessoa, data_inicio, ativo)
+        VALUES %s ON CONFLICT DO NOTHING
+    """, [(pid, cfg.TIPO_PESSOA_FIADOR_ID) for pid in conj_ids], template="(%s, %s, CURRENT_DATE, TRUE)")
+
+    return {
+        'fiador_conjuges_criados': len(conj_ids),
+        'fiador_docs_criados': len(docs),
+        'fiador_profs_criados': len(prof_rows),
+        'fiador_tels_criados': len(tel_rows),
+    }
+
+
+def _write_inquilinos(cur, batch) -> dict:
+    """Cria os cônjuges de um lote de inquilinos (sem commit). Retorna contagens."""
+    conj_ids = insert_pessoas(
+        cur, ("nome", "dt_cadastro", "tipo_pessoa", "status", "fisica_juridica", "observacoes", "theme_light"),
+        [(c['nome'], cfg.TIPO_PESSOA_INQUILINO_ID,
+          f"Cônjuge do inquilino pessoa #{c['inq_pessoa_id']}") for c in batch],
+        template="(%s, NOW(), %s, TRUE, 'fisica', %s, TRUE)")
+    pairs = list(zip(conj_ids, batch))
+
+    psycopg2.extras.execute_values(cur, """
+        INSERT INTO pessoas_tipos (id_pessoa, id_tipo_pessoa, data_inicio, ativo)
+        VALUES %s ON CONFLICT DO NOTHING
+    """, [(pid, cfg.TIPO_PESSOA_INQUILINO_ID) for pid in conj_ids], template="(%s, %s, CURRENT_DATE, TRUE)")
+
+    # Anota o cônjuge nas observacoes do inquilino
+    psycopg2.extras.execute_values(cur, """
+        UPDATE pessoas p SET observacoes = v.observacoes
+        FROM (VALUES %s) AS v(idpessoa, observacoes)
+        WHERE p.idpessoa = v.idpessoa
+    """, [(c['inq_pessoa_id'],
+           f"{c['obs_current']}\nCônjuge: {c['nome_original']} (pessoa #{pid})".strip())
+          for pid, c in pairs], template="(%s::integer, %s::text)")
+
+    return {'inq_conjuges_criados': len(conj_ids)}
+
+
+def _run_batches(conn, items, write, stats: dict, label: str, caches=()):
+    """Grava `items` em lotes, um commit por lote.
+
+    Se o lote falhar, ele é desfeito e refeito item a item, cada um num
+    SAVEPOINT: os itens com erro são contados e o resto do lote é gravado.
+    `caches` (LookupCache) acompanham os commits e rollbacks.
+    """
+    for batch in batched(items, BATCH_SIZE):
+        try:
+            with conn.cursor() as cur:
+                counts = write(cur, batch)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            for cache in caches:
+                cache.rollback()
+            print(f"  Lote de {len(batch)} com erro ({e}); refazendo um a um")
+            counts = {}
+            with conn.cursor() as cur:
+                for item in batch:
+                    cur.execute("SAVEPOINT conjuge")
+                    marks = [cache.checkpoint() for cache in caches]
+                    try:
+                        row_counts = write(cur, [item])
+                    except Exception as row_error:
+                        cur.execute("ROLLBACK TO SAVEPOINT conjuge")
+                        for cache, mark in zip(caches, marks):
+                            cache.rollback(mark)
+                        print(f"  ERRO {label} old={item['old_id']}: {row_error}")
+                        stats['erros'] += 1
+                        continue
+                    cur.execute("RELEASE SAVEPOINT conjuge")
+                    for k, v in row_counts.items():
+                        counts[k] = counts.get(k, 0) + v
+            conn.commit()
+        for cache in caches:
+            cache.commit()
+        for k, v in counts.items():
+            stats[k] += v
+        print(f"  {label}: lote de {len(batch)} gravado")
+
+
 def main():
-    parser = MySQLDumpParser(cfg.MYSQL_DUMP_PATH)
-    state = StateManager()
+    reader = DumpReader(cfg.MYSQL_DUMP_PATH)
+    id_map = IdMapStore.open_default()
+    fiador_ids = id_map.load_entity("locfiador", key=int)
+    inquilino_ids = id_map.load_entity("locinquilino", key=int)
+    id_map.close()
     conn = psycopg2.connect(cfg.POSTGRES_DSN)
     conn.autocommit = False
 
@@ -45,178 +236,49 @@ def main():
     print("PARTE 1: Cônjuges de Fiadores")
     print("=" * 60)
 
-    for row in parser.iter_table("locfiadores"):
+    candidatos = []
+    for row in reader.iter_dicts("locfiadores"):
         old_id = safe_int(row.get("codigo"))
-        nomeconj = safe_str(row.get("nomeconj"))
-
-        if not nomeconj:
+        if not safe_str(row.get("nomeconj")):
             continue
 
         # Look up the new pessoa_id for this fiador
-        fiador_pessoa_id = state.get_new_id("locfiador", old_id)
+        fiador_pessoa_id = fiador_ids.get(old_id)
         if not fiador_pessoa_id:
             print(f"  WARN: Fiador old={old_id} não encontrado no id_map")
             stats['erros'] += 1
             continue
 
-        # Check if conjuge already set
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT id_conjuge FROM pessoas_fiadores WHERE id_pessoa = %s",
-                (fiador_pessoa_id,)
-            )
-            result = cur.fetchone()
-            if result and result[0]:
-                stats['fiador_conjuges_ja_existiam'] += 1
-                continue
-
-        try:
-            # Collect conjuge data
-            cpfconj = clean_doc(safe_str(row.get("cpfconj")) or "")
-            rgconj = safe_str(row.get("rgconj")) or ""
-            dtnascconj = safe_date(row.get("dtnascconj"))
-            rendaconj = safe_float(row.get("rendaconj"))
-            nacionconj = safe_str(row.get("nacionconj")) or ""
-            conjpaif = safe_str(row.get("conjpaif")) or safe_str(row.get("conjpai")) or ""
-            conjmaef = safe_str(row.get("conjmaef")) or safe_str(row.get("conjmae")) or ""
-            atividadeconj = safe_str(row.get("atividadeconj"))
-            conjempresaf = safe_str(row.get("conjempresaf"))
-            conjtrabalha_raw = safe_int(row.get("conjtrabalha") or row.get("conjtrabalhaf") or 0)
-            conjtrabalha = bool(conjtrabalha_raw)
-            conjtelemp = safe_str(row.get("conjtelemp")) or safe_str(row.get("conjtelempf")) or ""
-            emissaorgconj = safe_str(row.get("emissaorgconj"))
-            orgaorgconj = safe_str(row.get("orgaorgconj"))
-            admissaoconj = safe_date(row.get("admissaoconj"))
-
-            # 1. Create Pessoa for conjuge
-            obs_parts = []
-            if emissaorgconj:
-                obs_parts.append(f"RG emissão: {emissaorgconj}")
-            if orgaorgconj:
-                obs_parts.append(f"RG órgão: {orgaorgconj}")
-            obs = "\n".join(obs_parts) or None
-
-            nacion_id = cfg.DEFAULT_NACIONALIDADE_ID if nacionconj.lower().startswith("brasil") else None
-
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO pessoas
-                        (nome, dt_cadastro, tipo_pessoa, status, fisica_juridica,
-                         data_nascimento, renda, nome_pai, nome_mae,
-                         observacoes, theme_light, nacionalidade_id)
-                    VALUES (%s, NOW(), %s, TRUE, 'fisica', %s, %s, %s, %s, %s, TRUE, %s)
-                    RETURNING idpessoa
-                """, (
-                    nomeconj[:100],
-                    cfg.TIPO_PESSOA_FIADOR_ID,  # conjuge é fiador também
-                    dtnascconj,
-                    str(rendaconj) if rendaconj > 0 else None,
-                    conjpaif[:100] if conjpaif else None,
-                    conjmaef[:100] if conjmaef else None,
-                    obs,
-                    nacion_id,
-                ))
-                conjuge_pessoa_id = cur.fetchone()[0]
-
-            stats['fiador_conjuges_criados'] += 1
-            print(f"  Cônjuge criado: '{nomeconj}' -> pessoa {conjuge_pessoa_id} (fiador pessoa {fiador_pessoa_id})")
-
-            # 2. Create CPF document
-            if cpfconj and cpfconj not in ("0", "00"):
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO pessoas_documentos (id_pessoa, id_tipo_documento, numero_documento, ativo)
-                        VALUES (%s, %s, %s, TRUE) ON CONFLICT DO NOTHING
-                    """, (conjuge_pessoa_id, cfg.DEFAULT_TIPO_DOCUMENTO_CPF_ID, cpfconj[:30]))
-                stats['fiador_docs_criados'] += 1
-
-            # 3. Create RG document
-            if rgconj and rgconj not in ("0", "00"):
-                rg_clean = clean_doc(rgconj)[:30]
-                if rg_clean:
-                    with conn.cursor() as cur:
-                        cur.execute("""
-                            INSERT INTO pessoas_documentos (id_pessoa, id_tipo_documento, numero_documento, ativo)
-                            VALUES (%s, %s, %s, TRUE) ON CONFLICT DO NOTHING
-                        """, (conjuge_pessoa_id, cfg.DEFAULT_TIPO_DOCUMENTO_RG_ID, rg_clean))
-                    stats['fiador_docs_criados'] += 1
-
-            # 4. Create profissao if atividadeconj
-            if atividadeconj:
-                with conn.cursor() as cur:
-                    # Find or create profissao
-                    cur.execute(
-                        "SELECT id FROM profissoes WHERE UPPER(nome) = UPPER(%s) LIMIT 1",
-                        (atividadeconj[:100],)
-                    )
-                    prof_row = cur.fetchone()
-                    if prof_row:
-                        prof_id = prof_row[0]
-                    else:
-                        cur.execute(
-                            "INSERT INTO profissoes (nome, ativo) VALUES (%s, TRUE) RETURNING id",
-                            (atividadeconj[:100],)
-                        )
-                        prof_id = cur.fetchone()[0]
-
-                    # Junction pessoas_profissoes
-                    cur.execute("""
-                        INSERT INTO pessoas_profissoes (id_pessoa, id_profissao, renda, empresa, data_admissao, ativo)
-                        VALUES (%s, %s, %s, %s, %s, TRUE) ON CONFLICT DO NOTHING
-                    """, (
-                        conjuge_pessoa_id,
-                        prof_id,
-                        str(rendaconj) if rendaconj > 0 else None,
-                        conjempresaf[:100] if conjempresaf else None,
-                        admissaoconj,
-                    ))
-                stats['fiador_profs_criados'] += 1
-
-            # 5. Create telefone if conjtelemp
-            tel = re.sub(r"\s+", "", conjtelemp)[:25]
-            if tel:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        "SELECT id FROM telefones WHERE numero = %s LIMIT 1",
-                        (tel,)
-                    )
-                    tel_row = cur.fetchone()
-                    if tel_row:
-                        tel_id = tel_row[0]
-                    else:
-                        cur.execute(
-                            "INSERT INTO telefones (id_tipo, numero) VALUES (%s, %s) RETURNING id",
-                            (cfg.TIPO_TELEFONE_COMERCIAL_ID, tel)
-                        )
-                        tel_id = cur.fetchone()[0]
-
-                    cur.execute("""
-                        INSERT INTO pessoas_telefones (id_pessoa, id_telefone)
-                        VALUES (%s, %s) ON CONFLICT DO NOTHING
-                    """, (conjuge_pessoa_id, tel_id))
-                stats['fiador_tels_criados'] += 1
-
-            # 6. Update pessoas_fiadores.id_conjuge and conjuge_trabalha
-            with conn.cursor() as cur:
-                cur.execute("""
-                    UPDATE pessoas_fiadores
-                    SET id_conjuge = %s, conjuge_trabalha = %s
-                    WHERE id_pessoa = %s
-                """, (conjuge_pessoa_id, conjtrabalha, fiador_pessoa_id))
-
-            # 7. Add conjuge to pessoas_tipos as fiador too
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO pessoas_tipos (id_pessoa, id_tipo_pessoa, data_inicio, ativo)
-                    VALUES (%s, %s, CURRENT_DATE, TRUE) ON CONFLICT DO NOTHING
-                """, (conjuge_pessoa_id, cfg.TIPO_PESSOA_FIADOR_ID))
+        conjuge = _fiador_conjuge(row)
+        conjuge['old_id'] = old_id
+        conjuge['fiador_pessoa_id'] = fiador_pessoa_id
+        candidatos.append(conjuge)
+
+    # Fiadores que já têm cônjuge, numa consulta só; profissões e telefones
+    # existentes ficam em memória
+    with conn.cursor() as cur:
+        profissoes = profissoes_cache(cur)
+        telefones = telefones_cache(cur)
+        cur.execute(
+            "SELECT id_pessoa FROM pessoas_fiadores WHERE id_pessoa = ANY(%s) AND id_conjuge IS NOT NULL",
+            (list({c['fiador_pessoa_id'] for c in candidatos}),)
+        )
+        com_conjuge = {r[0] for r in cur.fetchall()}
+    conn.commit()
+
+    pendentes = []
+    for c in candidatos:
+        if c['fiador_pessoa_id'] in com_conjuge:
+            stats['fiador_conjuges_ja_existiam'] += 1
+            continue
+        com_conjuge.add(c['fiador_pessoa_id'])  # linha repetida no dump
+        pendentes.append(c)
+    print(f"  {len(pendentes)} cônjuges a criar, {stats['fiador_conjuges_ja_existiam']} já existiam")
 
-            conn.commit()
-
-        except Exception as e:
-            conn.rollback()
-            print(f"  ERRO fiador old={old_id}: {e}")
-            stats['erros'] += 1
+    _run_batches(conn, pendentes, partial(_write_fiadores, profissoes=profissoes, telefones=telefones),
+                 stats, "fiador", caches=(profissoes, telefones))
+    print(f"  {profissoes.summary()}")
+    print(f"  {telefones.summary()}")
 
     # =========================================================================
     # PARTE 2: Cônjuges de INQUILINOS (locinquilino.nomecjg)
@@ -226,72 +288,48 @@ def main():
     print("PARTE 2: Cônjuges de Inquilinos")
     print("=" * 60)
 
-    for row in parser.iter_table("locinquilino"):
+    candidatos = []
+    for row in reader.iter_dicts("locinquilino"):
         old_id = safe_int(row.get("codigo"))
         nomecjg = safe_str(row.get("nomecjg"))
 
         if not nomecjg:
             continue
 
-        inq_pessoa_id = state.get_new_id("locinquilino", old_id)
+        inq_pessoa_id = inquilino_ids.get(old_id)
         if not inq_pessoa_id:
             print(f"  WARN: Inquilino old={old_id} não encontrado no id_map")
             stats['erros'] += 1
             continue
 
+        candidatos.append({'old_id': old_id, 'inq_pessoa_id': inq_pessoa_id,
+                           'nome': nomecjg[:100], 'nome_original': nomecjg})
+
+    # observacoes atuais dos inquilinos, numa consulta só
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT idpessoa, observacoes FROM pessoas WHERE idpessoa = ANY(%s)",
+            (list({c['inq_pessoa_id'] for c in candidatos}),)
+        )
+        observacoes = {pid: obs or "" for pid, obs in cur.fetchall()}
+    conn.commit()
+
+    pendentes = []
+    vistos = set()
+    for c in candidatos:
         # Check if already noted (check observacoes for conjuge marker)
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT observacoes FROM pessoas WHERE idpessoa = %s",
-                (inq_pessoa_id,)
-            )
-            result = cur.fetchone()
-            obs_current = result[0] if result and result[0] else ""
-            if f"Cônjuge: {nomecjg}" in obs_current:
-                stats['inq_conjuges_ja_existiam'] += 1
-                continue
-
-        try:
-            # Create Pessoa for conjuge (minimal data - only name available)
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO pessoas
-                        (nome, dt_cadastro, tipo_pessoa, status, fisica_juridica,
-                         observacoes, theme_light)
-                    VALUES (%s, NOW(), %s, TRUE, 'fisica', %s, TRUE)
-                    RETURNING idpessoa
-                """, (
-                    nomecjg[:100],
-                    cfg.TIPO_PESSOA_INQUILINO_ID,
-                    f"Cônjuge do inquilino pessoa #{inq_pessoa_id}",
-                ))
-                conjuge_pessoa_id = cur.fetchone()[0]
-
-            # Add to pessoas_tipos
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO pessoas_tipos (id_pessoa, id_tipo_pessoa, data_inicio, ativo)
-                    VALUES (%s, %s, CURRENT_DATE, TRUE) ON CONFLICT DO NOTHING
-                """, (conjuge_pessoa_id, cfg.TIPO_PESSOA_INQUILINO_ID))
-
-            # Update inquilino observacoes to note conjuge
-            new_obs = f"{obs_current}\nCônjuge: {nomecjg} (pessoa #{conjuge_pessoa_id})".strip()
-            with conn.cursor() as cur:
-                cur.execute(
-                    "UPDATE pessoas SET observacoes = %s WHERE idpessoa = %s",
-                    (new_obs, inq_pessoa_id)
-                )
-
-            conn.commit()
-            stats['inq_conjuges_criados'] += 1
-            print(f"  Cônjuge criado: '{nomecjg}' -> pessoa {conjuge_pessoa_id} (inquilino pessoa {inq_pessoa_id})")
+        c['obs_current'] = observacoes.get(c['inq_pessoa_id'], "")
+        if f"Cônjuge: {c['nome_original']}" in c['obs_current'] or c['inq_pessoa_id'] in vistos:
+            stats['inq_conjuges_ja_existiam'] += 1
+            continue
+        vistos.add(c['inq_pessoa_id'])  # linha repetida no dump
+        pendentes.append(c)
+    print(f"  {len(pendentes)} cônjuges a criar, {stats['inq_conjuges_ja_existiam']} já existiam")
 
-        except Exception as e:
-            conn.rollback()
-            print(f"  ERRO inquilino old={old_id}: {e}")
-            stats['erros'] += 1
+    _run_batches(conn, pendentes, _write_inquilinos, stats, "inquilino")
 
     conn.close()
+    reader.close()
 
     # =========================================================================
     # RESUMO
@@ -0,0 +1,150 @@
+"""
+id_map_pg.py — Mapa de IDs (legado -> novo) como tabela no PostgreSQL
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+A tabela migration_id_map (entity, old_id, new_id) deixa os mapeamentos no
+servidor: as transformações gravam os códigos do legado numa tabela de
+staging (COPY) e a tradução vira JOIN dentro do PostgreSQL, num
+INSERT ... SELECT, em vez de um dict.get() por linha no Python. A expressão
+REGEXP_REPLACE sobre imoveis.codigo_interno roda uma vez, no refresh, e não
+a cada consulta de mapeamento.
+
+Entidades derivadas do próprio banco (ENTITY_SOURCES) são recalculadas por
+refresh_id_map(); entidades criadas por um carregador (ex.: corretores) são
+gravadas por put_ids() logo após o INSERT e não são tocadas pelo refresh.
+
+Uso:
+    ensure_id_map_table(cur)
+    counts = refresh_id_map(cur)
+    cur.execute(f"INSERT INTO destino ({cols}) " + mapped_select(
+        'tmp_raw', columns, {'id_inquilino': 'locinquilino'}))
+"""
+
+import psycopg2.extras
+
+ID_MAP_TABLE = 'migration_id_map'
+
+ID_MAP_DDL = (
+    f"""CREATE TABLE IF NOT EXISTS {ID_MAP_TABLE} (
+            entity varchar(64) NOT NULL,
+            old_id bigint NOT NULL,
+            new_id bigint NOT NULL,
+            PRIMARY KEY (entity, old_id)
+        )""",
+    f"CREATE INDEX IF NOT EXISTS idx_{ID_MAP_TABLE}_new ON {ID_MAP_TABLE} (entity, new_id)",
+)
+
+# entidade -> SELECT (old_id, new_id). Recalculadas em ordem: as derivadas
+# ('x.y') leem do próprio mapa as entidades anteriores. Códigos repetidos
+# ficam com o maior id novo (o registro mais recente).
+ENTITY_SOURCES = {
+    # loclocador/locinquilino/locfiador[cod] -> pessoas.idpessoa (pelo tipo)
+    'loclocador': """
+        SELECT p.cod, p.idpessoa FROM pessoas p
+        JOIN pessoas_tipos pt ON pt.id_pessoa = p.idpessoa WHERE pt.id_tipo_pessoa = 4""",
+    'locinquilino': """
+        SELECT p.cod, p.idpessoa FROM pessoas p
+        JOIN pessoas_tipos pt ON pt.id_pessoa = p.idpessoa WHERE pt.id_tipo_pessoa = 12""",
+    'locfiador': """
+        SELECT p.cod, p.idpessoa FROM pessoas p
+        JOIN pessoas_tipos pt ON pt.id_pessoa = p.idpessoa WHERE pt.id_tipo_pessoa = 1""",
+    # locimovel[cod] -> imoveis.id (formato IM0005 -> 5)
+    'locimovel': """
+        SELECT CAST(REGEXP_REPLACE(codigo_interno, '[^0-9]', '', 'g') AS BIGINT), id
+        FROM imoveis WHERE codigo_interno ~ '[0-9]'""",
+    # locimovel[cod] -> proprietário do imóvel
+    'locimovel.proprietario': f"""
+        SELECT m.old_id, i.id_pessoa_proprietario FROM {ID_MAP_TABLE} m
+        JOIN imoveis i ON i.id = m.new_id
+        WHERE m.entity = 'locimovel' AND i.id_pessoa_proprietario IS NOT NULL""",
+    # plano_contas: codigo -> id
+    'plano_contas': """
+        SELECT CAST(codigo AS BIGINT), id FROM plano_contas WHERE codigo ~ '^[0-9]+$'""",
+    # locinquilino[cod] -> contrato do inquilino, e o imóvel/proprietário dele
+    'locinquilino.contrato': """
+        SELECT p.cod, ic.id FROM imoveis_contratos ic
+        JOIN pessoas p ON p.idpessoa = ic.id_pessoa_locatario
+        JOIN pessoas_tipos pt ON pt.id_pessoa = p.idpessoa AND pt.id_tipo_pessoa = 12""",
+    'locinquilino.contrato_imovel': f"""
+        SELECT m.old_id, ic.id_imovel FROM {ID_MAP_TABLE} m
+        JOIN imoveis_contratos ic ON ic.id = m.new_id
+        WHERE m.entity = 'locinquilino.contrato' AND ic.id_imovel IS NOT NULL""",
+    'locinquilino.contrato_proprietario': f"""
+        SELECT m.old_id, i.id_pessoa_proprietario FROM {ID_MAP_TABLE} m
+        JOIN imoveis_contratos ic ON ic.id = m.new_id
+        JOIN imoveis i ON i.id = ic.id_imovel
+        WHERE m.entity = 'locinquilino.contrato' AND i.id_pessoa_proprietario IS NOT NULL""",
+}
+
+
+def ensure_id_map_table(cur):
+    for ddl in ID_MAP_DDL:
+        cur.execute(ddl)
+
+
+def refresh_id_map(cur, entities=None) -> dict:
+    """Recalcula as entidades de ENTITY_SOURCES (sem commit). Retorna entidade -> nº."""
+    ensure_id_map_table(cur)
+    counts = {}
+    for entity, source in ENTITY_SOURCES.items():
+        if entities is not None and entity not in entities:
+            continue
+        cur.execute(f"DELETE FROM {ID_MAP_TABLE} WHERE entity = %s", (entity,))
+        cur.execute(f"""
+            INSERT INTO {ID_MAP_TABLE} (entity, old_id, new_id)
+            SELECT DISTINCT ON (src.old_id) %s, src.old_id, src.new_id
+            FROM ({source}) AS src(old_id, new_id)
+            WHERE src.old_id IS NOT NULL AND src.new_id IS NOT NULL
+            ORDER BY src.old_id, src.new_id DESC
+        """, (entity,))
+        counts[entity] = cur.rowcount
+    cur.execute(f"ANALYZE {ID_MAP_TABLE}")
+    return counts
+
+
+def put_ids(cur, entity: str, pairs) -> int:
+    """Grava (old_id, new_id) de uma entidade criada por um carregador (sem commit)."""
+    rows = [(entity, old, new) for old, new in pairs]
+    if rows:
+        psycopg2.extras.execute_values(cur, f"""
+            INSERT INTO {ID_MAP_TABLE} (entity, old_id, new_id) VALUES %s
+            ON CONFLICT (entity, old_id) DO UPDATE SET new_id = EXCLUDED.new_id
+        """, rows)
+    return len(rows)
+
+
+def mapped_select(source: str, columns, mapped: dict, required=(), exprs=None) -> str:
+    """SELECT das `columns` de `source` com os códigos do legado traduzidos.
+
+    `mapped` diz quais colunas de `source` guardam um old_id e de qual
+    entidade (coluna -> entidade); cada uma vira um LEFT JOIN no mapa e sai
+    com o new_id (NULL se não houver mapeamento). Colunas em `required` usam
+    INNER JOIN: linhas sem mapeamento são descartadas. `exprs` troca a
+    expressão de uma coluna (o alias da origem é s).
+    """
+    exprs = exprs or {}
+    select = []
+    joins = []
+    for i, col in enumerate(columns):
+        if col in exprs:
+            select.append(f"{exprs[col]} AS {col}")
+        elif col in mapped:
+            alias = f"m{i}"
+            kind = 'JOIN' if col in required else 'LEFT JOIN'
+            joins.append(f"{kind} {ID_MAP_TABLE} {alias} ON {alias}.entity = "
+                         f"'{mapped[col]}' AND {alias}.old_id = s.{col}")
+            select.append(f"{alias}.new_id AS {col}")
+        else:
+            select.append(f"s.{col}")
+    return (f"SELECT {', '.join(select)} FROM {source} s"
+            + ''.join('\n    ' + j for j in joins))
+
+
+def stage_mapped(cur, staging: str, source: str, columns, mapped: dict,
+                 required=(), exprs=None) -> int:
+    """Tabela temporária com o resultado de mapped_select (sem commit)."""
+    cur.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                + mapped_select(source, columns, mapped, required, exprs))
+    n = cur.rowcount
+    cur.execute(f"ANALYZE {staging}")
+    return n
@@ -0,0 +1,202 @@
+"""
+id_map_store.py — Mapeamento de IDs (legado -> novo) persistido em SQLite
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Substitui o id_map.json (lido inteiro na partida e reescrito inteiro a cada
+gravação) por uma tabela SQLite com chave (entidade, id_antigo):
+
+  - abertura O(1): nada é carregado em memória até ser consultado;
+  - consulta O(log n) pela chave primária (B-tree, WITHOUT ROWID);
+  - put_many grava um lote numa transação;
+  - journal WAL: as gravações são anexadas ao log e o commit é atômico, então
+    uma queda no meio do lote não corrompe o mapa.
+
+Compatibilidade: import_json/export_json leem e escrevem o formato do
+id_map.json ({entidade: {id_antigo: id_novo}}). import_json substitui os
+mapeamentos de cada entidade presente no arquivo (um id que saiu do JSON
+não fica resolvendo para um registro apagado). open_default() reimporta o
+JSON sempre que ele for mais novo que o banco, enquanto migrate.py ainda
+grava o arquivo antigo.
+
+Uso:
+    python3 id_map_store.py --stats
+    python3 id_map_store.py --import logs/migration/id_map.json
+    python3 id_map_store.py --export /tmp/id_map.json
+
+    id_map = IdMapStore.open_default()
+    pessoa_id = id_map.get_new_id("locfiador", 123)
+    fiadores = id_map.load_entity("locfiador", key=int)   # dict p/ laços
+    id_map.put_many("locfiador", [(123, 4567), (124, 4568)])
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import config as cfg
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS id_map (
+           entity TEXT NOT NULL,
+           old_id TEXT NOT NULL,
+           new_id INTEGER NOT NULL,
+           PRIMARY KEY (entity, old_id)
+       ) WITHOUT ROWID""",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+)
+
+
+class IdMapStore:
+    """Mapa entidade/id_antigo -> id_novo num arquivo SQLite."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for ddl in _SCHEMA:
+            self._db.execute(ddl)
+        self._db.commit()
+
+    @classmethod
+    def open_default(cls) -> 'IdMapStore':
+        """Store de config.ID_MAP_DB, sincronizado com config.ID_MAP_FILE se
+        o JSON for mais novo."""
+        store = cls(cfg.ID_MAP_DB)
+        try:
+            json_mtime = os.path.getmtime(cfg.ID_MAP_FILE)
+        except OSError:
+            return store
+        if json_mtime > store.imported_mtime():
+            n = store.import_json(cfg.ID_MAP_FILE)
+            store._set_meta('json_mtime', str(json_mtime))
+            print(f"  id_map: {n} mapeamentos importados de {cfg.ID_MAP_FILE}")
+        return store
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------
+
+    def get_new_id(self, entity: str, old_id):
+        """id novo ou None (mesma assinatura de StateManager.get_new_id)."""
+        row = self._db.execute(
+            "SELECT new_id FROM id_map WHERE entity = ? AND old_id = ?",
+            (entity, str(old_id)),
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, entity: str, old_ids) -> dict:
+        """id_antigo (str) -> id novo, só para os ids encontrados."""
+        keys = list({str(k) for k in old_ids})
+        out = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            out.update(self._db.execute(
+                f"SELECT old_id, new_id FROM id_map WHERE entity = ? AND old_id IN ({marks})",
+                [entity] + chunk,
+            ))
+        return out
+
+    def load_entity(self, entity: str, key=str) -> dict:
+        """Mapa inteiro de uma entidade em dict (para laços com muitas consultas)."""
+        return {key(old): new for old, new in self._db.execute(
+            "SELECT old_id, new_id FROM id_map WHERE entity = ?", (entity,))}
+
+    def counts(self) -> dict:
+        return dict(self._db.execute(
+            "SELECT entity, COUNT(*) FROM id_map GROUP BY entity ORDER BY entity"))
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM id_map").fetchone()[0]
+
+    # ------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------
+
+    def put(self, entity: str, old_id, new_id: int):
+        self.put_many(entity, ((old_id, new_id),))
+
+    def put_many(self, entity: str, pairs) -> int:
+        """Grava (id_antigo, id_novo) em uma transação. Retorna o nº de pares."""
+        with self._db:
+            return self._insert(entity, pairs)
+
+    def _insert(self, entity: str, pairs) -> int:
+        rows = [(entity, str(old), int(new)) for old, new in pairs]
+        self._db.executemany(
+            "INSERT OR REPLACE INTO id_map (entity, old_id, new_id) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    # ------------------------------------------------------------
+    # Compatibilidade com id_map.json
+    # ------------------------------------------------------------
+
+    def import_json(self, json_path: str) -> int:
+        """Substitui, numa transação só, as entidades presentes no JSON."""
+        with open(json_path) as f:
+            data = json.load(f)
+        total = 0
+        with self._db:
+            for entity, mapping in data.items():
+                self._db.execute("DELETE FROM id_map WHERE entity = ?", (entity,))
+                total += self._insert(entity, mapping.items())
+        return total
+
+    def export_json(self, json_path: str) -> int:
+        data = {}
+        for entity, old, new in self._db.execute(
+                "SELECT entity, old_id, new_id FROM id_map ORDER BY entity"):
+            data.setdefault(entity, {})[old] = new
+        tmp = json_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, json_path)
+        return sum(len(m) for m in data.values())
+
+    def imported_mtime(self) -> float:
+        return float(self._get_meta('json_mtime') or 0)
+
+    def _get_meta(self, key: str):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Mapa de IDs da migração (SQLite)")
+    ap.add_argument('--db', default=cfg.ID_MAP_DB)
+    ap.add_argument('--import', dest='import_path', help="importa um id_map.json")
+    ap.add_argument('--export', dest='export_path', help="exporta no formato id_map.json")
+    ap.add_argument('--stats', action='store_true', help="mapeamentos por entidade")
+    args = ap.parse_args()
+
+    with IdMapStore(args.db) as store:
+        if args.import_path:
+            print(f"Importados: {store.import_json(args.import_path)}")
+        if args.export_path:
+            print(f"Exportados: {store.export_json(args.export_path)}")
+        if args.stats or not (args.import_path or args.export_path):
+            for entity, n in store.counts().items():
+                print(f"  {entity}: {n}")
+            print(f"  total: {len(store)}")
+
+
+if __name__ == '__main__':
+    main()
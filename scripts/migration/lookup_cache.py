@@ -0,0 +1,128 @@
+"""
+lookup_cache.py — Caches de tabelas de apoio (profissões, telefones) em memória
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Quem importa pessoas consultava profissoes/telefones uma vez por registro
+(UPPER(nome) = UPPER(%s) não usa índice: varredura da tabela a cada
+chamada). LookupCache carrega a tabela uma vez, indexada pelo valor
+normalizado, responde da memória e cria os que faltam num único
+INSERT ... RETURNING por chamada de ids_for().
+
+Os ids criados só valem depois do commit de quem chamou: em caso de
+ROLLBACK, rollback() esquece o que foi criado desde o último commit() (ou
+desde um checkpoint(), para quem usa SAVEPOINT).
+
+Uso:
+    profissoes = profissoes_cache(cur)
+    ids = profissoes.ids_for(cur, ['Médico', 'MEDICO'])   # valor -> id
+    conn.commit(); profissoes.commit()
+"""
+
+import re
+import unicodedata
+
+import psycopg2.extras
+
+import config as cfg
+
+_SPACES = re.compile(r'\s+')
+_NON_DIGIT = re.compile(r'\D')
+
+
+def fold_text(text: str) -> str:
+    """Chave de comparação de nomes: sem caixa, sem acentos, espaços simples."""
+    folded = unicodedata.normalize('NFKD', text.casefold())
+    folded = ''.join(ch for ch in folded if not unicodedata.combining(ch))
+    return _SPACES.sub(' ', folded).strip()
+
+
+def phone_digits(numero: str) -> str:
+    """Chave de comparação de telefones: só os dígitos."""
+    return _NON_DIGIT.sub('', numero)
+
+
+class LookupCache:
+    """valor normalizado -> id de uma tabela de apoio, com criação em lote."""
+
+    def __init__(self, cur, table: str, column: str, normalize, extra=None):
+        self.table = table
+        self.column = column
+        self.normalize = normalize
+        self.extra = extra or {}  # coluna -> valor fixo nas linhas criadas
+        self.hits = 0
+        self.created = 0
+        self._new = []            # chaves criadas desde o último commit()
+
+        cur.execute(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY id")
+        self._ids = {}
+        for row_id, value in cur.fetchall():
+            self._ids.setdefault(normalize(value), row_id)  # duplicatas: menor id
+
+    def __len__(self):
+        return len(self._ids)
+
+    def get(self, value):
+        return self._ids.get(self.normalize(value))
+
+    def ids_for(self, cur, values) -> dict:
+        """valor -> id para cada valor, criando os que faltam (sem commit).
+
+        Valores com a mesma chave normalizada viram um registro só, gravado
+        com a primeira grafia vista.
+        """
+        out = {}
+        missing = {}
+        for value in values:
+            key = self.normalize(value)
+            if key in self._ids:
+                out[value] = self._ids[key]
+                self.hits += 1
+            elif key:
+                missing.setdefault(key, value)
+        if missing:
+            columns = [self.column] + list(self.extra)
+            returned = psycopg2.extras.execute_values(
+                cur, f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES %s "
+                     f"RETURNING id, {self.column}",
+                [(value,) + tuple(self.extra.values()) for value in missing.values()],
+                page_size=len(missing), fetch=True)
+            for row_id, value in returned:
+                key = self.normalize(value)
+                self._ids[key] = row_id
+                self._new.append(key)
+            self.created += len(returned)
+            for value in values:
+                if value not in out:
+                    key = self.normalize(value)
+                    if key in self._ids:
+                        out[value] = self._ids[key]
+        return out
+
+    # ------------------------------------------------------------
+    # Acompanhamento da transação de quem chama
+    # ------------------------------------------------------------
+
+    def checkpoint(self) -> int:
+        return len(self._new)
+
+    def rollback(self, checkpoint: int = 0):
+        """Esquece as chaves criadas depois do checkpoint (ROLLBACK [TO SAVEPOINT])."""
+        for key in self._new[checkpoint:]:
+            del self._ids[key]
+        self.created -= len(self._new) - checkpoint
+        del self._new[checkpoint:]
+
+    def commit(self):
+        self._new.clear()
+
+    def summary(self) -> str:
+        return f"{self.table}: {len(self)} em cache, {self.hits} acertos, {self.created} criados"
+
+
+def profissoes_cache(cur) -> LookupCache:
+    return LookupCache(cur, 'profissoes', 'nome', fold_text, {'ativo': True})
+
+
+def telefones_cache(cur) -> LookupCache:
+    return LookupCache(cur, 'telefones', 'numero', phone_digits,
+                       {'id_tipo': cfg.TIPO_TELEFONE_COMERCIAL_ID})
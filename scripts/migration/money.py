@@ -0,0 +1,55 @@
+"""
+money.py — Valores monetários em centavos inteiros (exatos)
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+As colunas valor* do dump são decimal(…,2) em texto. Convertidas para
+float, as somas de verbas e os valor_total/valor_saldo acumulavam erro de
+arredondamento antes do cast para numeric(15,2) no PostgreSQL. Aqui cada
+valor vira um int de centavos: somas e diferenças são aritmética inteira e
+cents_text() devolve o texto exato para o COPY ('1234.50').
+
+to_cents() usa o float() do C e confere o resultado: round(f * 100) é exato
+sempre que o texto tem no máximo duas casas (o caso do dump) e a volta
+centavos / 100 == f prova isso sem olhar a string. Só o que não passa na
+conferência (mais casas, notação científica) vai para o Decimal, com
+arredondamento meio-para-cima como o numeric.
+
+Uso:
+    total = to_cents(r[6]) + to_cents(r[13])     # 123450 + 1000
+    cents_text(total)                            # '1244.50'
+    cents_column(valores)                        # array('q') de um lote
+"""
+
+from array import array
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+_CENT = Decimal(1)
+_EXACT_LIMIT = 2 ** 50  # centavos abaixo disso cabem sem perda num double
+
+
+def to_cents(v, default: int = 0) -> int:
+    """Texto decimal (ou número) -> centavos. Inválido, NaN ou infinito -> default."""
+    try:
+        f = float(v)
+        c = round(f * 100)
+    except (ValueError, TypeError, OverflowError):
+        return default
+    if -_EXACT_LIMIT < c < _EXACT_LIMIT and c / 100 == f:
+        return c
+    try:
+        d = Decimal(v.strip() if isinstance(v, str) else repr(v))
+    except (InvalidOperation, AttributeError):
+        return default
+    return int((d * 100).quantize(_CENT, ROUND_HALF_UP))
+
+
+def cents_column(values) -> array:
+    """Lote de textos -> array('q') de centavos (8 bytes por valor)."""
+    return array('q', map(to_cents, values))
+
+
+def cents_text(c: int) -> str:
+    """Centavos -> texto numeric com duas casas ('-0.05', '1234.50')."""
+    if c < 0:
+        return '-%d.%02d' % divmod(-c, 100)
+    return '%d.%02d' % divmod(c, 100)
@@ -0,0 +1,62 @@
+"""
+pessoa_writer.py — Criação de pessoas em lote (pessoa + tipo + papel + endereço)
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Cada pessoa importada custava um INSERT por tabela (pessoas, pessoas_tipos,
+tabela do papel, enderecos) e, para o endereço placeholder, mais um SELECT
+em logradouros. create_pessoas() grava N pessoas com tudo isso em quatro
+comandos: o INSERT em pessoas devolve os idpessoa na ordem das linhas e os
+outros três são INSERTs de várias linhas montados com esses ids. O
+logradouro placeholder vem de address_resolver.Placeholders, resolvido uma
+vez por execução.
+
+Uso:
+    ids = create_pessoas(cur, ('nome', 'fisica_juridica', 'cod'), pessoas,
+                         tipos=[(2, True)] * len(pessoas),
+                         role_table='pessoas_corretores', role_columns=('usuario', 'cod'),
+                         roles=roles, logradouro_id=placeholders.logradouro_id)
+"""
+
+import psycopg2.extras
+
+
+def insert_pessoas(cur, columns, rows, template=None) -> list:
+    """INSERT de várias pessoas; idpessoa na mesma ordem de `rows` (sem commit)."""
+    if not rows:
+        return []
+    # INSERT ... VALUES devolve o RETURNING na ordem do VALUES; page_size
+    # cobre o lote inteiro para tudo sair de um único comando.
+    return [r[0] for r in psycopg2.extras.execute_values(
+        cur, f"INSERT INTO pessoas ({', '.join(columns)}) VALUES %s RETURNING idpessoa",
+        rows, template=template, page_size=len(rows), fetch=True)]
+
+
+def create_pessoas(cur, columns, pessoas, tipos, role_table: str, role_columns, roles,
+                   logradouro_id=None) -> list:
+    """Cria pessoas com pessoas_tipos, tabela do papel e endereço (sem commit).
+
+    `pessoas` são tuplas com `columns`; `tipos` traz (id_tipo_pessoa, ativo)
+    e `roles` as tuplas com `role_columns` (sem id_pessoa), ambos na ordem de
+    `pessoas`. Com `logradouro_id`, cada pessoa ganha um endereço nele
+    (tipo 1, número 0). Retorna os idpessoa na ordem de `pessoas`.
+    """
+    pessoas = list(pessoas)
+    ids = insert_pessoas(cur, columns, pessoas)
+    if not ids:
+        return ids
+    n = len(ids)
+
+    psycopg2.extras.execute_values(
+        cur, "INSERT INTO pessoas_tipos (id_pessoa, id_tipo_pessoa, data_inicio, ativo) VALUES %s",
+        [(pid, tipo, ativo) for pid, (tipo, ativo) in zip(ids, tipos)],
+        template="(%s, %s, CURRENT_DATE, %s)", page_size=n)
+
+    psycopg2.extras.execute_values(
+        cur, f"INSERT INTO {role_table} (id_pessoa, {', '.join(role_columns)}) VALUES %s",
+        [(pid,) + tuple(role) for pid, role in zip(ids, roles)], page_size=n)
+
+    if logradouro_id is not None:
+        psycopg2.extras.execute_values(
+            cur, "INSERT INTO enderecos (id_pessoa, id_logradouro, id_tipo, end_numero) VALUES %s",
+            [(pid, logradouro_id) for pid in ids], template="(%s, %s, 1, 0)", page_size=n)
+    return ids
@@ -0,0 +1,450 @@
+"""
+pipeline.py — Estágios de streaming: dump -> transformação -> carga em lotes
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Cada passo do hotfix vira uma cadeia de geradores: o leitor do dump entrega
+as tuplas de uma tabela, a função de transformação produz as tuplas de
+destino e o carregador consome lotes à medida que chegam. Nada é acumulado
+em lista: a memória fica limitada ao tamanho do lote (mais um INSERT do
+dump), independente do tamanho do dump, e o banco recebe o primeiro lote
+logo após o parse do primeiro statement.
+
+Dois backends de carga, escolhidos por config.LOADER_BACKEND:
+  - 'copy':           COPY ... FROM STDIN (formato texto), um COPY por lote
+  - 'execute_values': INSERT ... VALUES %s em páginas (comportamento anterior)
+
+Reimportação incremental (stage_rows + sync_table): as tuplas vão por COPY
+para uma tabela temporária (sem WAL) e só a diferença em relação ao destino,
+casada pela chave de origem, vira INSERT/UPDATE/DELETE; linhas com chave
+nula/0 ou repetida saem do staging antes (dedupe_staged). stage_batches faz
+o mesmo com lotes colunares (columnar.py), que já chegam serializados.
+
+Produtor/consumidor (depth > 0 nos carregadores): parse + transformação
+rodam numa thread e montam até `depth` lotes à frente, enquanto a thread
+que chamou grava o lote anterior (o psycopg2 solta o GIL esperando o
+servidor). A fila limitada segura o produtor; um erro de qualquer lado para
+os dois e reaparece para quem chamou. O LoadReport mostra a ocupação de
+cada estágio.
+"""
+
+import io
+import queue
+import resource
+import sys
+import threading
+import time
+from contextlib import closing
+from itertools import islice
+
+import psycopg2
+import psycopg2.extras
+
+
+def batched(iterable, size: int):
+    """Lotes (listas) de até `size` itens."""
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class StageClock:
+    """Tempo em que um estágio trabalhou e em que ficou parado esperando o outro."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.busy = 0.0
+        self.waiting = 0.0
+
+
+def prefetch(iterable, depth: int, producer: StageClock = None, consumer: StageClock = None):
+    """Itens de `iterable` produzidos numa thread, até `depth` à frente do consumidor.
+
+    depth <= 0: tudo na thread que chamou (só mede os estágios). Uma exceção
+    do produtor é relançada no consumidor; se o consumidor parar (exceção ou
+    close() do gerador), o produtor é avisado e a thread termina antes do
+    retorno, fechando o iterador de origem.
+    """
+    perf = time.perf_counter
+    producer = producer or StageClock('produtor')
+    consumer = consumer or StageClock('consumidor')
+    if depth <= 0:
+        it = iter(iterable)
+        while True:
+            t = perf()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                producer.busy += perf() - t
+            t = perf()
+            yield item
+            consumer.busy += perf() - t
+
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        t = perf()
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        producer.waiting += perf() - t
+
+    def run():
+        it = iter(iterable)
+        try:
+            while not stop.is_set():
+                t = perf()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    producer.busy += perf() - t
+                put((True, item))
+            put((False, None))
+        except BaseException as e:  # repassada ao consumidor
+            put((False, e))
+        finally:
+            close = getattr(it, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=run, name=f"prefetch-{producer.name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            t = perf()
+            ok, item = q.get()
+            consumer.waiting += perf() - t
+            if not ok:
+                if item is not None:
+                    raise item
+                return
+            t = perf()
+            yield item
+            consumer.busy += perf() - t
+    finally:
+        stop.set()
+        thread.join()
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo (MB)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+class LoadReport:
+    """Métricas de um estágio de carga: linhas, lotes, tempo até o 1º insert
+    e ocupação dos estágios (transformação x gravação)."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.rows = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+        self.first_insert = None
+        self.depth = 0
+        self.stages = ()
+
+    def iter_batches(self, rows, batch_size: int, depth: int = 0, prepare=None):
+        """Lotes de `rows` via prefetch(), com os relógios dos dois estágios.
+        `prepare(lote)` roda no estágio de transformação (ex.: texto do COPY)."""
+        self.depth = depth
+        self.stages = (StageClock('transformação'), StageClock('gravação'))
+        batches = batched(rows, batch_size)
+        if prepare is not None:
+            batches = map(prepare, batches)
+        return prefetch(batches, depth, *self.stages)
+
+    def batch_done(self, n: int):
+        if self.first_insert is None:
+            self.first_insert = time.perf_counter() - self.started
+        self.rows += n
+        self.batches += 1
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        ttfi = f"{self.first_insert:.2f}s" if self.first_insert is not None else "-"
+        out = (f"  [{self.label}] {self.rows} linhas em {self.batches} lotes, "
+               f"{elapsed:.1f}s (1º insert em {ttfi}, pico RSS {peak_rss_mb():.0f} MB)")
+        if self.stages and elapsed > 0:
+            mode = f"fila de {self.depth} lotes" if self.depth > 0 else "sequencial"
+            out += f"\n  [{self.label}] ocupação ({mode}): " + ", ".join(
+                f"{st.name} {st.busy / elapsed:.0%} (parado {st.waiting / elapsed:.0%})"
+                for st in self.stages)
+        return out
+
+
+def wal_lsn(cur):
+    """Posição atual do WAL (texto 'X/Y'), ou None se indisponível."""
+    try:
+        cur.execute("SELECT pg_current_wal_lsn()")
+    except psycopg2.Error:
+        cur.connection.rollback()
+        return None
+    return cur.fetchone()[0]
+
+
+def wal_bytes_since(cur, lsn) -> int:
+    """Bytes de WAL gerados desde `lsn` (0 se a posição não foi lida)."""
+    if lsn is None:
+        return 0
+    cur.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)", (lsn,))
+    return int(cur.fetchone()[0])
+
+
+def load_execute_values(conn, sql: str, template: str, rows, batch_size: int,
+                        label: str, progress_every: int = 0, depth: int = 0) -> LoadReport:
+    """Consome `rows` em lotes com execute_values, commit por lote.
+    depth > 0: lotes produzidos numa thread enquanto o anterior é gravado."""
+    report = LoadReport(label)
+    with conn.cursor() as cur, closing(report.iter_batches(rows, batch_size, depth)) as batches:
+        for batch in batches:
+            psycopg2.extras.execute_values(cur, sql, batch, template=template, page_size=len(batch))
+            conn.commit()
+            before = report.rows
+            report.batch_done(len(batch))
+            if progress_every and report.rows // progress_every != before // progress_every:
+                print(f"  ... {report.rows} {label} inseridos")
+    return report
+
+
+# ============================================================
+# COPY FROM STDIN
+# ============================================================
+
+COPY_READ_SIZE = 256 * 1024
+
+
+def copy_text(v) -> str:
+    """Valor Python -> campo do formato texto do COPY (NULL = \\N)."""
+    if v is None:
+        return '\\N'
+    t = type(v)
+    if t is str:
+        if '\\' in v or '\t' in v or '\n' in v or '\r' in v:
+            v = (v.replace('\\', '\\\\').replace('\t', '\\t')
+                  .replace('\n', '\\n').replace('\r', '\\r'))
+        return v
+    if t is bool:
+        return 't' if v else 'f'
+    if t is float:
+        return repr(v)
+    # int, Decimal, date, datetime: str() já é aceito pelo PostgreSQL
+    return str(v)
+
+
+class ChunkStream(io.TextIOBase):
+    """Arquivo somente-leitura sobre blocos de texto já no formato do COPY."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = ''
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            if chunk:
+                self._buf, self._pos = chunk, 0
+                return True
+        return False
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            parts = [self._buf[self._pos:]]
+            while self._fill():
+                parts.append(self._buf)
+            self._buf, self._pos = '', 0
+            return ''.join(parts)
+        if self._pos >= len(self._buf) and not self._fill():
+            return ''
+        out = self._buf[self._pos:self._pos + size]
+        self._pos += len(out)
+        return out
+
+
+def copy_text_chunks(rows, chunk_rows: int = 1000):
+    """Blocos de texto do COPY com até `chunk_rows` tuplas cada."""
+    for chunk in batched(rows, chunk_rows):
+        yield ''.join(['\t'.join(map(copy_text, r)) + '\n' for r in chunk])
+
+
+def copy_batch_text(batch: list) -> tuple:
+    """(nº de tuplas, texto do COPY) de um lote."""
+    return len(batch), ''.join(copy_text_chunks(batch))
+
+
+class CopyStream(ChunkStream):
+    """Arquivo somente-leitura que serializa tuplas para o COPY sob demanda."""
+
+    def __init__(self, rows, chunk_rows: int = 1000):
+        super().__init__(copy_text_chunks(rows, chunk_rows))
+
+
+def copy_chunks(cur, table: str, columns, chunks, depth: int = 0) -> int:
+    """Um COPY FROM STDIN de blocos de texto já serializados (sem commit).
+
+    depth > 0: os blocos são produzidos numa thread (prefetch) enquanto o
+    COPY envia os anteriores.
+    """
+    with closing(prefetch(chunks, depth)) as chunks:
+        cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN",
+                        ChunkStream(chunks), size=COPY_READ_SIZE)
+    return cur.rowcount
+
+
+def copy_rows(cur, table: str, columns, rows, depth: int = 0) -> int:
+    """Um COPY FROM STDIN de `rows` (sem commit). Retorna o nº de linhas."""
+    return copy_chunks(cur, table, columns, copy_text_chunks(rows), depth)
+
+
+def load_copy(conn, table: str, columns, rows, batch_size: int,
+              label: str, progress_every: int = 0, depth: int = 0) -> LoadReport:
+    """Consome `rows` com COPY FROM STDIN, um COPY + commit por lote.
+
+    O lote já sai serializado do estágio de transformação; com depth > 0
+    essa thread monta os próximos enquanto o COPY envia o atual.
+    """
+    report = LoadReport(label)
+    with conn.cursor() as cur, closing(report.iter_batches(rows, batch_size, depth,
+                                                           copy_batch_text)) as batches:
+        for n, text in batches:
+            copy_chunks(cur, table, columns, (text,))
+            conn.commit()
+            before = report.rows
+            report.batch_done(n)
+            if progress_every and report.rows // progress_every != before // progress_every:
+                print(f"  ... {report.rows} {label} inseridos")
+    return report
+
+
+def insert_sql(table: str, columns) -> tuple:
+    """(sql, template) de INSERT ... VALUES %s para execute_values."""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+    template = '(' + ','.join(['%s'] * len(columns)) + ')'
+    return sql, template
+
+
+def load_rows(conn, backend: str, table: str, columns, rows, batch_size: int,
+              copy_batch_size: int, label: str, progress_every: int = 0,
+              depth: int = 0) -> LoadReport:
+    """Carrega `rows` em `table` pelo backend escolhido ('copy' ou 'execute_values')."""
+    if backend == 'copy':
+        return load_copy(conn, table, columns, rows, copy_batch_size, label, progress_every, depth)
+    if backend == 'execute_values':
+        sql, template = insert_sql(table, columns)
+        return load_execute_values(conn, sql, template, rows, batch_size, label, progress_every,
+                                   depth)
+    raise ValueError(f"backend de carga desconhecido: {backend!r}")
+
+
+# ============================================================
+# SINCRONIZAÇÃO INCREMENTAL (staging + diff por chave de origem)
+# ============================================================
+
+def stage_rows(cur, staging: str, table: str, columns, rows, depth: int = 0) -> int:
+    """Tabela temporária com os tipos das colunas de `table`, carregada via COPY
+    (depth > 0: transformação numa thread, como em copy_chunks)."""
+    cur.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                f"SELECT {', '.join(columns)} FROM {table} WITH NO DATA")
+    n = copy_rows(cur, staging, columns, rows, depth)
+    cur.execute(f"ANALYZE {staging}")
+    return n
+
+
+def stage_batches(cur, staging: str, table: str, columns, batches, depth: int = 0) -> int:
+    """Como stage_rows, com lotes colunares (columnar.ColumnBatch) serializados direto."""
+    cur.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                f"SELECT {', '.join(columns)} FROM {table} WITH NO DATA")
+    n = copy_chunks(cur, staging, columns, (b.copy_text() for b in batches), depth)
+    cur.execute(f"ANALYZE {staging}")
+    return n
+
+
+def stage_select(cur, staging: str, table: str, columns, select_sql: str, params=None) -> int:
+    """Como stage_rows, mas as linhas vêm de um SELECT no próprio servidor."""
+    cur.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                f"SELECT {', '.join(columns)} FROM {table} WITH NO DATA")
+    cur.execute(f"INSERT INTO {staging} ({', '.join(columns)}) {select_sql}", params)
+    n = cur.rowcount
+    cur.execute(f"ANALYZE {staging}")
+    return n
+
+
+def dedupe_staged(cur, staging: str, key: str) -> dict:
+    """Tira de `staging` as linhas que a chave de origem não identifica (sem
+    commit): chave nula ou 0 (safe_int de um código ausente/inválido) e
+    chaves repetidas, das quais fica a última carregada. Sem isso o INSERT
+    do sync_table violaria o índice único e abortaria a carga inteira."""
+    cur.execute(f"DELETE FROM {staging} WHERE {key} IS NULL OR {key} = 0")
+    no_key = cur.rowcount
+    cur.execute(f"""
+        DELETE FROM {staging} a USING {staging} b
+        WHERE a.{key} = b.{key} AND a.ctid < b.ctid
+    """)
+    duplicates = cur.rowcount
+    if no_key or duplicates:
+        print(f"  WARN: {staging}: {no_key} linhas sem {key} e {duplicates} com {key} "
+              f"repetido descartadas")
+    return {'no_key': no_key, 'duplicates': duplicates}
+
+
+def sync_table(cur, table: str, source: str, key: str, columns, scope: str = 'TRUE',
+               insert_only=(), untracked=(), insert_exprs=None) -> dict:
+    """Aplica em `table` só a diferença para `source` (sem commit).
+
+    `source` é uma tabela de staging ou uma subconsulta entre parênteses com
+    as mesmas `columns`; as linhas casam pela coluna `key`. `scope` (predicado
+    sobre o alias t) limita quais linhas do destino pertencem à carga.
+    Colunas em `insert_only` nunca são atualizadas; as de `untracked` são
+    atualizadas mas não contam como mudança (ex.: updated_at).
+    `insert_exprs` troca a expressão de uma coluna no INSERT.
+    Uma tabela de staging passa antes por dedupe_staged (subconsultas não
+    são alteradas: a chave delas já deve ser única).
+    """
+    insert_exprs = insert_exprs or {}
+    dropped = {'no_key': 0, 'duplicates': 0}
+    if not source.lstrip().startswith('('):
+        dropped = dedupe_staged(cur, source, key)
+    tracked = [c for c in columns if c != key and c not in insert_only and c not in untracked]
+    updated_cols = tracked + [c for c in untracked if c in columns]
+
+    cur.execute(f"""
+        DELETE FROM {table} t
+        WHERE {scope} AND t.{key} IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM {source} s WHERE s.{key} = t.{key})
+    """)
+    deleted = cur.rowcount
+
+    updated = 0
+    if tracked:
+        cur.execute(f"""
+            UPDATE {table} t SET {', '.join(f'{c} = s.{c}' for c in updated_cols)}
+            FROM {source} s
+            WHERE t.{key} = s.{key} AND {scope}
+              AND ({', '.join('t.' + c for c in tracked)}) IS DISTINCT FROM
+                  ({', '.join('s.' + c for c in tracked)})
+        """)
+        updated = cur.rowcount
+
+    cur.execute(f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {', '.join(insert_exprs.get(c, 's.' + c) for c in columns)}
+        FROM {source} s
+        WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{key} = s.{key} AND {scope})
+    """)
+    inserted = cur.rowcount
+    return {'inserted': inserted, 'updated': updated, 'deleted': deleted, **dropped}
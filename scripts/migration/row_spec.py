@@ -0,0 +1,156 @@
+"""
+row_spec.py — Extração de campos do dump a partir de uma especificação declarativa
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+As transformações liam as tuplas do dump por posição fixa (r[6], r[13]),
+com as posições documentadas só em comentário. Um RowSpec declara, por
+tabela, quais colunas ler (pelo nome) e como converter cada uma; compile()
+resolve os nomes para posições com as colunas do CREATE TABLE do dump e gera
+uma função especializada, uma vez:
+
+    def extract(r):
+        return (r[0].strip(), safe_int(r[2]), parse_competencia(r[3]), ...)
+
+sem laço sobre a especificação, sem dict e sem getattr por linha.
+
+Para quem guarda as linhas (ex.: endereços por código), record_class() gera
+uma classe com __slots__ que guarda só os valores crus dos campos da
+especificação (a tupla do dump é descartada) e converte cada atributo no
+acesso: rec.endac, rec.numero. Sem __dict__ por objeto, sem chaves repetidas;
+valores que se repetem muito (cidade, UF) podem ser compartilhados.
+
+O conversor de um campo é um callable (chamado com o valor) ou uma
+expressão em que {0} é o valor, embutida direto no código gerado
+(ex.: '{0}.strip() or None'); nomes usados nas expressões vêm de `env`.
+Campos com default podem faltar em linhas curtas (len(r) <= posição).
+
+Uso:
+    SPEC = RowSpec('locrecibo', (('recibo', '{0}.strip()'), ('valor', safe_float)),
+                   default_columns=('recibo', 'nrobancario', ...), min_width=20)
+    columns = index.column_names('locrecibo')     # [] sem CREATE TABLE: default_columns
+    extract, width = SPEC.compile(columns), SPEC.width(columns)
+    for r in rows:
+        if len(r) >= width:
+            recibo, valor = extract(r)
+
+    Record = SPEC.record_class(columns)
+    recibos = {r[0]: Record(r) for r in rows if len(r) >= width}   # recibos[k].valor
+"""
+
+_REQUIRED = object()
+_MISSING = object()  # campo com default ausente numa linha curta
+
+
+def _conv_expr(i: int, conv, value: str) -> str:
+    """Expressão do campo i: valor cru, callable _c{i} ou expressão com {0}."""
+    if conv is None:
+        return value
+    if isinstance(conv, str):
+        return '(' + conv.format(value) + ')'
+    return f"_c{i}({value})"
+
+
+class RowSpec:
+    """Campos (coluna, conversor[, default]) lidos de uma tabela do dump."""
+
+    def __init__(self, table: str, fields, default_columns=(), min_width: int = 0, env=None):
+        self.table = table
+        self.fields = [tuple(f) + (_REQUIRED,) * (3 - len(f)) for f in fields]
+        self.default_columns = tuple(default_columns)
+        self.min_width = min_width
+        self.env = env or {}
+        self._compiled = {}
+        self._records = {}
+
+    def positions(self, columns=None) -> list:
+        """Posição de cada campo nas `columns` (nomes sem diferença de caixa)."""
+        names = [c.lower() for c in (columns or self.default_columns)]
+        out = []
+        for column, _, _ in self.fields:
+            try:
+                out.append(names.index(column.lower()))
+            except ValueError:
+                raise KeyError(f"{self.table}: coluna '{column}' não existe no dump "
+                               f"(colunas: {', '.join(names)})") from None
+        return out
+
+    def position(self, column: str, columns=None) -> int:
+        """Posição de uma coluna fora da especificação (ex.: filtro antes da extração)."""
+        return [c.lower() for c in (columns or self.default_columns)].index(column.lower())
+
+    def width(self, columns=None) -> int:
+        """Tamanho mínimo da tupla: min_width ou além, se um campo obrigatório
+        estiver depois dele nas colunas do dump."""
+        required = [pos + 1 for (_, _, default), pos in zip(self.fields, self.positions(columns))
+                    if default is _REQUIRED]
+        return max([self.min_width] + required)
+
+    def source(self, columns=None) -> str:
+        """Código Python da função de extração (para conferência)."""
+        width = self.width(columns)
+        exprs = []
+        for i, ((column, conv, default), pos) in enumerate(zip(self.fields, self.positions(columns))):
+            expr = _conv_expr(i, conv, f"r[{pos}]")
+            if default is not _REQUIRED and pos >= width:
+                expr = f"({expr} if len(r) > {pos} else _d{i})"
+            exprs.append(expr)
+        return "def extract(r):\n    return (" + ", ".join(exprs) + ",)\n"
+
+    def compile(self, columns=None):
+        """Função tupla do dump -> tupla de campos convertidos (em cache por colunas)."""
+        key = tuple(columns or self.default_columns)
+        extract = self._compiled.get(key)
+        if extract is None:
+            namespace = dict(self.env)
+            for i, (_, conv, default) in enumerate(self.fields):
+                if callable(conv):
+                    namespace[f"_c{i}"] = conv
+                namespace[f"_d{i}"] = default
+            exec(compile(self.source(columns), f"<row_spec {self.table}>", 'exec'), namespace)
+            extract = self._compiled[key] = namespace['extract']
+        return extract
+
+    def record_source(self, columns=None, shared=()) -> str:
+        """Código Python da classe de registro (para conferência)."""
+        width = self.width(columns)
+        name = ''.join(part.capitalize() for part in self.table.split('_')) + 'Record'
+        lines = [f"class {name}:",
+                 f"    __slots__ = ({''.join(repr('_' + c) + ', ' for c, _, _ in self.fields)})",
+                 "",
+                 "    def __init__(self, r):"]
+        for (column, _, default), pos in zip(self.fields, self.positions(columns)):
+            value = f"_share(r[{pos}], r[{pos}])" if column in shared else f"r[{pos}]"
+            if default is not _REQUIRED and pos >= width:
+                value = f"{value} if len(r) > {pos} else _MISSING"
+            lines.append(f"        self._{column} = {value}")
+        for i, ((column, conv, default), pos) in enumerate(zip(self.fields, self.positions(columns))):
+            value = f"self._{column}"
+            expr = _conv_expr(i, conv, value)
+            lines += ["", "    @property", f"    def {column}(self):"]
+            if default is not _REQUIRED and pos >= width:
+                lines.append(f"        return _d{i} if {value} is _MISSING else {expr}")
+            else:
+                lines.append(f"        return {expr}")
+        fields = ', '.join(f"{c}={{self.{c}!r}}" for c, _, _ in self.fields)
+        lines += ["", "    def __repr__(self):", f"        return f\"{name}({fields})\""]
+        return '\n'.join(lines) + '\n'
+
+    def record_class(self, columns=None, shared=()) -> type:
+        """Classe com __slots__ construída da tupla do dump: Record(r).campo
+        (convertido a cada acesso; em cache por colunas).
+
+        Os valores crus dos campos em `shared` (cidade, UF: poucos valores
+        distintos) são deduplicados entre os registros da classe.
+        """
+        key = (tuple(columns or self.default_columns), tuple(shared))
+        cls = self._records.get(key)
+        if cls is None:
+            namespace = dict(self.env, _MISSING=_MISSING, _share={}.setdefault)
+            for i, (_, conv, default) in enumerate(self.fields):
+                if callable(conv):
+                    namespace[f"_c{i}"] = conv
+                namespace[f"_d{i}"] = default
+            source = self.record_source(columns, shared)
+            exec(compile(source, f"<row_spec {self.table} record>", 'exec'), namespace)
+            cls = self._records[key] = namespace[source.split()[1].rstrip(':')]
+        return cls
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+scheduler.py — Execução paralela de fases/passos com grafo de dependências
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+O grafo vem de config.PHASES + config.PHASE_DEPENDS (fase -> fases das quais
+depende; fase sem entrada depende da anterior na lista, como na execução
+sequencial). Uma fase é disparada assim que todas as dependências terminam
+com sucesso; fases independentes podem rodar ao mesmo tempo (veja o limite
+abaixo), cada uma em um processo próprio com sua própria conexão
+PostgreSQL. Se uma fase falha, as que dependem dela não são executadas.
+
+Uso:
+    python3 scripts/migration/scheduler.py --plan              # grafo + caminho crítico
+    python3 scripts/migration/scheduler.py                     # todas as fases
+    python3 scripts/migration/scheduler.py --phases 05,06,07
+    python3 scripts/migration/scheduler.py --dry-run
+
+Cada fase é executada como `migrate.py --phase XX` (mesma idempotência e
+logs da execução manual).
+
+migrate.py guarda o estado em id_map.json e phases_done.json, reescritos
+inteiros a cada gravação: duas fases simultâneas perdem mapeamentos (vale a
+última gravação). Por isso --workers fica limitado a MAX_SAFE_WORKERS (1)
+até migrate.py gravar num store seguro para concorrência (id_map_store.py).
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+sys.path.insert(0, os.path.dirname(__file__))
+import config as cfg
+
+MIGRATE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrate.py')
+
+# Fases simultâneas permitidas enquanto migrate.py usar os arquivos JSON
+MAX_SAFE_WORKERS = 1
+
+# Estimativas (min) do LEIA_ANTES_DE_EXECUTAR.txt, usadas só no --plan
+PHASE_ESTIMATE_MIN = {
+    '00': 0.5, '01': 0.5, '02': 0.5, '03': 0.5, '04': 0.5, '05': 0.5, '06': 0.5, '07': 0.5,
+    '08': 7.5, '09': 1.5, '10': 1.5, '11': 5, '12': 3.5, '13': 3.5,
+    '14': 45, '15': 15, '16': 45, '17': 2.5, '18': 2.5,
+}
+
+
+# ============================================================
+# GRAFO
+# ============================================================
+
+def phase_graph(phases=None, depends=None) -> dict:
+    """fase -> conjunto de fases das quais depende."""
+    phases = cfg.PHASES if phases is None else phases
+    depends = cfg.PHASE_DEPENDS if depends is None else depends
+    ids = [p[0] for p in phases]
+    graph = {}
+    for i, pid in enumerate(ids):
+        if pid in depends:
+            deps = set(depends[pid])
+        else:
+            deps = {ids[i - 1]} if i else set()
+        unknown = deps - set(ids)
+        if unknown:
+            raise ValueError(f"fase {pid}: dependências desconhecidas {sorted(unknown)}")
+        graph[pid] = deps
+    topological_order(graph)  # valida ciclos
+    return graph
+
+
+def subgraph(graph: dict, selected) -> dict:
+    """Restringe o grafo às fases escolhidas (dependências fora da seleção
+    são consideradas já concluídas)."""
+    selected = set(selected)
+    return {k: graph[k] & selected for k in graph if k in selected}
+
+
+def topological_order(graph: dict) -> list:
+    order = []
+    done = set()
+    pending = dict(graph)
+    while pending:
+        ready = sorted(k for k, deps in pending.items() if deps <= done)
+        if not ready:
+            raise ValueError(f"ciclo de dependências entre {sorted(pending)}")
+        for k in ready:
+            order.append(k)
+            done.add(k)
+            del pending[k]
+    return order
+
+
+def levels(graph: dict) -> list:
+    """Ondas de fases que podem rodar juntas."""
+    depth = {}
+    for k in topological_order(graph):
+        depth[k] = 1 + max((depth[d] for d in graph[k]), default=-1)
+    out = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+    for k, d in depth.items():
+        out[d].append(k)
+    return [sorted(level) for level in out]
+
+
+def critical_path(graph: dict, cost: dict) -> tuple:
+    """(custo total, fases) do caminho mais longo do grafo.
+
+    Empates ficam com a menor fase, para o --plan não variar entre execuções.
+    """
+    best = {}
+    for k in topological_order(graph):
+        prev = max(sorted(graph[k]), key=lambda d: best[d][0], default=None)
+        base, path = best[prev] if prev is not None else (0, [])
+        best[k] = (base + cost.get(k, 0), path + [k])
+    return max(best.values(), key=lambda v: v[0], default=(0, []))
+
+
+# ============================================================
+# EXECUÇÃO
+# ============================================================
+
+def run_graph(graph: dict, tasks: dict, executor=None, on_done=None) -> dict:
+    """Executa `tasks[nome]()` respeitando o grafo.
+
+    Com `executor` (Thread/ProcessPoolExecutor) as tarefas prontas são
+    submetidas em paralelo; sem executor, rodam em sequência na ordem
+    topológica. Retorna nome -> resultado; tarefas que falharam ficam com a
+    exceção e as dependentes com None (não executadas).
+    """
+    results = {}
+    failed = set()
+
+    def finish(name, result, error):
+        if error is not None:
+            failed.add(name)
+            results[name] = error
+        else:
+            results[name] = result
+        if on_done:
+            on_done(name, results[name], error)
+
+    if executor is None:
+        for name in topological_order(graph):
+            if graph[name] & failed:
+                failed.add(name)
+                results[name] = None
+                continue
+            try:
+                finish(name, tasks[name](), None)
+            except Exception as e:
+                finish(name, None, e)
+        return results
+
+    pending = dict(graph)
+    running = {}
+    done = set()
+    while pending or running:
+        for name in sorted(pending):
+            deps = pending[name]
+            if deps & failed:
+                failed.add(name)
+                results[name] = None
+                del pending[name]
+            elif deps <= done:
+                running[executor.submit(tasks[name])] = name
+                del pending[name]
+        if not running:
+            if pending:
+                # Dependências falharam em cadeia; o próximo passo do laço limpa
+                continue
+            break
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for fut in finished:
+            name = running.pop(fut)
+            error = fut.exception()
+            finish(name, None if error else fut.result(), error)
+            done.add(name)
+    return results
+
+
+class PhaseFailed(Exception):
+    pass
+
+
+class PhaseRunner:
+    """Tarefa que executa `migrate.py --phase XX` num processo próprio."""
+
+    def __init__(self, phase_id: str, extra_args=()):
+        self.phase_id = phase_id
+        self.extra_args = list(extra_args)
+
+    def __call__(self) -> float:
+        started = time.perf_counter()
+        cmd = [sys.executable, MIGRATE_SCRIPT, '--phase', self.phase_id] + self.extra_args
+        proc = subprocess.run(cmd)
+        elapsed = time.perf_counter() - started
+        if proc.returncode != 0:
+            raise PhaseFailed(f"fase {self.phase_id} saiu com código {proc.returncode}")
+        return elapsed
+
+
+def print_plan(graph: dict):
+    names = {p[0]: p[3] for p in cfg.PHASES}
+    print("Ondas de execução (fases da mesma onda podem rodar em paralelo):")
+    for i, level in enumerate(levels(graph)):
+        print(f"  {i}: " + ', '.join(f"{k} {names.get(k, '')}" for k in level))
+    serial = sum(PHASE_ESTIMATE_MIN.get(k, 0) for k in graph)
+    total, path = critical_path(graph, PHASE_ESTIMATE_MIN)
+    print(f"\nEstimativa sequencial: ~{serial:.0f} min")
+    print(f"Caminho crítico:       ~{total:.0f} min ({' -> '.join(path)})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Executa as fases da migração em paralelo")
+    ap.add_argument('--workers', type=int, default=1,
+                    help=f"fases simultâneas (padrão e máximo: {MAX_SAFE_WORKERS})")
+    ap.add_argument('--phases', help="lista separada por vírgula (padrão: todas)")
+    ap.add_argument('--plan', action='store_true', help="só mostra o grafo e o caminho crítico")
+    ap.add_argument('--dry-run', action='store_true', help="repassa --dry-run para migrate.py")
+    args = ap.parse_args()
+    if not 1 <= args.workers <= MAX_SAFE_WORKERS:
+        ap.error(f"--workers {args.workers}: migrate.py grava id_map.json/phases_done.json "
+                 f"inteiros, fases simultâneas perdem mapeamentos (máximo {MAX_SAFE_WORKERS})")
+
+    graph = phase_graph()
+    if args.phases:
+        graph = subgraph(graph, [p.strip() for p in args.phases.split(',')])
+
+    if args.plan:
+        print_plan(graph)
+        return
+
+    extra = ['--dry-run'] if args.dry_run else []
+    tasks = {pid: PhaseRunner(pid, extra) for pid in graph}
+    started = time.perf_counter()
+
+    def on_done(name, result, error):
+        if error is not None:
+            print(f"[scheduler] fase {name} FALHOU: {error}")
+        else:
+            print(f"[scheduler] fase {name} concluída em {result / 60:.1f} min")
+
+    # Cada fase já é um processo (migrate.py); threads só acompanham
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        results = run_graph(graph, tasks, executor, on_done)
+
+    skipped = sorted(k for k, v in results.items() if v is None)
+    failed = sorted(k for k, v in results.items() if isinstance(v, Exception))
+    print(f"\n[scheduler] {len(results) - len(skipped) - len(failed)} fases ok, "
+          f"{len(failed)} com erro, {len(skipped)} não executadas "
+          f"em {(time.perf_counter() - started) / 60:.1f} min")
+    if skipped:
+        print(f"  Não executadas (dependência falhou): {', '.join(skipped)}")
+    sys.exit(1 if failed or skipped else 0)
+
+
+if __name__ == '__main__':
+    main()
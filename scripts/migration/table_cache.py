@@ -0,0 +1,209 @@
+"""
+table_cache.py — Cache em disco das tabelas já parseadas do dump
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+hotfix_complete_migration.py, fix_enderecos_final.py e hotfix_conjuges.py
+parseavam as mesmas tabelas a cada execução. Na primeira leitura de uma
+tabela, DumpReader.iter_values grava as tuplas em config.TABLE_CACHE_DIR
+enquanto as entrega; as execuções seguintes (de qualquer script) leem o
+arquivo em vez de parsear o dump.
+
+Formato: o nº de tuplas (8 bytes) seguido de um pickle por lote de
+CACHE_BATCH_ROWS tuplas, em colunas; cada coluna de texto é uma única
+string unida por '\\x1f' e volta com um split() (C), sem um objeto pickle
+por campo. Lotes com larguras diferentes ou com '\\x1f' nos dados ficam
+como tuplas.
+
+Chave: impressão digital do dump (DumpIndex) + dump_parser.PARSER_VERSION +
+encoding + formato. Dump novo ou parser alterado = outra chave; os arquivos
+antigos saem pela política LRU (o menos lido primeiro) quando o diretório
+passa de config.TABLE_CACHE_MAX_MB.
+
+Uso:
+    cache = TableCache.from_config()            # None se desligado
+    rows = cache.load(fp, 'loclanctocc', 'latin-1')
+    if rows is None:
+        rows = cache.store(fp, 'loclanctocc', 'latin-1', parse(...))
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from itertools import islice
+
+import config as cfg
+from dump_parser import PARSER_VERSION
+
+CACHE_FORMAT = 1
+CACHE_BATCH_ROWS = 20000
+CACHE_SUFFIX = '.rows.pkl'
+
+_SEP = '\x1f'
+_COUNT_BYTES = 8
+
+
+def _encode(rows: list) -> tuple:
+    """Lote de tuplas -> ('cols', n, [coluna unida | tupla]) ou ('rows', tuplas)."""
+    width = len(rows[0])
+    if any(len(r) != width for r in rows):
+        return ('rows', rows)
+    columns = []
+    try:
+        for col in zip(*rows):
+            joined = _SEP.join(col)
+            # Separador dentro de algum valor: a coluna vai como tupla
+            columns.append(joined if joined.count(_SEP) == len(col) - 1 else col)
+    except TypeError:  # valor que não é str
+        return ('rows', rows)
+    return ('cols', len(rows), columns)
+
+
+def _decode(batch: tuple):
+    if batch[0] == 'rows':
+        return batch[1]
+    _, n, columns = batch
+    if not columns:
+        # Tuplas sem campos: zip() de nenhuma coluna não devolveria nenhuma
+        return [()] * n
+    return zip(*[c.split(_SEP) if type(c) is str else c for c in columns])
+
+
+class TableCache:
+    """Tabelas parseadas por (dump, parser, encoding), com limite de tamanho."""
+
+    def __init__(self, directory: str = cfg.TABLE_CACHE_DIR,
+                 max_bytes: int = cfg.TABLE_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(cls):
+        """Cache de config.py, ou None com MIGRATION_TABLE_CACHE_MB=0."""
+        return cls() if cfg.TABLE_CACHE_MAX_MB > 0 else None
+
+    @staticmethod
+    def key(fingerprint: dict, encoding: str) -> str:
+        data = json.dumps([fingerprint, PARSER_VERSION, encoding, CACHE_FORMAT], sort_keys=True)
+        return hashlib.blake2b(data.encode(), digest_size=10).hexdigest()
+
+    def path(self, fingerprint: dict, table: str, encoding: str) -> str:
+        return os.path.join(self.directory,
+                            f"{table}.{self.key(fingerprint, encoding)}{CACHE_SUFFIX}")
+
+    # ------------------------------------------------------------
+    # Leitura / gravação
+    # ------------------------------------------------------------
+
+    def load(self, fingerprint: dict, table: str, encoding: str):
+        """Iterador das tuplas em cache, ou None se a tabela não está no cache."""
+        path = self.path(fingerprint, table, encoding)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return None
+        count = f.read(_COUNT_BYTES)
+        if len(count) != _COUNT_BYTES:
+            f.close()
+            self._discard(path)
+            return None
+        try:
+            os.utime(path)  # LRU: mtime = último uso
+        except OSError:
+            pass
+        print(f"  Cache do dump: {table} ({int.from_bytes(count, 'little')} linhas)")
+        return self._iter(f, path)
+
+    def _iter(self, f, path: str):
+        with f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                except Exception:
+                    # Arquivo corrompido: some do cache, a próxima execução parseia
+                    self._discard(path)
+                    raise
+                yield from _decode(batch)
+
+    def store(self, fingerprint: dict, table: str, encoding: str, rows):
+        """Repassa `rows` gravando-as no cache; o arquivo só passa a valer se
+        o iterador for consumido até o fim."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=f".{table}.", dir=self.directory)
+        except OSError as e:
+            print(f"  WARN: cache do dump indisponível ({e}); parseando sem gravar")
+            yield from rows
+            return
+        path = self.path(fingerprint, table, encoding)
+        done = False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(bytes(_COUNT_BYTES))  # nº de tuplas, gravado no fim
+                total = 0
+                rows = iter(rows)
+                while True:
+                    batch = list(islice(rows, CACHE_BATCH_ROWS))
+                    if not batch:
+                        break
+                    pickle.dump(_encode(batch), f, protocol=pickle.HIGHEST_PROTOCOL)
+                    total += len(batch)
+                    yield from batch
+                f.seek(0)
+                f.write(total.to_bytes(_COUNT_BYTES, 'little'))
+            os.replace(tmp, path)
+            done = True
+        finally:
+            if not done:
+                self._discard(tmp)
+        self.evict(keep=path)
+
+    # ------------------------------------------------------------
+    # Limite de tamanho (LRU pelo mtime)
+    # ------------------------------------------------------------
+
+    def entries(self) -> list:
+        """[(mtime, bytes, caminho)] do mais antigo para o mais recente."""
+        out = []
+        for path in glob.glob(os.path.join(self.directory, '*' + CACHE_SUFFIX)):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, path))
+        return sorted(out)
+
+    def evict(self, keep: str = None) -> int:
+        """Remove os arquivos menos usados até caber em max_bytes. Retorna quantos."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        # O arquivo recém-gravado sai por último (só se sozinho passar do limite)
+        entries.sort(key=lambda e: e[2] == keep)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._discard(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self._discard(path)
+
+    def summary(self) -> str:
+        entries = self.entries()
+        return (f"{len(entries)} tabelas, {sum(s for _, s, _ in entries) / 1e6:.1f} MB "
+                f"(limite {self.max_bytes / 1e6:.0f} MB) em {self.directory}")
+
+    @staticmethod
+    def _discard(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
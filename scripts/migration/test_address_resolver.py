@@ -0,0 +1,42 @@
+"""
+test_address_resolver.py — Normalização de nomes dos caches de endereço
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Uso:
+    python -m unittest test_address_resolver      (ou: python -m pytest -q)
+"""
+
+import unittest
+
+from address_resolver import normalize_name
+
+
+class NormalizeNameTest(unittest.TestCase):
+
+    def assertSame(self, a, b):
+        self.assertEqual(normalize_name(a), normalize_name(b), (a, b))
+
+    def assertDistinct(self, a, b):
+        self.assertNotEqual(normalize_name(a), normalize_name(b), (a, b))
+
+    def test_grafias_equivalentes(self):
+        self.assertSame('São Paulo', 'SAO PAULO')
+        self.assertSame('S. Paulo', 'São Paulo')
+        self.assertSame('R. N. Sra. de Fátima', 'Rua Nossa Senhora de Fatima')
+        self.assertSame('Av. Pe. Anchieta', 'Avenida Padre Anchieta')
+        self.assertSame('R Augusta', 'Rua Augusta')
+        self.assertSame('Est. do Mar', 'Estrada do Mar')
+        self.assertSame('Rua Ver. João Silva', 'Rua Vereador Joao Silva')
+
+    def test_letras_e_palavras_nao_sao_abreviacoes(self):
+        self.assertDistinct('Rua N', 'Rua Nossa')
+        self.assertDistinct('Rua S', 'Rua São')
+        self.assertDistinct('Rua S.', 'Rua São')
+        self.assertDistinct('Rua Pe', 'Rua Padre')
+        self.assertDistinct('Rua Ver', 'Rua Vereador')
+        self.assertDistinct('Rua Est', 'Rua Estrada')
+        self.assertDistinct('Travessa R', 'Travessa Rua')
+
+
+if __name__ == '__main__':
+    unittest.main()
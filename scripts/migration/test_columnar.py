@@ -0,0 +1,63 @@
+"""
+test_columnar.py — Lotes colunares: mesmo texto do COPY que o caminho por tupla
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Uso:
+    python -m unittest test_columnar      (ou: python -m pytest -q)
+"""
+
+import unittest
+from datetime import date, datetime
+
+import hotfix_complete_migration as hf
+from columnar import CentsColumn, ColumnBatch, ConstColumn, DateColumn, DictColumn, IntColumn
+from dump_parser import parse_mysql_values
+from money import cents_text
+from pipeline import CopyStream
+
+LANCTOCC_LINE = (
+    "INSERT INTO `loclanctocc` VALUES "
+    "(1,'2021-03-15',10,0,'5',1001,'ALUGUEL',1500.00,'C','7',12,0,34,0,'2020-01-01 10:00:00',NULL,0),"
+    "(2,'0000-00-00',10,0,'5',1001,'SEM DATA',10.00,'C','7',12,0,34,0,'2020-01-01 10:00:00',NULL,0),"
+    "(3,'2021-04-01',11,0,'6',1002,'ZERADO',0.00,'D','8',0,0,0,0,'2020-01-01 10:00:00',NULL,0),"
+    "(4,'2022-12-31',12,0,'7',1003,'',0.05,'D','9',NULL,0,0,0,'2020-01-01 10:00:00',NULL,0),"
+    "(5,'2021-03-20',10,0,'5',1001,'AGUA\\tLUZ',99.99,'x','7',12,0,34,0,'2020-01-01 10:00:00',NULL,0);"
+)
+
+
+class ColumnBatchTest(unittest.TestCase):
+
+    def test_copy_text_igual_as_tuplas(self):
+        ints = [1, None, -3]
+        cents = [123450, 5, None]
+        datas = [date(2021, 3, 15), None, date(1999, 12, 31)]
+        textos = ['a\tb', None, 'a\tb']
+        batch = ColumnBatch(('i', 'c', 'd', 's', 'k', 'n'), 3, {
+            'i': IntColumn(ints), 'c': CentsColumn(cents), 'd': DateColumn(datas),
+            's': DictColumn(textos), 'k': ConstColumn('pago'), 'n': ConstColumn(None),
+        })
+        rows = [(i, None if c is None else cents_text(c), d, s, 'pago', None)
+                for i, c, d, s in zip(ints, cents, datas, textos)]
+        self.assertEqual(batch.copy_text(), CopyStream(rows).read())
+        self.assertEqual(list(batch.rows()), rows)
+
+    def test_lote_vazio(self):
+        self.assertEqual(ColumnBatch(('a',), 0, {'a': ConstColumn(1)}).copy_text(), '')
+
+
+class TransformLanctoccTest(unittest.TestCase):
+
+    def test_lotes_iguais_ao_caminho_por_tupla(self):
+        rows = parse_mysql_values(LANCTOCC_LINE)
+        now = datetime(2026, 1, 1, 12, 0)
+        st_tuple, st_batch = {'skipped': 0}, {'skipped': 0}
+        tuples = list(hf.transform_lanctocc(rows, now, st_tuple))
+        batches = list(hf.transform_lanctocc_batches(rows, now, st_batch, batch_size=2))
+        self.assertEqual(len(tuples), 3)
+        self.assertEqual(st_tuple, st_batch)
+        self.assertEqual(''.join(b.copy_text() for b in batches), CopyStream(tuples).read())
+        self.assertEqual([r for b in batches for r in b.rows()], tuples)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+test_dump_parser.py — Regressões do parser da cláusula VALUES
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Uso:
+    python -m unittest test_dump_parser      (ou: python -m pytest -q)
+"""
+
+import unittest
+
+from dump_parser import iter_values, parse_mysql_values, parse_row
+
+
+class CaminhoExatoTest(unittest.TestCase):
+    """Entradas que o caminho rápido (csv) recusa e caem no regex."""
+
+    def test_binary(self):
+        line = "INSERT INTO t VALUES (1,_binary 'a\\'b'),(2,'x');"
+        self.assertEqual(parse_mysql_values(line), [('1', "a'b"), ('2', 'x')])
+        self.assertEqual(parse_mysql_values(line, typed=True), [(1, b"a'b"), (2, 'x')])
+
+    def test_separador_dentro_de_string(self):
+        line = ("INSERT INTO `loclanctocc` VALUES "
+                "(1,'PAGTO (REF),(JAN)',10.50,NULL),(2,'ALUGUEL',20.00,'2021-01-05');")
+        self.assertEqual(parse_mysql_values(line), [
+            ('1', 'PAGTO (REF),(JAN)', '10.50', 'NULL'),
+            ('2', 'ALUGUEL', '20.00', '2021-01-05'),
+        ])
+
+    def test_mesmo_resultado_nos_dois_caminhos(self):
+        line = "INSERT INTO t VALUES (1,'it''s','a\\\\b\\n',3),(-2,'','x',NULL);"
+        self.assertEqual(parse_mysql_values(line), list(iter_values(line)))
+        self.assertEqual(parse_mysql_values(line, typed=True), list(iter_values(line, typed=True)))
+
+
+class CaminhoRapidoTest(unittest.TestCase):
+
+    def test_aspas_dobradas_com_escape(self):
+        # O csv já desfaz '' -> '; a correção posterior só mexe nos \x
+        line = "INSERT INTO t VALUES (1,'d''agua\\nx'),(2,'a\\'\\'b\\t'),(3,'c\\\\''d');"
+        self.assertEqual(parse_mysql_values(line),
+                         [('1', "d'agua\nx"), ('2', "a''b\t"), ('3', "c\\'d")])
+        self.assertEqual(parse_mysql_values(line), list(iter_values(line)))
+
+
+class TipadoTest(unittest.TestCase):
+
+    def test_conversao(self):
+        line = "INSERT INTO t VALUES (1,'007','x',12.30),(-5,'a',NULL,NULL);"
+        self.assertEqual(parse_mysql_values(line, typed=True), [
+            (1, '007', 'x', '12.30'),
+            (-5, 'a', None, None),
+        ])
+
+    def test_aspas_campo_a_campo(self):
+        # NULL na primeira tupla, 'NULL' entre aspas, '2' numa coluna sem aspas
+        line = "INSERT INTO t VALUES (NULL,'NULL',1),(5,'x','2');"
+        self.assertEqual(parse_mysql_values(line, typed=True),
+                         [(None, 'NULL', 1), (5, 'x', '2')])
+        self.assertEqual(parse_mysql_values(line, typed=True), list(iter_values(line, typed=True)))
+
+    def test_parse_row(self):
+        self.assertEqual(parse_row("1,'a'"), ('1', 'a'))
+        self.assertEqual(parse_row("1,'a'", typed=True), (1, 'a'))
+        self.assertEqual(parse_row("NULL,_binary 'z'", typed=True), (None, b'z'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+test_dump_reader.py — Regressões do leitor mmap (LazyRow / iter_rows)
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Uso:
+    python -m unittest test_dump_reader      (ou: python -m pytest -q)
+"""
+
+import os
+import tempfile
+import unittest
+
+import dump_reader
+from dump_index import DumpIndex
+from dump_parser import parse_mysql_values
+from dump_reader import DumpReader, LazyRow
+
+LINES = [
+    "INSERT INTO `t` VALUES (1,'a',NULL),(2,'b\\\\','x');\n",
+    # '),(' dentro de string: com \\ antes de \' e com aspas dobradas
+    "INSERT INTO `t` VALUES (3,'\\\\\\'),(\\\\\\''),(4,'x');\n",
+    "INSERT INTO `t` VALUES (5,'it''s),(ok'),(6,_binary 'z');\n",
+    "INSERT INTO `u` VALUES (9,'nunca decodificada');\n",
+]
+
+
+class IterRowsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'dump.sql')
+        with open(self.path, 'w', encoding='latin-1') as f:
+            f.writelines(LINES)
+        self.index = DumpIndex.build(self.path)
+        self.expected = [r for line in LINES[:3] for r in parse_mysql_values(line)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _rows(self):
+        with DumpReader(self.path, self.index, cache=False) as reader:
+            return [lazy.values() for lazy in reader.iter_rows('t')]
+
+    def test_mesmas_tuplas_do_parser(self):
+        self.assertEqual(self._rows(), self.expected)
+
+    def test_fallback_regex(self):
+        spans = dump_reader._row_spans
+        dump_reader._row_spans = lambda *a: None
+        try:
+            self.assertEqual(self._rows(), self.expected)
+        finally:
+            dump_reader._row_spans = spans
+
+    def test_aspas_desbalanceadas_caem_no_regex(self):
+        stmt = LINES[1].encode('latin-1')
+        self.assertIsNone(dump_reader._row_spans(stmt[stmt.index(b'VALUES') + 6:], 0))
+
+
+class LazyRowTest(unittest.TestCase):
+
+    def test_decodifica_sob_demanda(self):
+        row = LazyRow(memoryview(b"7,'S\xe3o',NULL"), 'latin-1')
+        self.assertIsNone(row._fields)
+        self.assertEqual(row.values(), ('7', 'São', 'NULL'))
+        self.assertIsNone(row._fields)
+        self.assertEqual(row[1], 'São')
+        self.assertEqual(len(row), 3)
+        self.assertEqual(list(row), ['7', 'São', 'NULL'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+test_id_map_store.py — Regressões do IdMapStore (SQLite)
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Uso:
+    python -m unittest test_id_map_store      (ou: python -m pytest -q)
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from id_map_store import IdMapStore
+
+
+class ImportJsonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = IdMapStore(os.path.join(self.tmp.name, 'id_map.sqlite3'))
+        self.store.put_many('locfiador', [(1, 10), (2, 20)])
+        self.store.put_many('locinquilino', [(7, 70)])
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def _json(self, data):
+        path = os.path.join(self.tmp.name, 'id_map.json')
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        return path
+
+    def test_substitui_a_entidade(self):
+        n = self.store.import_json(self._json({'locfiador': {'1': 11}}))
+        self.assertEqual(n, 1)
+        self.assertEqual(self.store.load_entity('locfiador', key=int), {1: 11})
+        # Entidade fora do JSON não é tocada
+        self.assertEqual(self.store.get_new_id('locinquilino', 7), 70)
+
+    def test_falha_no_meio_nao_apaga_nada(self):
+        path = self._json({'locfiador': {'1': 11}, 'locinquilino': {'7': 'x'}})
+        with self.assertRaises(ValueError):
+            self.store.import_json(path)
+        self.assertEqual(self.store.load_entity('locfiador', key=int), {1: 10, 2: 20})
+        self.assertEqual(self.store.get_new_id('locinquilino', 7), 70)
+
+    def test_export_import_ida_e_volta(self):
+        path = os.path.join(self.tmp.name, 'export.json')
+        self.assertEqual(self.store.export_json(path), 3)
+        self.store.put_many('locfiador', [(3, 30)])
+        self.store.import_json(path)
+        self.assertEqual(self.store.counts(), {'locfiador': 2, 'locinquilino': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+test_money.py — Centavos exatos (to_cents / cents_text)
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Uso:
+    python -m unittest test_money      (ou: python -m pytest -q)
+"""
+
+import random
+import unittest
+from decimal import ROUND_HALF_UP, Decimal
+
+from money import cents_column, cents_text, to_cents
+
+
+def _decimal_cents(text: str) -> int:
+    return int((Decimal(text) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+class ToCentsTest(unittest.TestCase):
+
+    def test_duas_casas(self):
+        self.assertEqual(to_cents('1234.5'), 123450)
+        self.assertEqual(to_cents(' 7.10 '), 710)
+        self.assertEqual(to_cents('-3.2'), -320)
+        self.assertEqual(to_cents(5), 500)
+
+    def test_mesmo_valor_que_decimal(self):
+        rnd = random.Random(3)
+        for _ in range(20000):
+            text = f"{rnd.randint(-10 ** 9, 10 ** 9) / 100:.2f}"
+            self.assertEqual(to_cents(text), _decimal_cents(text), text)
+
+    def test_mais_casas_arredonda_meio_para_cima(self):
+        # round() do float daria 0, 1234 e 267: aqui vão para o Decimal
+        self.assertEqual(to_cents('0.005'), 1)
+        self.assertEqual(to_cents('-0.005'), -1)
+        self.assertEqual(to_cents('12.345'), 1235)
+        self.assertEqual(to_cents('2.675'), 268)
+        self.assertEqual(to_cents('1e2'), 10000)
+
+    def test_invalido_usa_default(self):
+        for v in ('abc', '', 'nan', 'inf', None):
+            self.assertEqual(to_cents(v), 0, v)
+            self.assertEqual(to_cents(v, default=-1), -1, v)
+
+    def test_cents_column(self):
+        self.assertEqual(list(cents_column(['1.00', 'x', '-0.01'])), [100, 0, -1])
+
+
+class CentsTextTest(unittest.TestCase):
+
+    def test_formato_numeric(self):
+        self.assertEqual(cents_text(0), '0.00')
+        self.assertEqual(cents_text(123450), '1234.50')
+        self.assertEqual(cents_text(-5), '-0.05')
+        self.assertEqual(cents_text(-123450), '-1234.50')
+
+    def test_ida_e_volta(self):
+        for c in (0, 1, -1, 99, -100, 123456789):
+            self.assertEqual(to_cents(cents_text(c)), c)
+
+
+if __name__ == '__main__':
+    unittest.main()
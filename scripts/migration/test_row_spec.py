@@ -0,0 +1,64 @@
+"""
+test_row_spec.py — Extração gerada pelo RowSpec (posições e conversores)
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Uso:
+    python -m unittest test_row_spec      (ou: python -m pytest -q)
+"""
+
+import unittest
+
+from row_spec import RowSpec
+
+SPEC = RowSpec('locteste', (
+    ('codigo', int),
+    ('nome', '{0}.strip() or None'),
+    ('uf', None),
+    ('obs', '{0}.upper()', ''),
+), default_columns=('codigo', 'x', 'nome', 'uf', 'obs'), min_width=4)
+
+
+class PositionsTest(unittest.TestCase):
+
+    def test_pelo_nome_sem_caixa(self):
+        self.assertEqual(SPEC.positions(), [0, 2, 3, 4])
+        self.assertEqual(SPEC.positions(('UF', 'Nome', 'CODIGO', 'obs')), [2, 1, 0, 3])
+        self.assertEqual(SPEC.position('x'), 1)
+
+    def test_coluna_ausente(self):
+        with self.assertRaises(KeyError):
+            SPEC.positions(('codigo', 'nome'))
+
+    def test_width(self):
+        # obs tem default: não entra no mínimo
+        self.assertEqual(SPEC.width(), 4)
+        # nome obrigatório na posição 5 passa do min_width
+        self.assertEqual(SPEC.width(('codigo', 'a', 'b', 'uf', 'obs', 'nome')), 6)
+
+
+class CompileTest(unittest.TestCase):
+
+    def test_mesmo_resultado_que_por_posicao(self):
+        extract = SPEC.compile()
+        for r in (('1', '-', ' Ana ', 'SP', 'x'), ('2', '-', '  ', 'RJ', '')):
+            self.assertEqual(extract(r), (int(r[0]), r[2].strip() or None, r[3], r[4].upper()))
+
+    def test_default_em_linha_curta(self):
+        self.assertEqual(SPEC.compile()(('3', '-', 'Bia', 'MG')), (3, 'Bia', 'MG', ''))
+
+    def test_colunas_do_dump(self):
+        columns = ('obs', 'uf', 'nome', 'codigo')
+        self.assertEqual(SPEC.compile(columns)(('o', 'BA', 'Caio', '4')), (4, 'Caio', 'BA', 'O'))
+        self.assertIs(SPEC.compile(columns), SPEC.compile(columns))
+
+    def test_record_class(self):
+        Record = SPEC.record_class(shared=('uf',))
+        a = Record(('1', '-', ' Ana ', 'SP', 'x'))
+        b = Record(('2', '-', 'Bia', 'SP'))
+        self.assertEqual((a.codigo, a.nome, a.uf, a.obs), (1, 'Ana', 'SP', 'X'))
+        self.assertEqual(b.obs, '')
+        self.assertFalse(hasattr(a, '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
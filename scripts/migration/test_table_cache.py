@@ -0,0 +1,80 @@
+"""
+test_table_cache.py — Cache em disco das tabelas parseadas
+AlmasaStudio | Migração MySQL -> PostgreSQL
+
+Uso:
+    python -m unittest test_table_cache      (ou: python -m pytest -q)
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import table_cache
+from table_cache import TableCache
+
+FP = {'size': 1, 'mtime': 2, 'hash': 'abc'}
+
+
+class TableCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = TableCache(self.tmp.name, max_bytes=1 << 30)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def roundtrip(self, rows, table='t'):
+        self.assertEqual(list(self.cache.store(FP, table, 'latin-1', iter(rows))), rows)
+        return list(self.cache.load(FP, table, 'latin-1'))
+
+    def test_ida_e_volta(self):
+        rows = [('1', 'a', 'NULL'), ('2', 'b\x1fc', ''), ('3', 'é', 'x')]
+        self.assertEqual(self.roundtrip(rows), rows)
+
+    def test_lotes_e_larguras_diferentes(self):
+        rows = [(str(i), 'x' * (i % 3)) for i in range(5)] + [('9',), ('10', 'a', 'b')]
+        with mock.patch.object(table_cache, 'CACHE_BATCH_ROWS', 2):
+            self.assertEqual(self.roundtrip(rows), rows)
+
+    def test_tuplas_sem_campos(self):
+        self.assertEqual(self.roundtrip([(), (), ()]), [(), (), ()])
+
+    def test_tabela_ausente(self):
+        self.assertIsNone(self.cache.load(FP, 'nada', 'latin-1'))
+
+    def test_so_grava_se_consumido_ate_o_fim(self):
+        it = self.cache.store(FP, 't', 'latin-1', iter([('1',), ('2',)]))
+        next(it)
+        it.close()
+        self.assertIsNone(self.cache.load(FP, 't', 'latin-1'))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_parser_version_invalida(self):
+        self.roundtrip([('1',)])
+        with mock.patch.object(table_cache, 'PARSER_VERSION', table_cache.PARSER_VERSION + 1):
+            self.assertIsNone(self.cache.load(FP, 't', 'latin-1'))
+        self.assertIsNone(self.cache.load({**FP, 'hash': 'outro'}, 't', 'latin-1'))
+        self.assertIsNone(self.cache.load(FP, 't', 'utf-8'))
+
+    def test_lru_remove_o_menos_usado(self):
+        rows = [(str(i), 'valor %d' % i) for i in range(2000)]
+        self.roundtrip(rows, 'a')
+        self.roundtrip(rows, 'b')
+        size = max(s for _, s, _ in self.cache.entries())
+        # 'a' lido por último: quem sai é 'b'
+        old = time.time() - 60
+        os.utime(self.cache.path(FP, 'b', 'latin-1'), (old, old))
+        list(self.cache.load(FP, 'a', 'latin-1'))
+        small = TableCache(self.tmp.name, max_bytes=int(size * 2.5))
+        list(small.store(FP, 'c', 'latin-1', iter(rows)))
+        self.assertIsNone(small.load(FP, 'b', 'latin-1'))
+        self.assertIsNotNone(small.load(FP, 'a', 'latin-1'))
+        self.assertIsNotNone(small.load(FP, 'c', 'latin-1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -29,6 +29,9 @@ use App\Entity\AlmasaPlanoContas;
         new ORM\Index(name: 'idx_lancamentos_competencia', columns: ['competencia']),
         new ORM\Index(name: 'idx_lancamentos_pc_debito', columns: ['id_plano_conta_debito']),
         new ORM\Index(name: 'idx_lancamentos_pc_credito', columns: ['id_plano_conta_credito']),
+    ],
+    uniqueConstraints: [
+        new ORM\UniqueConstraint(name: 'uk_lancamentos_lanc_financeiro', columns: ['id_lancamento_financeiro'])
     ]
 )]
 #[ORM\HasLifecycleCallbacks]
@@ -195,6 +198,10 @@ class Lancamentos
     #[ORM\Column(type: Types::STRING, length: 20, nullable: true)]
     private ?string $origem = self::ORIGEM_MANUAL;
 
+    // lancamentos_financeiros.id espelhado pela migração (NULL se manual)
+    #[ORM\Column(name: 'id_lancamento_financeiro', type: Types::INTEGER, nullable: true)]
+    private ?int $idLancamentoFinanceiro = null;
+
     // === JURÍDICO ===
 
     #[ORM\Column(name: 'id_processo', type: Types::INTEGER, nullable: true)]
@@ -713,6 +720,17 @@ class Lancamentos
         return $this;
     }
 
+    public function getIdLancamentoFinanceiro(): ?int
+    {
+        return $this->idLancamentoFinanceiro;
+    }
+
+    public function setIdLancamentoFinanceiro(?int $idLancamentoFinanceiro): self
+    {
+        $this->idLancamentoFinanceiro = $idLancamentoFinanceiro;
+        return $this;
+    }
+
     public function getIdProcesso(): ?int
     {
         return $this->idProcesso;
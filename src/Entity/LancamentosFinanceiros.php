@@ -21,6 +21,9 @@ use Doctrine\ORM\Mapping as ORM;
         new ORM\Index(name: 'idx_lanc_vencimento', columns: ['data_vencimento']),
         new ORM\Index(name: 'idx_lanc_situacao', columns: ['situacao']),
         new ORM\Index(name: 'idx_lanc_competencia', columns: ['competencia']),
+    ],
+    uniqueConstraints: [
+        new ORM\UniqueConstraint(name: 'uk_lanc_origem_codigo', columns: ['origem', 'codigo_origem'])
     ]
 )]
 #[ORM\HasLifecycleCallbacks]
@@ -153,6 +156,10 @@ class LancamentosFinanceiros
     #[ORM\Column(type: Types::STRING, length: 30, nullable: true)]
     private ?string $origem = 'contrato';
 
+    // Chave do registro no sistema legado (ex.: loclanctocc.codigo)
+    #[ORM\Column(name: 'codigo_origem', type: Types::INTEGER, nullable: true)]
+    private ?int $codigoOrigem = null;
+
     // === OBSERVAÇÕES ===
 
     #[ORM\Column(type: Types::TEXT, nullable: true)]
@@ -597,6 +604,17 @@ class LancamentosFinanceiros
         return $this;
     }
 
+    public function getCodigoOrigem(): ?int
+    {
+        return $this->codigoOrigem;
+    }
+
+    public function setCodigoOrigem(?int $codigoOrigem): self
+    {
+        $this->codigoOrigem = $codigoOrigem;
+        return $this;
+    }
+
     public function getDescricao(): ?string
     {
         return $this->descricao;
@@ -27,7 +27,8 @@ use Doctrine\ORM\Mapping as ORM;
         new ORM\Index(name: 'idx_prestacoes_contas_ano', columns: ['ano']),
     ],
     uniqueConstraints: [
-        new ORM\UniqueConstraint(name: 'uk_prestacao_numero_ano', columns: ['numero', 'ano'])
+        new ORM\UniqueConstraint(name: 'uk_prestacao_numero_ano', columns: ['numero', 'ano']),
+        new ORM\UniqueConstraint(name: 'uk_prestacao_codigo_origem', columns: ['codigo_origem'])
     ]
 )]
 #[ORM\HasLifecycleCallbacks]
@@ -102,6 +103,10 @@ class PrestacoesContas
     #[ORM\Column(name: 'incluir_lancamentos', type: Types::BOOLEAN, nullable: true)]
     private ?bool $incluirLancamentos = true;
 
+    // Chave do registro no sistema legado (locrepasse.codigo)
+    #[ORM\Column(name: 'codigo_origem', type: Types::INTEGER, nullable: true)]
+    private ?int $codigoOrigem = null;
+
     // === TOTAIS CALCULADOS ===
 
     #[ORM\Column(name: 'total_receitas', type: Types::DECIMAL, precision: 15, scale: 2, nullable: true)]
@@ -312,6 +317,17 @@ class PrestacoesContas
         return $this;
     }
 
+    public function getCodigoOrigem(): ?int
+    {
+        return $this->codigoOrigem;
+    }
+
+    public function setCodigoOrigem(?int $codigoOrigem): self
+    {
+        $this->codigoOrigem = $codigoOrigem;
+        return $this;
+    }
+
     public function getTotalReceitas(): string
     {
         return $this->totalReceitas ?? '0.00';